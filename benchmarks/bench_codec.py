@@ -0,0 +1,114 @@
+"""
+Board serialization throughput: the shape codec against the previous
+dataclasses.asdict + json.dump(indent=2) path, and the binary board format,
+on a synthetic 50k-shape board.
+
+    PYTHONPATH=src uv run python benchmarks/bench_codec.py [--shapes N]
+
+The package is not installed, so src has to be on the path.
+
+Install the 'fast' extra to measure with orjson.
+"""
+
+import argparse
+import dataclasses
+import json
+import random
+import time
+
+from blackboard.models import (
+    Circle,
+    Group,
+    Line,
+    Path,
+    PointArray,
+    Polygon,
+    Rectangle,
+    Text,
+)
+from blackboard.storage import binary_format, codec
+from blackboard.storage.snapshot import SnapshotCache
+
+
+def make_board(count: int, seed: int = 1):
+    rng = random.Random(seed)
+
+    def point():
+        return rng.uniform(0, 5000), rng.uniform(0, 5000)
+
+    makers = [
+        lambda: Rectangle(x=point()[0], y=point()[1], width=40, height=30),
+        lambda: Circle(x=point()[0], y=point()[1], radius_x=10, radius_y=12),
+        lambda: Line(x=point()[0], y=point()[1], end_x=point()[0], end_y=point()[1]),
+        lambda: Text(x=point()[0], y=point()[1], content="note"),
+        lambda: Path(points=[point() for _ in range(40)]),
+        lambda: Polygon(points=[point() for _ in range(5)]),
+    ]
+    shapes = [rng.choice(makers)() for _ in range(count)]
+    # A few groups so nesting is covered
+    for i in range(0, count - 4, 500):
+        shapes[i] = Group(children=shapes[i + 1 : i + 4])
+    return shapes
+
+
+def _asdict_factory(items):
+    return {
+        key: value.tolist() if isinstance(value, PointArray) else value
+        for key, value in items
+    }
+
+
+def timed(label: str, count: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms  {count / elapsed:12,.0f} shapes/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shapes", type=int, default=50_000)
+    args = parser.parse_args()
+
+    shapes = make_board(args.shapes)
+    n = len(shapes)
+    print(f"{n} shapes, orjson {'on' if codec.orjson is not None else 'off'}\n")
+
+    old = timed(
+        "encode: dataclasses.asdict",
+        n,
+        lambda: [dataclasses.asdict(s, dict_factory=_asdict_factory) for s in shapes],
+    )
+    new = timed("encode: codec", n, lambda: [codec.encode_shape(s) for s in shapes])
+
+    old_text = timed("dump: json indent=2", n, lambda: json.dumps(old, indent=2))
+    new_bytes = timed("dump: codec compact", n, lambda: codec.dumps(new))
+    timed("dump: codec pretty", n, lambda: codec.dumps(new, pretty=True))
+    print(f"size: {len(old_text) / 1e6:.1f} MB -> {len(new_bytes) / 1e6:.1f} MB")
+
+    timed("load: json", n, lambda: json.loads(old_text))
+    data = timed("load: codec", n, lambda: codec.loads(new_bytes))
+    timed("decode: codec", n, lambda: [codec.decode_shape(d) for d in data])
+
+    print()
+    # What a save packs: the frozen snapshot, points still in buffers
+    document = {"view": {}, "shapes": SnapshotCache().freeze(shapes)}
+    for float32 in (False, True):
+        label = "float32" if float32 else "float64"
+        packed = timed(
+            f"dump: binary {label}",
+            n,
+            lambda float32=float32: binary_format.dumps(document, float32=float32),
+        )
+        data = timed(
+            f"load: binary {label}",
+            n,
+            lambda packed=packed: binary_format.loads(packed),
+        )
+        print(f"size: {len(packed) / 1e6:.1f} MB")
+    timed("decode: codec", n, lambda: [codec.decode_shape(d) for d in data["shapes"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,195 @@
+import itertools
 import uuid
+import weakref
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Tuple
+from typing import Callable, ClassVar, Iterable, Iterator, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Optional: PointArray falls back to pure-Python loops
+
+Bounds = Tuple[float, float, float, float]
+Point = Tuple[float, float]
+
+# Shared by all shapes so a version is never reused, even by a new object
+# that replaces an old one with the same id (e.g. after undo).
+_version_counter = itertools.count(1)
+
+_NO_BOUNDS = object()  # Marks "no cached bounds" (None is a valid value)
+
+# Bumped whenever a line is attached to or detached from a shape, so indexes
+# of connections know when they are stale.
+_connections_version = 0
+
+
+def connections_version() -> int:
+    return _connections_version
+
+
+# Called as observer(shape, field name, in_place) right before a field of an
+# existing shape changes, so undo histories can keep the old value. Every
+# observer sees every change and decides whether the shape is one of its
+# own. Held weakly, as bound methods of their owners.
+_change_observers: List[weakref.WeakMethod] = []
+
+
+def add_change_observer(observer: Callable[["Shape", str, bool], None]):
+    _change_observers.append(weakref.WeakMethod(observer, _drop_observer))  # type: ignore
+
+
+def _drop_observer(ref: weakref.WeakMethod):
+    if ref in _change_observers:
+        _change_observers.remove(ref)
+
+
+def remove_change_observer(observer: Callable[["Shape", str, bool], None]):
+    for ref in _change_observers:
+        if ref() == observer:
+            _change_observers.remove(ref)
+            return
+
+
+def _notify_change(shape: "Shape", name: str, in_place: bool):
+    for ref in list(_change_observers):
+        observer = ref()
+        if observer is not None:
+            observer(shape, name, in_place)
+
+
+class PointArray:
+    """
+    Compact point storage: x/y pairs interleaved in one array('d').
+
+    Behaves like a sequence of (x, y) tuples, so code that indexes, iterates
+    or compares points keeps working, at 16 bytes per point instead of a
+    tuple of two floats. translate()/scale() edit the buffer in place (the
+    owning shape must then be touch()ed), and NumPy consumers get a
+    zero-copy (n, 2) view via np.asarray(). Storage converts to and from
+    lists of pairs (see tolist()).
+    """
+
+    __slots__ = ("coords",)
+
+    def __init__(self, points: Iterable = ()):
+        if isinstance(points, PointArray):
+            self.coords = array("d", points.coords)
+        else:
+            self.coords = array("d", itertools.chain.from_iterable(points))
+        if len(self.coords) % 2:
+            raise ValueError("PointArray needs (x, y) pairs")
+
+    @classmethod
+    def from_coords(cls, coords: Iterable[float]) -> "PointArray":
+        """Builds a PointArray from flat x0, y0, x1, y1, ... values."""
+        points = cls()
+        points.coords = array("d", coords)
+        return points
+
+    def __len__(self) -> int:
+        return len(self.coords) // 2
+
+    def __iter__(self) -> Iterator[Point]:
+        it = iter(self.coords)
+        return zip(it, it)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return PointArray.from_coords(self.coords[2 * start : 2 * stop])
+            return PointArray(self[i] for i in range(start, stop, step))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PointArray index out of range")
+        return (self.coords[2 * index], self.coords[2 * index + 1])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PointArray):
+            return self.coords == other.coords
+        if isinstance(other, (list, tuple)):
+            return len(other) == len(self) and all(
+                tuple(q) == p for p, q in zip(self, other)
+            )
+        return NotImplemented
+
+    __hash__ = None  # Mutable
+
+    def __repr__(self) -> str:
+        return f"PointArray({self.tolist()!r})"
+
+    def __copy__(self) -> "PointArray":
+        return PointArray(self)
+
+    def __deepcopy__(self, memo) -> "PointArray":
+        return PointArray(self)
+
+    def __array__(self, dtype=None, copy=None):
+        view = np.frombuffer(self.coords, dtype=float).reshape(-1, 2)
+        if copy or (dtype is not None and np.dtype(dtype) != view.dtype):
+            return view.astype(dtype or float)
+        return view
+
+    def copy(self) -> "PointArray":
+        return PointArray(self)
+
+    def tolist(self) -> List[Point]:
+        return list(self)
+
+    def append(self, point: Point):
+        x, y = point
+        try:
+            self.coords.append(x)
+        except BufferError:
+            # A NumPy view still holds the buffer; continue in a new one
+            self.coords = array("d", self.coords)
+            self.coords.append(x)
+        self.coords.append(y)
+
+    def extend(self, points: Iterable[Point]):
+        for point in points:
+            self.append(point)
+
+    def transform(self, sx: float, sy: float, dx: float, dy: float):
+        """Maps every point through (x * sx + dx, y * sy + dy) in place."""
+        if np is not None:
+            view = np.frombuffer(self.coords, dtype=float)
+            view[0::2] *= sx
+            view[0::2] += dx
+            view[1::2] *= sy
+            view[1::2] += dy
+            return
+        coords = self.coords
+        for i in range(0, len(coords), 2):
+            coords[i] = coords[i] * sx + dx
+            coords[i + 1] = coords[i + 1] * sy + dy
+
+    def translate(self, dx: float, dy: float):
+        self.transform(1.0, 1.0, dx, dy)
+
+    def scale(self, sx: float, sy: float, ox: float = 0.0, oy: float = 0.0):
+        """Scales the points about (ox, oy) in place."""
+        self.transform(sx, sy, ox - ox * sx, oy - oy * sy)
+
+    def bounds(self) -> Bounds | None:
+        if not self.coords:
+            return None
+        xs = self.coords[0::2]
+        ys = self.coords[1::2]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _points_bounds(points: Iterable[Point]) -> Bounds | None:
+    if isinstance(points, PointArray):
+        return points.bounds()
+    if not points:
+        return None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys))
 
 
 class ToolType(Enum):
@@ -32,10 +220,79 @@ class Shape:
     opacity: float = 1.0
     stroke_join: str = "miter"  # miter, round, bevel
 
+    # Bumped on every attribute assignment so caches can tell when a shape
+    # changed. In-place edits (e.g. points.append) must call touch().
+    _version: ClassVar[int] = 0
+
+    def __setattr__(self, name: str, value) -> None:
+        # Fields being set for the first time (in __init__) have no old value
+        if _change_observers and name in self.__dict__:
+            _notify_change(self, name, False)
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, "_version", next(_version_counter))
+        self._invalidate_bounds()
+
+    @classmethod
+    def from_fields(cls, values: dict) -> "Shape":
+        """
+        Builds a shape from a value for every field without the per-field
+        __setattr__ work of __init__ (for bulk loading). Values must already
+        have their field types, e.g. PointArray points.
+        """
+        shape = cls.__new__(cls)
+        shape.__dict__.update(values)
+        object.__setattr__(shape, "_version", next(_version_counter))
+        return shape
+
+    def will_change(self, name: str):
+        """Call before editing a mutable field in place (then touch())."""
+        if _change_observers:
+            _notify_change(self, name, True)
+
+    def touch(self):
+        """Marks the shape as changed after an in-place edit."""
+        object.__setattr__(self, "_version", next(_version_counter))
+        self._invalidate_bounds()
+
+    @property
+    def bounds(self) -> Bounds | None:
+        """get_bounds(), cached until the shape or a nested child changes."""
+        try:
+            return self.__dict__["_bounds"]
+        except KeyError:
+            bounds = self.get_bounds()
+            object.__setattr__(self, "_bounds", bounds)
+            return bounds
+
+    def __getstate__(self):
+        # Copies recompute their bounds and get their own parent links
+        state = self.__dict__.copy()
+        state.pop("_bounds", None)
+        state.pop("_parent", None)
+        return state
+
+    def _invalidate_bounds(self):
+        self.__dict__.pop("_bounds", None)
+        # Propagate to the enclosing groups. An ancestor only caches its
+        # bounds after its children did, so the walk can stop at the first
+        # one without a cache.
+        parent_ref = self.__dict__.get("_parent")
+        parent = parent_ref() if parent_ref is not None else None
+        while (
+            parent is not None
+            and parent.__dict__.pop("_bounds", _NO_BOUNDS) is not _NO_BOUNDS
+        ):
+            parent_ref = parent.__dict__.get("_parent")
+            parent = parent_ref() if parent_ref is not None else None
+
     def get_anchors(self) -> List[Tuple[str, float, float]]:
         """Returns a list of (anchor_id, x, y) tuples."""
         return []
 
+    def get_bounds(self) -> Bounds | None:
+        """Returns the world-space (min_x, min_y, max_x, max_y) of the shape."""
+        return None
+
 
 @dataclass
 class Line(Shape):
@@ -50,12 +307,36 @@ class Line(Shape):
     )
     end_anchor_id: str | None = None
 
+    _CONNECTION_FIELDS: ClassVar[frozenset] = frozenset(
+        ("start_shape_id", "end_shape_id", "start_anchor_id", "end_anchor_id")
+    )
+
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        if name in Line._CONNECTION_FIELDS:
+            global _connections_version
+            _connections_version += 1
+
+    @classmethod
+    def from_fields(cls, values: dict) -> "Line":
+        global _connections_version
+        _connections_version += 1
+        return super().from_fields(values)  # type: ignore
+
     def get_anchors(self) -> List[Tuple[str, float, float]]:
         return [
             ("start", self.x, self.y),
             ("end", self.end_x, self.end_y),
         ]
 
+    def get_bounds(self) -> Bounds | None:
+        return (
+            min(self.x, self.end_x),
+            min(self.y, self.end_y),
+            max(self.x, self.end_x),
+            max(self.y, self.end_y),
+        )
+
 
 @dataclass
 class Rectangle(Shape):
@@ -79,6 +360,11 @@ class Rectangle(Shape):
             ("left_center", x, y + h / 2),
         ]
 
+    def get_bounds(self) -> Bounds | None:
+        # Width/height can be negative while dragging up or left
+        x2, y2 = self.x + self.width, self.y + self.height
+        return (min(self.x, x2), min(self.y, y2), max(self.x, x2), max(self.y, y2))
+
 
 @dataclass
 class Circle(Shape):
@@ -110,6 +396,11 @@ class Circle(Shape):
             ("left_center", cx - rx, cy),
         ]
 
+    def get_bounds(self) -> Bounds | None:
+        x2 = self.x + self.radius_x * 2
+        y2 = self.y + self.radius_y * 2
+        return (min(self.x, x2), min(self.y, y2), max(self.x, x2), max(self.y, y2))
+
 
 @dataclass
 class Text(Shape):
@@ -121,63 +412,163 @@ class Text(Shape):
     underline: bool = False
     font_family: str = "Roboto"
 
+    def get_bounds(self) -> Bounds | None:
+        # Estimate text size (rough approximation without font metrics)
+        w = len(self.content) * self.font_size * 0.6
+        return (self.x, self.y, self.x + w, self.y + self.font_size)
+
 
 @dataclass
 class Path(Shape):
     type: str = "path"
-    points: List[Tuple[float, float]] = field(default_factory=list)
+    points: PointArray = field(default_factory=PointArray)
     tension: float = 0.05  # Spline tension (0.0 = sharp, 0.5 = smooth/loose)
 
+    def __setattr__(self, name: str, value) -> None:
+        if name == "points" and not isinstance(value, PointArray):
+            value = PointArray(value)
+        super().__setattr__(name, value)
+
+    def get_bounds(self) -> Bounds | None:
+        return _points_bounds(self.points)
+
 
 @dataclass
 class Polygon(Shape):
     type: str = "polygon"
-    points: List[Tuple[float, float]] = field(default_factory=list)
+    points: PointArray = field(default_factory=PointArray)
     polygon_type: str = (
         "triangle"  # triangle, diamond, pentagon, hexagon, octagon, star
     )
     tension: float = 0.05  # Spline tension (0.0 = sharp, 0.5 = smooth/loose)
 
+    def __setattr__(self, name: str, value) -> None:
+        if name == "points" and not isinstance(value, PointArray):
+            value = PointArray(value)
+        super().__setattr__(name, value)
+
     def get_anchors(self) -> List[Tuple[str, float, float]]:
         anchors = []
         for i, p in enumerate(self.points):
             anchors.append((f"vertex_{i}", p[0], p[1]))
         return anchors
 
+    def get_bounds(self) -> Bounds | None:
+        return _points_bounds(self.points)
+
+
+class _ChildList(list):
+    """
+    A group's children. Edits point the added children at the group and
+    invalidate the group's cached bounds.
+    """
+
+    def __init__(self, iterable=(), owner: "Group | None" = None):
+        super().__init__(iterable)
+        self._owner = weakref.ref(owner) if owner is not None else None
+        self._adopt(self)
+
+    def _adopt(self, children):
+        owner_ref = getattr(self, "_owner", None)
+        if owner_ref is None:
+            return
+        for child in children:
+            if isinstance(child, Shape):
+                object.__setattr__(child, "_parent", owner_ref)
+        owner = owner_ref()
+        if owner is not None:
+            owner._invalidate_bounds()
+
+    def _changed(self):
+        owner_ref = getattr(self, "_owner", None)
+        owner = owner_ref() if owner_ref is not None else None
+        if owner is not None:
+            owner._invalidate_bounds()
+
+    def append(self, item):
+        super().append(item)
+        self._adopt((item,))
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        self._adopt(items)
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._adopt((item,))
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._adopt(value if isinstance(index, slice) else (value,))
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def __reduce_ex__(self, protocol):
+        # Copies start unowned; Group re-adopts them
+        return (_ChildList, (list(self),))
+
 
 @dataclass
 class Group(Shape):
     type: str = "group"
     children: List[Shape] = field(default_factory=list)
 
-    def get_anchors(self) -> List[Tuple[str, float, float]]:
-        # Calculate bounding box of children
-        if not self.children:
-            return []
+    def __setattr__(self, name: str, value) -> None:
+        if name == "children" and not (
+            isinstance(value, _ChildList)
+            and value._owner is not None
+            and value._owner() is self
+        ):
+            value = _ChildList(value, owner=self)
+        super().__setattr__(name, value)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.children = self.children
+
+    @classmethod
+    def from_fields(cls, values: dict) -> "Group":
+        group = super().from_fields(values)
+        group.children = group.children  # Adopt them
+        return group  # type: ignore
+
+    def get_bounds(self) -> Bounds | None:
+        bounds = [b for b in (child.bounds for child in self.children) if b]
+        if not bounds:
+            return None
+        return (
+            min(b[0] for b in bounds),
+            min(b[1] for b in bounds),
+            max(b[2] for b in bounds),
+            max(b[3] for b in bounds),
+        )
 
-        min_x, min_y = float("inf"), float("inf")
-        max_x, max_y = float("-inf"), float("-inf")
-
-        found = False
-        for child in self.children:
-            # We need a way to get bounds.
-            # We can use the logic similar to Exporter._get_bounds or duplicate it here.
-            # Or use child.get_anchors() to approximate bounds?
-            # get_anchors() returns specific points, which usually define the extrema.
-            anchors = child.get_anchors()
-            if not anchors:
-                continue
-
-            found = True
-            xs = [a[1] for a in anchors]
-            ys = [a[2] for a in anchors]
-            min_x = min(min_x, min(xs))
-            min_y = min(min_y, min(ys))
-            max_x = max(max_x, max(xs))
-            max_y = max(max_y, max(ys))
-
-        if not found:
+    def get_anchors(self) -> List[Tuple[str, float, float]]:
+        # Bounding box of the children, cached until one of them changes
+        bounds = self.bounds
+        if bounds is None:
             return []
+        min_x, min_y, max_x, max_y = bounds
 
         # Return standard 8-point box for the group
         w = max_x - min_x
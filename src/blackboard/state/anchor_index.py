@@ -0,0 +1,89 @@
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+Cell = Tuple[int, int]
+# (anchor_id, x, y) as returned by Shape.get_anchors()
+Anchor = Tuple[str, float, float]
+# (key, anchor_id, x, y, distance)
+AnchorHit = Tuple[str, str, float, float, float]
+
+
+class AnchorIndex:
+    """
+    Hashed grid of anchor points.
+
+    Anchors are stored per key (a shape id) in the cell containing them, so
+    a "nearest anchor within radius" query only looks at the cells the
+    radius overlaps instead of every anchor on the board.
+    """
+
+    def __init__(self, cell_size: float = 64.0):
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Dict[Tuple[str, str], Tuple[float, float]]] = {}
+        self._anchors: Dict[str, List[Anchor]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(anchors) for anchors in self._anchors.values())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._anchors
+
+    def set_anchors(self, key: str, anchors: Iterable[Anchor]):
+        """Replaces the anchors stored for `key`."""
+        self.remove(key)
+        anchors = list(anchors)
+        if not anchors:
+            return
+
+        self._anchors[key] = anchors
+        for anchor_id, x, y in anchors:
+            bucket = self._cells.setdefault(self._cell(x, y), {})
+            bucket[(key, anchor_id)] = (x, y)
+
+    def remove(self, key: str):
+        anchors = self._anchors.pop(key, None)
+        if not anchors:
+            return
+
+        for anchor_id, x, y in anchors:
+            cell = self._cell(x, y)
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                continue
+            bucket.pop((key, anchor_id), None)
+            if not bucket:
+                del self._cells[cell]
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        radius: float,
+        exclude: Optional[Set[str]] = None,
+    ) -> Optional[AnchorHit]:
+        """
+        Returns the anchor closest to (x, y) that lies strictly within
+        `radius`, or None. Keys in `exclude` are skipped.
+        """
+        x0, y0 = self._cell(x - radius, y - radius)
+        x1, y1 = self._cell(x + radius, y + radius)
+
+        best: Optional[AnchorHit] = None
+        best_dist = radius
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for (key, anchor_id), (ax, ay) in bucket.items():
+                    if exclude and key in exclude:
+                        continue
+                    dist = math.hypot(x - ax, y - ay)
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = (key, anchor_id, ax, ay, dist)
+        return best
+
+    def _cell(self, x: float, y: float) -> Cell:
+        size = self.cell_size
+        return (math.floor(x / size), math.floor(y / size))
@@ -0,0 +1,78 @@
+from dataclasses import dataclass, field, fields
+from typing import Iterable, Set
+
+# Flags whose field name doubles as the topic listeners subscribe to
+_FLAG_TOPICS = (
+    "order",
+    "view",
+    "selection",
+    "tool",
+    "theme",
+    "drawer",
+    "modifiers",
+    "overlay",
+    "history",
+    "files",
+)
+
+TOPICS = frozenset(("shapes",) + _FLAG_TOPICS)
+
+
+@dataclass
+class ChangeSet:
+    """
+    Describes what changed since the last AppState.notify().
+
+    Listeners subscribe to topics ("shapes", "view", "selection", ...) and
+    receive the change set, so they can skip or narrow their work instead
+    of re-rendering on every notification.
+    """
+
+    added: Set[str] = field(default_factory=set)
+    removed: Set[str] = field(default_factory=set)
+    modified: Set[str] = field(default_factory=set)
+    # The whole shape list was replaced (undo/redo, file switch)
+    document: bool = False
+    order: bool = False  # z-order or grouping
+    view: bool = False  # pan, zoom, grid or canvas size
+    selection: bool = False
+    tool: bool = False  # active tool or its options
+    theme: bool = False
+    drawer: bool = False  # side drawer tab or layer tree expansion
+    modifiers: bool = False  # keyboard modifiers (shift)
+    overlay: bool = False  # transient tool feedback only
+    history: bool = False  # undo/redo stacks
+    files: bool = False  # file list or current file
+
+    @classmethod
+    def everything(cls) -> "ChangeSet":
+        """A change set that touches every topic (used for plain notify())."""
+        return cls(**{name: True for name in ("document",) + _FLAG_TOPICS})
+
+    @property
+    def shapes_changed(self) -> bool:
+        return bool(self.document or self.added or self.removed or self.modified)
+
+    def topics(self) -> Set[str]:
+        touched = {name for name in _FLAG_TOPICS if getattr(self, name)}
+        if self.shapes_changed:
+            touched.add("shapes")
+        if self.document:
+            touched.add("order")
+        return touched
+
+    def touches(self, topics: Iterable[str]) -> bool:
+        return not self.topics().isdisjoint(topics)
+
+    def is_empty(self) -> bool:
+        return not self.topics()
+
+    def merge(self, other: "ChangeSet") -> "ChangeSet":
+        """Folds `other` into this change set in place and returns it."""
+        for f in fields(self):
+            value = getattr(other, f.name)
+            if isinstance(value, set):
+                getattr(self, f.name).update(value)
+            elif value:
+                setattr(self, f.name, True)
+        return self
@@ -0,0 +1,239 @@
+import copy
+import sys
+import zlib
+from array import array
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, Optional, Tuple
+
+from ..models import PointArray, Shape
+
+if TYPE_CHECKING:
+    from ..models import Group
+    from ..storage.history_journal import HistoryJournal
+
+# ("insert" | "pop", parent group or None for top level, index, shape)
+Op = Tuple[Literal["insert", "pop"], Optional["Group"], int, Shape]
+
+# Rough per-entry overhead of a recorded op or field (tuple, dict slot)
+_ENTRY_OVERHEAD = 64
+
+
+class PackedPoints:
+    """A recorded PointArray value, zlib-compressed until it is needed."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, points: PointArray):
+        self.data = zlib.compress(points.coords.tobytes())
+
+    def unpack(self) -> PointArray:
+        coords = array("d")
+        coords.frombytes(zlib.decompress(self.data))
+        return PointArray.from_coords(coords)
+
+
+def value_size(value: Any) -> int:
+    """Approximate bytes held by a recorded value."""
+    if isinstance(value, PointArray):
+        return sys.getsizeof(value.coords)
+    if isinstance(value, PackedPoints):
+        return sys.getsizeof(value.data)
+    if isinstance(value, Shape):
+        return shape_size(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def shape_size(shape: Shape) -> int:
+    """Approximate bytes held by a shape, children included."""
+    return sys.getsizeof(shape.__dict__) + sum(
+        value_size(v) for v in shape.__dict__.values()
+    )
+
+
+class Patch:
+    """
+    One undo step, recorded as the difference it made rather than a copy
+    of the board.
+
+    `fields` keeps, per changed shape, the value each field had before the
+    step. Undo and redo both swap those values with the current ones, so the
+    same patch flips back and forth. `ops` are the structural edits (shapes
+    inserted into or popped from the top level or a group) in the order they
+    happened; undo replays their inverses backwards. Shapes are referenced,
+    not copied, so undo and redo restore the very same objects.
+    """
+
+    __slots__ = ("fields", "ops", "compressed", "version", "_nbytes")
+
+    def __init__(self):
+        self.fields: Dict[str, Tuple[Shape, Dict[str, Any]]] = {}
+        self.ops: List[Op] = []
+        self.compressed = False
+        # Bumped whenever the content changes, so a journal knows what to
+        # rewrite
+        self.version = 0
+        self._nbytes: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.fields) + len(self.ops)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Estimated memory the step keeps alive: recorded values plus shapes
+        it removed from the board (inserted ones live in the board).
+        """
+        if self._nbytes is None:
+            size = _ENTRY_OVERHEAD * len(self)
+            for _, values in self.fields.values():
+                size += sum(value_size(v) for v in values.values())
+            for kind, _, _, shape in self.ops:
+                if kind == "pop":
+                    size += shape_size(shape)
+            self._nbytes = size
+        return self._nbytes
+
+    def compress(self):
+        """Packs recorded point buffers; undo/redo unpacks them again."""
+        if self.compressed:
+            return
+        for _, values in self.fields.values():
+            for name, value in values.items():
+                if isinstance(value, PointArray) and value:
+                    values[name] = PackedPoints(value)
+        self.compressed = True
+        self._nbytes = None
+
+    def record_field(self, shape: Shape, name: str, in_place: bool = False):
+        """
+        Keeps the current value of `name` unless one was already recorded.
+        In-place edits keep a copy, since the object itself will change.
+        """
+        self._nbytes = None
+        self.version += 1
+        entry = self.fields.get(shape.id)
+        if entry is None:
+            entry = self.fields[shape.id] = (shape, {})
+        values = entry[1]
+        if name not in values:
+            value = shape.__dict__[name]
+            values[name] = copy.copy(value) if in_place else value
+
+    def record_op(self, kind: str, parent: Optional["Group"], index: int, shape):
+        self._nbytes = None
+        self.version += 1
+        self.ops.append((kind, parent, index, shape))  # type: ignore
+
+    def swap_fields(self) -> List[Shape]:
+        """
+        Puts the recorded values back, keeping the current ones in their
+        place for the way back. Returns the shapes that changed.
+        """
+        shapes = []
+        for shape, values in self.fields.values():
+            for name, value in values.items():
+                if isinstance(value, PackedPoints):
+                    value = value.unpack()
+                values[name] = shape.__dict__[name]
+                setattr(shape, name, value)
+            shapes.append(shape)
+        self.compressed = False
+        self.version += 1
+        self._nbytes = None
+        return shapes
+
+
+class StoredPatch:
+    """
+    A step that is only in the board's history journal so far. It is read
+    and turned into a Patch (see decode_patch) when undo or redo reaches it.
+    """
+
+    __slots__ = ("journal", "offset")
+
+    compressed = True  # Costs no memory to speak of
+    nbytes = _ENTRY_OVERHEAD
+    version = 0
+
+    def __init__(self, journal: "HistoryJournal", offset: int):
+        self.journal = journal
+        self.offset = offset
+
+    def load(self) -> dict:
+        return self.journal.read(self.offset)
+
+
+def _encode_value(name: str, value: Any, serialize_shape: Callable) -> Any:
+    if isinstance(value, PackedPoints):
+        value = value.unpack()
+    if isinstance(value, PointArray):
+        return value.tolist()
+    if name == "children":
+        return [serialize_shape(child) for child in value]
+    return value
+
+
+def encode_patch(
+    patch: Patch,
+    serialize_shape: Callable[[Shape], dict],
+    is_attached: Callable[[Shape], bool],
+) -> dict:
+    """
+    JSON-ready form of a patch. Shapes are referred to by id; those not on
+    the board (removed by the step, or added by an undone one) are stored
+    whole so they can be brought back.
+    """
+    shapes: Dict[str, dict] = {}
+    ops = []
+    for kind, parent, index, shape in patch.ops:
+        for s in (parent, shape):
+            if s is not None and s.id not in shapes and not is_attached(s):
+                shapes[s.id] = serialize_shape(s)
+        ops.append([kind, parent.id if parent is not None else None, index, shape.id])
+    fields = {
+        shape_id: {
+            name: _encode_value(name, value, serialize_shape)
+            for name, value in values.items()
+        }
+        for shape_id, (_, values) in patch.fields.items()
+    }
+    return {"fields": fields, "ops": ops, "shapes": shapes}
+
+
+def decode_patch(
+    record: dict,
+    deserialize_shape: Callable[[dict], Shape],
+    get_shape: Callable[[str], Optional[Shape]],
+) -> Patch:
+    """
+    Rebuilds a Patch from encode_patch() output against the current board.
+    References to shapes that can no longer be found are dropped.
+    """
+    patch = Patch()
+    stored = record.get("shapes", {})
+    resolved: Dict[str, Optional[Shape]] = {}
+
+    def resolve(shape_id: str) -> Optional[Shape]:
+        if shape_id not in resolved:
+            shape = get_shape(shape_id)
+            if shape is None and shape_id in stored:
+                shape = deserialize_shape(copy.deepcopy(stored[shape_id]))
+            resolved[shape_id] = shape
+        return resolved[shape_id]
+
+    for shape_id, values in record.get("fields", {}).items():
+        shape = resolve(shape_id)
+        if shape is None:
+            continue
+        if "children" in values:
+            values["children"] = [deserialize_shape(c) for c in values["children"]]
+        patch.fields[shape_id] = (shape, values)
+
+    for kind, parent_id, index, shape_id in record.get("ops", []):
+        shape = resolve(shape_id)
+        parent = resolve(parent_id) if parent_id is not None else None
+        if shape is None or (parent_id is not None and parent is None):
+            continue
+        patch.ops.append((kind, parent, index, shape))  # type: ignore
+    return patch
@@ -0,0 +1,123 @@
+import math
+from typing import Dict, Iterator, Set, Tuple
+
+from ..models import Bounds
+
+Cell = Tuple[int, int]
+
+
+class SpatialIndex:
+    """
+    Uniform grid over world space.
+
+    Each key (a shape id) is stored in every cell its bounding box overlaps,
+    so point and rectangle queries only look at the few cells they touch
+    instead of every shape on the board. Keys whose bounds would span more
+    than `max_cells` cells are kept in a separate "oversized" set that is
+    checked on every query, which keeps huge shapes from bloating the grid.
+    """
+
+    def __init__(self, cell_size: float = 256.0, max_cells: int = 1024):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._bounds: Dict[str, Bounds] = {}
+        self._oversized: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._bounds
+
+    def clear(self):
+        self._cells.clear()
+        self._bounds.clear()
+        self._oversized.clear()
+
+    def get_bounds(self, key: str) -> Bounds | None:
+        return self._bounds.get(key)
+
+    def insert(self, key: str, bounds: Bounds):
+        if key in self._bounds:
+            self.remove(key)
+
+        self._bounds[key] = bounds
+        x0, y0, x1, y1 = self._cell_range(bounds)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            self._oversized.add(key)
+            return
+
+        for cell in self._iter_cells(x0, y0, x1, y1):
+            self._cells.setdefault(cell, set()).add(key)
+
+    def update(self, key: str, bounds: Bounds):
+        if self._bounds.get(key) == bounds:
+            return
+        self.insert(key, bounds)
+
+    def remove(self, key: str):
+        bounds = self._bounds.pop(key, None)
+        if bounds is None:
+            return
+
+        if key in self._oversized:
+            self._oversized.discard(key)
+            return
+
+        for cell in self._iter_cells(*self._cell_range(bounds)):
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                continue
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+
+    def query_rect(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> Set[str]:
+        """Returns the keys whose bounds intersect the given rectangle."""
+        found: Set[str] = set()
+        x0, y0, x1, y1 = self._cell_range((min_x, min_y, max_x, max_y))
+
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            # Query covers more cells than are populated; walk the grid instead
+            candidates: Set[str] = set()
+            for (cx, cy), bucket in self._cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    candidates.update(bucket)
+        else:
+            candidates = set()
+            for cell in self._iter_cells(x0, y0, x1, y1):
+                bucket = self._cells.get(cell)
+                if bucket:
+                    candidates.update(bucket)
+
+        candidates.update(self._oversized)
+
+        for key in candidates:
+            bx0, by0, bx1, by1 = self._bounds[key]
+            if bx0 <= max_x and bx1 >= min_x and by0 <= max_y and by1 >= min_y:
+                found.add(key)
+        return found
+
+    def query_point(self, x: float, y: float, tolerance: float = 0.0) -> Set[str]:
+        """Returns the keys whose bounds are within `tolerance` of (x, y)."""
+        return self.query_rect(
+            x - tolerance, y - tolerance, x + tolerance, y + tolerance
+        )
+
+    def _cell_range(self, bounds: Bounds) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return (
+            math.floor(bounds[0] / size),
+            math.floor(bounds[1] / size),
+            math.floor(bounds[2] / size),
+            math.floor(bounds[3] / size),
+        )
+
+    @staticmethod
+    def _iter_cells(x0: int, y0: int, x1: int, y1: int) -> Iterator[Cell]:
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                yield (cx, cy)
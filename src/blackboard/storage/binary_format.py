@@ -0,0 +1,173 @@
+"""
+Binary board format, for pen-heavy boards whose points dominate the file.
+
+Layout (little-endian):
+
+    magic      b"BBRD"
+    version    u16
+    flags      u16   bit 0: points stored as float32 instead of float64
+    table_len  u32   length of the table that follows
+    coords     u64   number of point coordinates in the point block
+    table      compact JSON: everything but the shapes ("view", "revision",
+               ...), "styles", a table of the distinct style field sets, and
+               "shapes", each with only its own fields plus a "style"
+               index; points are replaced by [start, count] into the block
+    points     the x, y coordinates of every shape, back to back
+
+Styles repeat across a board far more than anything else, so they (and the
+strings in them: colors, fonts, joins) are stored once. The table stays JSON
+so it is parsed by the json module in C; only the points are packed.
+"""
+
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Tuple
+
+from ..models import PointArray
+from . import codec
+
+# Boards saved under this extension are written in this format
+SUFFIX = ".bboard"
+
+MAGIC = b"BBRD"
+VERSION = 1
+FLAG_FLOAT32 = 1
+
+_HEADER = struct.Struct("<4sHHIQ")
+
+# Fields shared by many shapes; each shape refers to its set by index
+STYLE_FIELDS = frozenset(
+    (
+        "type",
+        "stroke_color",
+        "stroke_width",
+        "filled",
+        "fill_color",
+        "stroke_dash_array",
+        "opacity",
+        "stroke_join",
+        "tension",
+        "polygon_type",
+        "line_type",
+        "font_size",
+        "font_weight",
+        "italic",
+        "underline",
+        "font_family",
+    )
+)
+
+
+def is_binary(data: bytes) -> bool:
+    return data[: len(MAGIC)] == MAGIC
+
+
+def encode_board(path: str, document: Dict[str, Any], pretty: bool = False) -> bytes:
+    """
+    Encodes a board in the format its file name calls for. JSON documents
+    must already be JSON-ready (see codec.encode_shape).
+    """
+    if path.endswith(SUFFIX):
+        return dumps(document)
+    return codec.dumps(document, pretty)
+
+
+def decode_board(data: bytes) -> Any:
+    """Decodes a board file of either format, told apart by its magic bytes."""
+    return loads(data) if is_binary(data) else codec.loads(data)
+
+
+class _Encoder:
+    def __init__(self):
+        self.styles: List[dict] = []
+        self._style_index: Dict[tuple, int] = {}
+        self.coords = array("d")
+
+    def shape(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        record: Dict[str, Any] = {}
+        style = {}
+        for name, value in data.items():
+            if name in STYLE_FIELDS:
+                style[name] = value
+            elif name == "points" and value is not None:
+                if not isinstance(value, PointArray):
+                    value = PointArray(value)
+                record[name] = [len(self.coords) // 2, len(value)]
+                self.coords.extend(value.coords)
+            elif name == "children":
+                record[name] = [self.shape(child) for child in value]
+            else:
+                record[name] = value
+        key = tuple(
+            (k, tuple(v) if isinstance(v, list) else v) for k, v in style.items()
+        )
+        index = self._style_index.get(key)
+        if index is None:
+            index = self._style_index[key] = len(self.styles)
+            self.styles.append(style)
+        record["style"] = index
+        return record
+
+
+def dumps(document: Dict[str, Any], float32: bool = False) -> bytes:
+    """
+    Encodes a board document ({"view": ..., "shapes": [...], ...}). Shapes
+    are encode_shape() dicts; their points may be PointArrays or lists of
+    pairs.
+    """
+    encoder = _Encoder()
+    table = {k: v for k, v in document.items() if k != "shapes"}
+    table["shapes"] = [encoder.shape(shape) for shape in document["shapes"]]
+    table["styles"] = encoder.styles
+    table_bytes = codec.dumps(table)
+
+    coords = encoder.coords
+    if float32:
+        coords = array("f", coords)
+    if sys.byteorder == "big":
+        coords.byteswap()
+    flags = FLAG_FLOAT32 if float32 else 0
+    header = _HEADER.pack(MAGIC, VERSION, flags, len(table_bytes), len(coords))
+    return header + table_bytes + coords.tobytes()
+
+
+def loads(data: bytes) -> Dict[str, Any]:
+    """Decodes dumps() output; points come back as PointArrays."""
+    if len(data) < _HEADER.size or not is_binary(data):
+        raise ValueError("Not a binary board")
+    _, version, flags, table_len, count = _HEADER.unpack_from(data)
+    if version > VERSION:
+        raise ValueError(f"Unsupported binary board version {version}")
+
+    start = _HEADER.size
+    table = codec.loads(data[start : start + table_len])
+    start += table_len
+    coords = array("f" if flags & FLAG_FLOAT32 else "d")
+    end = start + count * coords.itemsize
+    if len(data) < end:
+        raise ValueError("Truncated binary board")
+    coords.frombytes(data[start:end])
+    if sys.byteorder == "big":
+        coords.byteswap()
+    if coords.typecode != "d":
+        coords = array("d", coords)
+
+    styles: List[dict] = table.pop("styles")
+    table["shapes"] = [_decode(s, styles, coords) for s in table["shapes"]]
+    return table
+
+
+def _decode(record: Dict[str, Any], styles: List[dict], coords: array) -> dict:
+    shape = dict(styles[record.pop("style")])
+    points: Tuple[int, int] = record.pop("points", None)  # type: ignore
+    children = record.pop("children", None)
+    shape.update(record)
+    if points is not None:
+        first, count = points
+        shape["points"] = PointArray.from_coords(
+            coords[first * 2 : (first + count) * 2]
+        )
+    if children is not None:
+        shape["children"] = [_decode(c, styles, coords) for c in children]
+    return shape
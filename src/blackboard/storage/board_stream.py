@@ -0,0 +1,165 @@
+"""
+Incremental board loading.
+
+The board file is read and parsed in one go (the JSON and binary parsers run
+in C), but turning the parsed records into shapes is most of the cost of
+opening a large board. A BoardStream hands the shapes over in chunks,
+starting with those inside the viewport, so they can be shown while the rest
+are still being decoded.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..models import PointArray, Shape
+
+Bounds = Tuple[float, float, float, float]
+
+# Shapes in the first chunk; later chunks double in size, so a board of n
+# shapes arrives in O(log n) chunks
+FIRST_CHUNK = 500
+
+
+class BoardStream:
+    """
+    A board read from disk whose shapes are not decoded yet. Use either
+    chunks() or read_all(), once.
+    """
+
+    def __init__(
+        self,
+        shapes_data: List[Dict[str, Any]],
+        view: Dict[str, Any],
+        decode: Callable[[Dict[str, Any]], Shape],
+        on_complete: Optional[Callable[[List[Shape]], None]] = None,
+    ):
+        self.view = view
+        self.count = len(shapes_data)
+        self._data = shapes_data
+        self._decode = decode
+        # Called with every shape, in board order, once all are decoded
+        self._on_complete = on_complete
+
+    def read_all(self) -> List[Shape]:
+        shapes = [self._decode(data) for data in self._data]
+        self._complete(shapes)
+        return shapes
+
+    def chunks(
+        self, viewport: Optional[Bounds] = None, first: int = FIRST_CHUNK
+    ) -> Iterator[List[Tuple[int, Shape]]]:
+        """
+        Yields lists of (position in the board, shape). Top-level shapes
+        that meet the `viewport` world rectangle come first, in board order,
+        then the rest. Only the first chunk's worth of the board is scanned
+        before it is decoded.
+        """
+        shapes: List[Any] = [None] * self.count
+        size = first
+        chunk: List[Tuple[int, Shape]] = []
+        for positions in self._order(viewport, first):
+            for i in positions:
+                shape = shapes[i] = self._decode(self._data[i])
+                chunk.append((i, shape))
+                if len(chunk) == size:
+                    yield chunk
+                    chunk = []
+                    size *= 2
+            # The first run is what is on screen; hand it over as soon as
+            # it is decoded
+            if chunk:
+                yield chunk
+                chunk = []
+                size *= 2
+        self._complete(shapes)
+
+    def _order(self, viewport: Optional[Bounds], first: int) -> Iterator[List[int]]:
+        """
+        Yields the positions to decode: the first `first` visible ones,
+        found without looking at the whole board, then everything else with
+        what is visible first.
+        """
+        if viewport is None:
+            yield list(range(self.count))
+            return
+
+        visible: List[int] = []
+        scanned = 0
+        for scanned, data in enumerate(self._data, 1):
+            if _intersects(_rough_bounds(data), viewport):
+                visible.append(scanned - 1)
+                if len(visible) == first:
+                    break
+        yield visible
+
+        done = bytearray(self.count)
+        for i in visible:
+            done[i] = 1
+        rest = [
+            i
+            for i in range(scanned, self.count)
+            if _intersects(_rough_bounds(self._data[i]), viewport)
+        ]
+        for i in rest:
+            done[i] = 1
+        yield rest + [i for i in range(self.count) if not done[i]]
+
+    def _complete(self, shapes: List[Shape]):
+        self._data = []
+        if self._on_complete is not None:
+            self._on_complete(shapes)
+
+
+def _intersects(bounds: Optional[Bounds], rect: Bounds) -> bool:
+    return (
+        bounds is not None
+        and bounds[0] <= rect[2]
+        and bounds[2] >= rect[0]
+        and bounds[1] <= rect[3]
+        and bounds[3] >= rect[1]
+    )
+
+
+def _rough_bounds(data: Dict[str, Any]) -> Optional[Bounds]:
+    """
+    A shape's bounds from its encoded fields, without decoding it; close
+    enough to Shape.get_bounds() to tell what is on screen.
+    """
+    shape_type = data.get("type")
+    points = data.get("points")
+    if points is not None:
+        if isinstance(points, PointArray):
+            return points.bounds()
+        if not points:
+            return None
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    if shape_type == "group":
+        found = [_rough_bounds(child) for child in data.get("children", ())]
+        found = [b for b in found if b is not None]
+        if not found:
+            return None
+        return (
+            min(b[0] for b in found),
+            min(b[1] for b in found),
+            max(b[2] for b in found),
+            max(b[3] for b in found),
+        )
+
+    x, y = data.get("x", 0.0), data.get("y", 0.0)
+    if shape_type == "line":
+        x2, y2 = data.get("end_x", 0.0), data.get("end_y", 0.0)
+    elif shape_type == "rectangle":
+        x2, y2 = x + data.get("width", 0.0), y + data.get("height", 0.0)
+    elif shape_type == "circle":
+        radius = data.get("radius", 0.0)
+        x2 = x + data.get("radius_x", radius) * 2
+        y2 = y + data.get("radius_y", radius) * 2
+    elif shape_type == "text":
+        font_size = data.get("font_size", 16.0)
+        x2 = x + len(data.get("content", "")) * font_size * 0.6
+        y2 = y + font_size
+    else:
+        x2, y2 = x, y
+    return (min(x, x2), min(y, y2), max(x, x2), max(y, y2))
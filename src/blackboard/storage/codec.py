@@ -0,0 +1,150 @@
+import dataclasses
+import json
+import types
+import typing
+from typing import Any, Callable, Dict, Tuple, Union
+
+from ..models import (
+    Circle,
+    Group,
+    Line,
+    Path,
+    PointArray,
+    Polygon,
+    Rectangle,
+    Shape,
+    Text,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional: the standard json module is used instead
+
+# Serialized "type" -> shape class
+SHAPE_TYPES: Dict[str, type] = {
+    "shape": Shape,
+    "line": Line,
+    "rectangle": Rectangle,
+    "circle": Circle,
+    "text": Text,
+    "path": Path,
+    "polygon": Polygon,
+    "group": Group,
+}
+
+# How a field's value is converted; everything else is stored as is
+PLAIN = 0
+POINTS = 1  # PointArray <-> list of [x, y]
+CHILDREN = 2  # Nested shapes
+LIST = 3  # A list (or None), copied so the document does not share it
+
+FieldTable = Tuple[Tuple[str, int], ...]
+
+_TABLES: Dict[type, FieldTable] = {}
+# Per class: (field name, kind, default factory)
+_DECODE_TABLES: Dict[type, Tuple[Tuple[str, int, Callable[[], Any]], ...]] = {}
+
+
+def _kind(tp: Any) -> int:
+    if tp is PointArray:
+        return POINTS
+    origin = typing.get_origin(tp)
+    if origin is Union or origin is types.UnionType:
+        kinds = [_kind(arg) for arg in typing.get_args(tp) if arg is not type(None)]
+        return max(kinds, default=PLAIN)
+    if origin is list:
+        args = typing.get_args(tp)
+        if args and isinstance(args[0], type) and issubclass(args[0], Shape):
+            return CHILDREN
+        return LIST
+    return PLAIN
+
+
+def field_table(cls: type) -> FieldTable:
+    """(field name, kind) for every dataclass field of a shape class."""
+    table = _TABLES.get(cls)
+    if table is None:
+        hints = typing.get_type_hints(cls)
+        table = _TABLES[cls] = tuple(
+            (f.name, _kind(hints.get(f.name, f.type))) for f in dataclasses.fields(cls)
+        )
+    return table
+
+
+def _default(f: dataclasses.Field) -> Callable[[], Any]:
+    if f.default_factory is not dataclasses.MISSING:
+        return f.default_factory
+    default = f.default
+    return lambda: default
+
+
+def _decode_table(cls: type):
+    table = _DECODE_TABLES.get(cls)
+    if table is None:
+        defaults = {f.name: _default(f) for f in dataclasses.fields(cls)}
+        table = _DECODE_TABLES[cls] = tuple(
+            (name, kind, defaults[name]) for name, kind in field_table(cls)
+        )
+    return table
+
+
+def encode_shape(shape: Shape) -> Dict[str, Any]:
+    """JSON-ready dict of a shape's fields, children included."""
+    values = shape.__dict__
+    data = {}
+    for name, kind in field_table(type(shape)):
+        value = values[name]
+        if kind and value is not None:
+            if kind == POINTS:
+                value = value.tolist()
+            elif kind == CHILDREN:
+                value = [encode_shape(child) for child in value]
+            else:
+                value = list(value)
+        data[name] = value
+    return data
+
+
+def decode_shape(data: Dict[str, Any]) -> Shape:
+    """
+    Builds a shape from encode_shape() output (or an older document).
+    The input is left untouched and unknown keys are ignored; PointArray
+    points (from a binary board) are taken over rather than copied.
+    """
+    cls = SHAPE_TYPES.get(data.get("type"), Shape)  # type: ignore
+    if cls is Circle and "radius" in data:
+        # Migration for old circle data that had 'radius'
+        data = {"radius_x": data["radius"], "radius_y": data["radius"], **data}
+    values = {}
+    for name, kind, default in _decode_table(cls):
+        if name not in data:
+            value = default()
+        else:
+            value = data[name]
+            if kind and value is not None:
+                if kind == POINTS:
+                    if not isinstance(value, PointArray):
+                        value = PointArray(value)
+                elif kind == CHILDREN:
+                    value = [decode_shape(child) for child in value]
+                else:
+                    value = list(value)
+        values[name] = value
+    return cls.from_fields(values)
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Compact JSON (indented if `pretty`), through orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2).encode()
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parses JSON; raises ValueError (json.JSONDecodeError) on bad input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,70 @@
+"""
+Converts boards between JSON and the binary format:
+
+    python -m blackboard.storage.convert data/sketch.json data/sketch.bboard
+
+The output format follows the output file's extension (see binary_format).
+"""
+
+import argparse
+import os
+from typing import List, Optional
+
+from . import binary_format, codec, op_log
+
+
+def convert_board(src: str, dst: str, float32: bool = False, pretty: bool = False):
+    """
+    Writes the board at `src` to `dst`. Operations logged since the source's
+    base snapshot are applied first, so `dst` holds the whole board.
+    """
+    with open(src, "rb") as f:
+        document = binary_format.decode_board(f.read())
+    if isinstance(document, list):  # Oldest format: just the shapes
+        document = {"shapes": document}
+
+    shapes = document.get("shapes", [])
+    view = document.get("view", {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0})
+    ops, _ = op_log.read_log(op_log.log_path(src), document.get("revision"))
+    view = op_log.apply_ops(shapes, view, ops)
+    document = {"view": view, "shapes": shapes}
+
+    if dst.endswith(binary_format.SUFFIX):
+        data = binary_format.dumps(document, float32=float32)
+    else:
+        # Points decoded from a binary board are PointArrays
+        document["shapes"] = [
+            codec.encode_shape(codec.decode_shape(shape)) for shape in shapes
+        ]
+        data = codec.dumps(document, pretty)
+
+    tmp_path = dst + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dst)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Convert a board between JSON and the binary format."
+    )
+    parser.add_argument("src", help="board to read (either format)")
+    parser.add_argument(
+        "dst", help=f"board to write; binary if it ends in {binary_format.SUFFIX}"
+    )
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="store points as float32 (binary output only; halves their size)",
+    )
+    parser.add_argument("--pretty", action="store_true", help="indent JSON output")
+    args = parser.parse_args(argv)
+    convert_board(args.src, args.dst, float32=args.float32, pretty=args.pretty)
+    print(
+        f"{args.src} ({os.path.getsize(args.src):,} bytes) -> "
+        f"{args.dst} ({os.path.getsize(args.dst):,} bytes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
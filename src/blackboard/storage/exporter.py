@@ -56,40 +56,7 @@ class Exporter:
 
     def _get_bounds(self, shape: Shape) -> Tuple[float, float, float, float] | None:
         """Returns (min_x, min_y, max_x, max_y)"""
-        if isinstance(shape, Line):
-            return (
-                min(shape.x, shape.end_x),
-                min(shape.y, shape.end_y),
-                max(shape.x, shape.end_x),
-                max(shape.y, shape.end_y),
-            )
-        elif isinstance(shape, Rectangle):
-            return (
-                shape.x,
-                shape.y,
-                shape.x + shape.width,
-                shape.y + shape.height,
-            )
-        elif isinstance(shape, Circle):
-            return (
-                shape.x,
-                shape.y,
-                shape.x + (shape.radius_x * 2),
-                shape.y + (shape.radius_y * 2),
-            )
-        elif isinstance(shape, Text):
-            # Estimate text size (rough approximation without font metrics)
-            # Assuming ~0.6 * font_size width per char
-            w = len(shape.content) * shape.font_size * 0.6
-            h = shape.font_size
-            return (shape.x, shape.y, shape.x + w, shape.y + h)
-        elif isinstance(shape, Path) or isinstance(shape, Polygon):
-            if not shape.points:
-                return None
-            xs = [p[0] for p in shape.points]
-            ys = [p[1] for p in shape.points]
-            return (min(xs), min(ys), max(xs), max(ys))
-        return None
+        return shape.bounds
 
     def _draw_shape(
         self, draw: ImageDraw.ImageDraw, shape: Shape, off_x: float, off_y: float
@@ -183,7 +150,10 @@ class Exporter:
         elif isinstance(shape, Path) or isinstance(shape, Polygon):
             if not shape.points:
                 return
-            points = [(p[0] + off_x, p[1] + off_y) for p in shape.points]
+            # Flat [x0, y0, x1, y1, ...] coordinates, which PIL accepts as is
+            moved = shape.points.copy()
+            moved.translate(off_x, off_y)
+            points = moved.coords.tolist()
 
             if isinstance(shape, Polygon):
                 # Polygon is closed
@@ -192,7 +162,7 @@ class Exporter:
                 )  # width not supported in polygon for outline?
                 # Draw outline manually if width > 1
                 if width >= 1 and stroke_color:
-                    points.append(points[0])
+                    points.extend(points[:2])
                     draw.line(points, fill=stroke_color, width=width)
             else:
                 # Path is open
@@ -0,0 +1,182 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..state.history import StoredPatch
+from . import codec
+
+STACKS = ("undo", "redo")
+
+# Rewrite the journal once it holds this many more records than live steps
+COMPACT_SLACK = 64
+
+# A step as handed to sync(): (step, its version, JSON payload or None)
+Entry = Tuple[object, int, Optional[bytes]]
+
+
+class HistoryJournal:
+    """
+    Append-only log of a board's undo and redo stacks, kept next to the
+    board file so its history survives restarts and file switches.
+
+    Every line is one stack operation: "push <stack> <json step>",
+    "pop <stack>" or "drop <stack>" (the oldest step was evicted). Loading
+    only replays the operations and remembers where each live step starts;
+    steps are parsed when undo or redo reaches them (see StoredPatch). The
+    file is rewritten with just the live steps once dead records pile up.
+
+    sync() runs on the save writer thread; read() may run concurrently on
+    the UI thread, hence the lock.
+    """
+
+    def __init__(self, path: str, board_path: str):
+        self.path = path
+        self.board_path = board_path
+        # Per stack, what the file holds: [step, step version, line offset]
+        self._entries: Dict[str, List[list]] = {name: [] for name in STACKS}
+        self._records = 0
+        self._lock = threading.RLock()
+
+    def load(self) -> Tuple[List[StoredPatch], List[StoredPatch]]:
+        """Reads the journal; returns placeholder (undo, redo) stacks."""
+        with self._lock:
+            self._entries = {name: [] for name in STACKS}
+            self._records = 0
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    offset = 0
+                    for line in f:
+                        self._replay(line, offset)
+                        offset += len(line)
+            undo, redo = ([entry[0] for entry in self._entries[n]] for n in STACKS)
+            return undo, redo
+
+    def _replay(self, line: bytes, offset: int):
+        parts = line.split(b" ", 2)
+        if len(parts) < 2:
+            return  # Torn write at the end of the file
+        op, name = parts[0].decode(), parts[1].strip().decode()
+        entries = self._entries.get(name)
+        if entries is None:
+            return
+        self._records += 1
+        if op == "push":
+            entries.append([StoredPatch(self, offset), 0, offset])
+        elif op == "pop" and entries:
+            entries.pop()
+        elif op == "drop" and entries:
+            entries.pop(0)
+
+    def read(self, offset: int) -> dict:
+        return codec.loads(self._payload_at(offset))
+
+    def _payload_at(self, offset: int) -> bytes:
+        with self._lock, open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.readline().split(b" ", 2)[2].rstrip(b"\n")
+
+    def sync(self, stacks: Dict[str, List[Entry]]):
+        """
+        Appends whatever it takes for the journal to match `stacks`
+        ({"undo": [...], "redo": [...]}). Steps handed over before may come
+        without a payload; their line is copied from the file. Unchanged
+        steps are not rewritten. Nothing is written once the board itself
+        is gone.
+        """
+        if not os.path.exists(self.board_path):
+            return
+        with self._lock:
+            # Entries popped by this sync, in case a step is pushed again
+            popped: Dict[int, list] = {}
+            lines: List[Tuple[str, list, bytes]] = []
+            for name in STACKS:
+                entries = self._entries[name]
+                current = stacks[name]
+
+                # Steps evicted from the bottom of the stack
+                present = {id(step) for step, _, _ in current}
+                while entries and id(entries[0][0]) not in present:
+                    entry = entries.pop(0)
+                    popped[id(entry[0])] = entry
+                    lines.append((name, [], b"drop %s\n" % name.encode()))
+
+                keep = 0
+                while (
+                    keep < len(entries)
+                    and keep < len(current)
+                    and entries[keep][0] is current[keep][0]
+                    and entries[keep][1] == current[keep][1]
+                ):
+                    keep += 1
+                for _ in range(len(entries) - keep):
+                    entry = entries.pop()
+                    popped[id(entry[0])] = entry
+                    lines.append((name, [], b"pop %s\n" % name.encode()))
+                for step, version, payload in current[keep:]:
+                    if payload is None:
+                        payload = self._known_payload(step, version, popped)
+                    if payload is None:
+                        continue  # Never handed over; nothing to write
+                    entry = [step, version, 0]
+                    entries.append(entry)
+                    line = b"push %s %s\n" % (name.encode(), payload)
+                    lines.append((name, entry, line))
+
+            if not lines:
+                return
+            self._append(lines)
+            live = sum(len(entries) for entries in self._entries.values())
+            if self._records > 2 * live + COMPACT_SLACK:
+                self.compact()
+
+    def _known_payload(
+        self, step: object, version: int, popped: Dict[int, list]
+    ) -> Optional[bytes]:
+        entry = popped.get(id(step))
+        if entry is not None and entry[0] is step and entry[1] == version:
+            return self._payload_at(entry[2])
+        if isinstance(step, StoredPatch):
+            return self._payload_at(step.offset)
+        return None
+
+    def _append(self, lines: List[Tuple[str, list, bytes]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            for _, entry, line in lines:
+                if entry:
+                    self._set_offset(entry, offset)
+                f.write(line)
+                offset += len(line)
+        self._records += len(lines)
+
+    def compact(self):
+        """Rewrites the journal with only the live steps."""
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+                records = 0
+                for name in STACKS:
+                    for entry in self._entries[name]:
+                        src.seek(entry[2])
+                        line = src.readline()
+                        self._set_offset(entry, dst.tell())
+                        dst.write(line)
+                        records += 1
+            os.replace(tmp_path, self.path)
+            self._records = records
+
+    def delete(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._entries = {name: [] for name in STACKS}
+            self._records = 0
+
+    @staticmethod
+    def _set_offset(entry: list, offset: int):
+        entry[2] = offset
+        if isinstance(entry[0], StoredPatch):
+            entry[0].offset = offset
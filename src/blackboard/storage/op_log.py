@@ -0,0 +1,132 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import codec
+from .snapshot import Frozen, frozen_to_dict
+
+LOG_SUFFIX = ".oplog"
+
+# Once a board's log grows past this many bytes it is folded into a new base
+# snapshot
+COMPACT_THRESHOLD = 256 * 1024
+
+
+def log_path(board_path: str) -> str:
+    return board_path + LOG_SUFFIX
+
+
+def diff_ops(
+    old: List[Frozen], new: List[Frozen], old_view: dict, new_view: dict
+) -> Optional[List[dict]]:
+    """
+    Shape-level operations turning the `old` board into the `new` one:
+
+    - {"op": "remove", "id": ...}
+    - {"op": "add", "index": i, "shape": {...}}
+    - {"op": "patch", "id": ..., "fields": {name: value}}
+    - {"op": "order", "ids": [...]}, only when surviving shapes moved
+    - {"op": "view", "view": {...}}
+
+    Unchanged shapes are found by identity (see SnapshotCache), changed ones
+    are compared field by field. Returns None if the boards cannot be
+    diffed by id (duplicate ids).
+    """
+    old_by_id = {f["id"]: f for f in old}
+    new_ids = [f["id"] for f in new]
+    if len(old_by_id) != len(old) or len(set(new_ids)) != len(new):
+        return None
+
+    ops: List[dict] = []
+    new_set = set(new_ids)
+    removed = [f["id"] for f in old if f["id"] not in new_set]
+    ops.extend({"op": "remove", "id": shape_id} for shape_id in removed)
+
+    order = [f["id"] for f in old if f["id"] in new_set]
+    for index, frozen in enumerate(new):
+        before = old_by_id.get(frozen["id"])
+        if before is None:
+            ops.append({"op": "add", "index": index, "shape": frozen_to_dict(frozen)})
+            order.insert(index, frozen["id"])
+        elif before is not frozen:
+            changed = {
+                name: value
+                for name, value in frozen.items()
+                if name not in before or before[name] != value
+            }
+            if changed:
+                fields = frozen_to_dict(changed)
+                ops.append({"op": "patch", "id": frozen["id"], "fields": fields})
+    if order != new_ids:
+        ops.append({"op": "order", "ids": new_ids})
+    if new_view != old_view:
+        ops.append({"op": "view", "view": new_view})
+    return ops
+
+
+def apply_ops(shapes: List[Dict[str, Any]], view: dict, ops: List[dict]) -> dict:
+    """Replays diff_ops() output onto serialized shapes; returns the view."""
+    for op in ops:
+        kind = op.get("op")
+        if kind == "remove":
+            shapes[:] = [s for s in shapes if s.get("id") != op["id"]]
+        elif kind == "add":
+            shapes.insert(op["index"], op["shape"])
+        elif kind == "patch":
+            for shape in shapes:
+                if shape.get("id") == op["id"]:
+                    shape.update(op["fields"])
+                    break
+        elif kind == "order":
+            by_id = {s.get("id"): s for s in shapes}
+            shapes[:] = [by_id[i] for i in op["ids"] if i in by_id]
+        elif kind == "view":
+            view = op["view"]
+    return view
+
+
+def read_log(path: str, revision: Optional[str]) -> Tuple[List[dict], Optional[int]]:
+    """
+    Operations logged against the base snapshot with `revision`, and how
+    many bytes of log they came from (0 if there is no such log). A log
+    left over from another base (e.g. by a compaction cut short) is
+    ignored. A torn last line is skipped and reported as None bytes, since
+    appending after it would be lost too.
+    """
+    if revision is None or not os.path.exists(path):
+        return [], 0
+    ops: List[dict] = []
+    with open(path, "rb") as f:
+        try:
+            header = codec.loads(f.readline())
+        except ValueError:
+            return [], 0
+        if not isinstance(header, dict) or header.get("revision") != revision:
+            return [], 0
+        for line in f:
+            try:
+                ops.extend(codec.loads(line))
+            except ValueError:
+                return ops, None
+        return ops, f.tell()
+
+
+def start_log(path: str, revision: str) -> int:
+    """Replaces the log with an empty one for `revision`; returns its size."""
+    header = codec.dumps({"revision": revision}) + b"\n"
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(header)
+
+
+def append_log(path: str, ops: List[dict]) -> int:
+    """Appends one save's operations as a line; returns the bytes written."""
+    line = codec.dumps(ops) + b"\n"
+    with open(path, "ab") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(line)
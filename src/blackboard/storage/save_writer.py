@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from . import binary_format, op_log
+from .snapshot import Frozen, frozen_to_dict
+
+if TYPE_CHECKING:
+    from .history_journal import Entry, HistoryJournal
+
+
+class _SaveJob:
+    __slots__ = ("path", "shapes", "view", "due")
+
+    def __init__(self, path: str, shapes: List[Frozen], view: dict, due: float):
+        self.path = path
+        self.shapes = shapes
+        self.view = view
+        self.due = due
+
+
+class SaveWriter:
+    """
+    Writes board documents on a writer thread. Only the latest pending save
+    is kept; it is written once its delay has passed. Files are written to
+    a temp file and renamed over the board, so a crash mid-write leaves the
+    previous version intact rather than a torn one.
+
+    With `use_op_log`, a board whose on-disk state is known (see seed())
+    is saved by appending the shape-level operations since the last save to
+    its op log (see op_log.py). Once the log passes COMPACT_THRESHOLD it is
+    folded into a new base snapshot, still on the writer thread.
+
+    Undo history handed over with submit_history() is journaled right after
+    the next board write (or at once if none is pending), so a journal never
+    runs ahead of its board on disk. Unlike board saves, every history
+    update is kept, in order.
+
+    The thread is started on demand and exits once nothing is pending. It is
+    not a daemon, so a save queued right before exit still reaches disk.
+    """
+
+    def __init__(self, use_op_log: bool = False, pretty: bool = False):
+        self.use_op_log = use_op_log
+        self.pretty = pretty
+        self._cond = threading.Condition()
+        self._pending: Optional[_SaveJob] = None
+        self._history: List[Tuple["HistoryJournal", Dict[str, List["Entry"]]]] = []
+        self._writing = False
+        self._thread: Optional[threading.Thread] = None
+        # Board path -> what its files hold: (frozen shapes, view, base
+        # revision, log bytes). Only touched by the writer once seeded.
+        self._bases: Dict[str, Tuple[List[Frozen], dict, str, int]] = {}
+
+    def seed(
+        self,
+        path: str,
+        shapes: List[Frozen],
+        view: dict,
+        revision: str,
+        log_bytes: int,
+    ):
+        """Records what was just loaded from `path`, so saves can diff."""
+        with self._cond:
+            self._bases[path] = (shapes, view, revision, log_bytes)
+
+    def forget(self, path: Optional[str] = None):
+        """Drops what is known about `path` (all boards if None)."""
+        with self._cond:
+            if path is None:
+                self._bases.clear()
+            else:
+                self._bases.pop(path, None)
+
+    def submit(self, path: str, shapes: List[Frozen], view: dict, delay: float):
+        with self._cond:
+            self._pending = _SaveJob(path, shapes, view, time.monotonic() + delay)
+            if self._thread is None:
+                self._start()
+            self._cond.notify_all()
+
+    def submit_history(
+        self, journal: "HistoryJournal", stacks: Dict[str, List["Entry"]]
+    ):
+        """Queues a journal update (see HistoryJournal.sync)."""
+        with self._cond:
+            self._history.append((journal, stacks))
+            if self._thread is None:
+                self._start()
+            self._cond.notify_all()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="board-save-writer")
+        self._thread.start()
+
+    def flush(self):
+        """Writes the pending save now and waits until nothing is in flight."""
+        with self._cond:
+            if self._pending is not None:
+                self._pending.due = 0.0
+                self._cond.notify_all()
+            while self._pending is not None or self._history or self._writing:
+                self._cond.wait()
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            # Also reached if the thread dies, so a later submit() or a
+            # waiting flush() is not left without a writer
+            with self._cond:
+                self._thread = None
+                self._writing = False
+                if self._pending is not None or self._history:
+                    self._start()
+                self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    job = self._pending
+                    if job is None:
+                        if self._history:
+                            break
+                        return
+                    delay = job.due - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                self._pending = None
+                history, self._history = self._history, []
+                self._writing = True
+            try:
+                if job is not None:
+                    self._write(job)
+                for journal, stacks in history:
+                    self._write_history(journal, stacks)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, job: _SaveJob):
+        try:
+            if not self.use_op_log or not self._append(job):
+                self._write_base(job)
+        except Exception as e:
+            # The board on disk is unchanged; diff the next save against it
+            # afresh rather than against what failed to be written
+            self.forget(job.path)
+            print(f"Error saving file: {e}")
+
+    def _write_history(
+        self, journal: "HistoryJournal", stacks: Dict[str, List["Entry"]]
+    ):
+        try:
+            journal.sync(stacks)
+        except Exception as e:
+            print(f"Error writing history journal: {e}")
+
+    def _append(self, job: _SaveJob) -> bool:
+        """Logs the job as operations; False if a full write is needed."""
+        with self._cond:
+            base = self._bases.get(job.path)
+        if base is None or not os.path.exists(job.path):
+            return False
+        shapes, view, revision, log_bytes = base
+        if log_bytes > op_log.COMPACT_THRESHOLD:
+            return False
+        ops = op_log.diff_ops(shapes, job.shapes, view, job.view)
+        if ops is None:
+            return False
+        path = op_log.log_path(job.path)
+        if ops:
+            if log_bytes == 0:
+                log_bytes = op_log.start_log(path, revision)
+            log_bytes += op_log.append_log(path, ops)
+        with self._cond:
+            self._bases[job.path] = (job.shapes, job.view, revision, log_bytes)
+        return True
+
+    def _write_base(self, job: _SaveJob):
+        revision = uuid.uuid4().hex if self.use_op_log else None
+        if job.path.endswith(binary_format.SUFFIX):
+            # Packs point buffers straight from the snapshot
+            shapes = job.shapes
+        else:
+            shapes = [frozen_to_dict(shape) for shape in job.shapes]
+        full_data = {"view": job.view, "shapes": shapes}
+        if revision is not None:
+            full_data["revision"] = revision
+        tmp_path = job.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(binary_format.encode_board(job.path, full_data, self.pretty))
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # The old log no longer matches the base's revision, so a crash
+        # between these two steps cannot replay it onto the new base
+        os.replace(tmp_path, job.path)
+        log = op_log.log_path(job.path)
+        if os.path.exists(log):
+            os.remove(log)
+        if revision is not None:
+            with self._cond:
+                self._bases[job.path] = (job.shapes, job.view, revision, 0)
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Tuple
+
+from ..models import Group, PointArray, Shape
+from .codec import LIST, POINTS, field_table
+
+# A shape's field values as of the snapshot: point buffers and lists are
+# copies and a group's children are frozen in turn, so later edits to the
+# live shape cannot reach it
+Frozen = Dict[str, Any]
+
+
+class SnapshotCache:
+    """
+    Freezes shapes for saving. A shape that has not changed since the last
+    snapshot (same object, same _version, same frozen children) reuses its
+    frozen copy, so a snapshot costs a dict lookup per unchanged shape.
+    """
+
+    def __init__(self):
+        # shape id -> (shape, _version, frozen)
+        self._frozen: Dict[str, Tuple[Shape, int, Frozen]] = {}
+
+    def freeze(self, shapes: List[Shape]) -> List[Frozen]:
+        fresh: Dict[str, Tuple[Shape, int, Frozen]] = {}
+        frozen = [self._freeze(shape, fresh) for shape in shapes]
+        self._frozen = fresh  # Forget shapes that are gone
+        return frozen
+
+    def _freeze(self, shape: Shape, fresh: dict) -> Frozen:
+        children = None
+        if isinstance(shape, Group):
+            children = [self._freeze(child, fresh) for child in shape.children]
+
+        cached = self._frozen.get(shape.id)
+        if (
+            cached is not None
+            and cached[0] is shape
+            and cached[1] == shape._version
+            and (children is None or _same(children, cached[2]["children"]))
+        ):
+            frozen = cached[2]
+        else:
+            values = shape.__dict__
+            frozen = {}
+            for name, kind in field_table(type(shape)):
+                value = values[name]
+                if value is not None:
+                    if kind == POINTS:
+                        value = value.copy()
+                    elif kind == LIST:
+                        value = list(value)
+                frozen[name] = value
+            if children is not None:
+                frozen["children"] = children
+        fresh[shape.id] = (shape, shape._version, frozen)
+        return frozen
+
+
+def _same(a: List[Frozen], b: List[Frozen]) -> bool:
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+
+def frozen_to_dict(frozen: Frozen) -> Dict[str, Any]:
+    """JSON-ready form of a frozen shape, as StorageService._serialize_shape."""
+    data = {}
+    for name, value in frozen.items():
+        if isinstance(value, PointArray):
+            value = value.tolist()
+        elif name == "children":
+            value = [frozen_to_dict(child) for child in value]
+        elif isinstance(value, list):
+            value = list(value)
+        data[name] = value
+    return data
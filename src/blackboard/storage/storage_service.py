@@ -1,21 +1,37 @@
-import json
 import os
-import threading
-from typing import List, Dict, Any, Optional, Tuple
-from ..models import Shape, Line, Rectangle, Circle, Text, Path, Polygon
-import dataclasses
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+from ..models import Shape
+from . import binary_format, codec
+from . import op_log
+from .board_stream import BoardStream
+from .save_writer import SaveWriter
+from .snapshot import SnapshotCache
+
+if TYPE_CHECKING:
+    from .history_journal import Entry, HistoryJournal
 
 
 DATA_DIR = "data"
 DEFAULT_FILE = "default.json"
+SAVE_DELAY = 1.5  # seconds; edits within it are saved together
+HISTORY_SUFFIX = ".history"
+# Board files: JSON, or the binary format (see binary_format.py)
+BOARD_SUFFIXES = (".json", binary_format.SUFFIX)
+DEFAULT_VIEW = {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}
+EMPTY_BOARD = {"shapes": [], "view": DEFAULT_VIEW}
 
 
 class StorageService:
-    def __init__(self):
+    def __init__(self, use_op_log: bool = False, pretty: bool = False):
+        """
+        With `use_op_log`, saves append shape-level operations to a log next
+        to the board instead of rewriting it (see op_log.py). Boards with a
+        log load the same either way. `pretty` indents saved boards.
+        """
         self._ensure_data_dir()
         self.current_file = self._get_initial_file()
-        self._save_timer: Optional[threading.Timer] = None
-        self._lock = threading.Lock()
+        self._snapshots = SnapshotCache()
+        self._writer = SaveWriter(use_op_log, pretty)
 
     def _ensure_data_dir(self):
         if not os.path.exists(DATA_DIR):
@@ -24,27 +40,29 @@ class StorageService:
     def _get_initial_file(self) -> str:
         for root, _, files in os.walk(DATA_DIR):
             for f in files:
-                if f.endswith(".json"):
+                if f.endswith(BOARD_SUFFIXES):
                     return os.path.join(root, f)
 
         default_path = os.path.join(DATA_DIR, DEFAULT_FILE)
         # Create empty default file if it doesn't exist
         if not os.path.exists(default_path):
-            with open(default_path, "w") as f:
-                json.dump(
-                    {"shapes": [], "view": {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}}, f
-                )
+            self._write_empty_board(default_path)
         return default_path
 
+    @staticmethod
+    def _write_empty_board(path: str):
+        with open(path, "wb") as f:
+            f.write(binary_format.encode_board(path, EMPTY_BOARD))
+
     def list_files(self) -> List[str]:
         """
-        Returns a list of all .json files relative to DATA_DIR.
-        Example: ['default.json', 'folder/project.json']
+        Returns a list of all board files relative to DATA_DIR.
+        Example: ['default.json', 'folder/project.json', 'sketch.bboard']
         """
         file_list = []
         for root, _, files in os.walk(DATA_DIR):
             for f in files:
-                if f.endswith(".json"):
+                if f.endswith(BOARD_SUFFIXES):
                     # Get path relative to DATA_DIR
                     full_path = os.path.join(root, f)
                     rel_path = os.path.relpath(full_path, DATA_DIR)
@@ -65,7 +83,7 @@ class StorageService:
         return sorted(folder_list)
 
     def create_file(self, filename: str) -> str:
-        if not filename.endswith(".json"):
+        if not filename.endswith(BOARD_SUFFIXES):
             filename += ".json"
 
         path = os.path.join(DATA_DIR, filename)
@@ -78,10 +96,8 @@ class StorageService:
         if os.path.exists(path):
             raise FileExistsError(f"File {filename} already exists")
 
-        with open(path, "w") as f:
-            json.dump(
-                {"shapes": [], "view": {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}}, f
-            )
+        self._writer.forget(path)
+        self._write_empty_board(path)
         return path
 
     def create_folder(self, folder_name: str):
@@ -102,7 +118,17 @@ class StorageService:
         if not os.path.exists(path):
             return  # Or raise error
 
+        # A pending save must not bring the file back
+        self._writer.flush()
+
         os.remove(path)
+        self._writer.forget(path)
+        log = op_log.log_path(path)
+        if os.path.exists(log):
+            os.remove(log)
+        journal = path + HISTORY_SUFFIX
+        if os.path.exists(journal):
+            os.remove(journal)
 
         # If we deleted the current file, switch to default or first available
         # We need to normalize paths for comparison
@@ -115,6 +141,8 @@ class StorageService:
     def delete_folder(self, folder_name: str):
         path = os.path.join(DATA_DIR, folder_name)
         if os.path.exists(path) and os.path.isdir(path):
+            self._writer.flush()
+            self._writer.forget()
             # Check if current file is inside this folder
             abs_current = os.path.abspath(self.current_file)
             abs_folder = os.path.abspath(path)
@@ -130,32 +158,75 @@ class StorageService:
         # Return path relative to DATA_DIR
         return os.path.relpath(self.current_file, DATA_DIR)
 
+    def journal_path(self) -> Optional[str]:
+        """
+        Where the current board's undo history is journaled: next to the
+        board, e.g. data/foo.json.history for data/foo.json. None for boards
+        outside DATA_DIR.
+        """
+        rel_path = os.path.relpath(self.current_file, DATA_DIR)
+        if rel_path.startswith(os.pardir):
+            return None
+        return self.current_file + HISTORY_SUFFIX
+
     def load_data(self) -> Tuple[List[Shape], Dict[str, Any]]:
-        if not os.path.exists(self.current_file):
-            return [], {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}
+        stream = self.open_board()
+        try:
+            return stream.read_all(), stream.view
+        except ValueError:
+            return [], dict(DEFAULT_VIEW)
+
+    def open_board(self) -> BoardStream:
+        """
+        Reads the current board, leaving its shapes to be decoded all at
+        once or in chunks (see board_stream.py).
+        """
+        # Read what was last saved, not what the writer has yet to write
+        self._writer.flush()
+        path = self.current_file
+        empty = BoardStream([], dict(DEFAULT_VIEW), self._deserialize_shape)
+        if not os.path.exists(path):
+            return empty
 
         try:
-            with open(self.current_file, "r") as f:
-                raw_data = json.load(f)
+            with open(path, "rb") as f:
+                raw_data = binary_format.decode_board(f.read())
 
-                # Handle backward compatibility (list of shapes)
-                if isinstance(raw_data, list):
-                    shapes = [self._deserialize_shape(item) for item in raw_data]
-                    return shapes, {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}
+            # Handle backward compatibility (list of shapes)
+            if isinstance(raw_data, list):
+                return BoardStream(
+                    raw_data, dict(DEFAULT_VIEW), self._deserialize_shape
+                )
 
-                # Handle new dict structure
-                if isinstance(raw_data, dict):
-                    shapes_data = raw_data.get("shapes", [])
-                    view_data = raw_data.get(
-                        "view", {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}
-                    )
-                    shapes = [self._deserialize_shape(item) for item in shapes_data]
-                    return shapes, view_data
+            # Handle new dict structure
+            if isinstance(raw_data, dict):
+                shapes_data = raw_data.get("shapes", [])
+                view_data = raw_data.get("view", dict(DEFAULT_VIEW))
+                # Operations saved since the base snapshot was written
+                revision = raw_data.get("revision")
+                ops, log_bytes = op_log.read_log(op_log.log_path(path), revision)
+                view_data = op_log.apply_ops(shapes_data, view_data, ops)
+
+                on_complete = None
+                if self._writer.use_op_log and log_bytes is not None and revision:
+
+                    def on_complete(shapes: List[Shape]):
+                        self._writer.seed(
+                            path,
+                            self._snapshots.freeze(shapes),
+                            view_data,
+                            revision,
+                            log_bytes,
+                        )
+
+                return BoardStream(
+                    shapes_data, view_data, self._deserialize_shape, on_complete
+                )
 
-                return [], {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}
+            return empty
 
-        except (json.JSONDecodeError, IOError):
-            return [], {"pan_x": 0.0, "pan_y": 0.0, "zoom": 1.0}
+        except (ValueError, IOError):
+            return empty
 
     def save_data(
         self,
@@ -166,78 +237,34 @@ class StorageService:
         grid_type: str = "none",
         immediate: bool = False,
     ):
-        with self._lock:
-            if self._save_timer:
-                self._save_timer.cancel()
-
-            if immediate:
-                self._perform_save(shapes, pan_x, pan_y, zoom, grid_type)
-            else:
-                # Debounce save: wait 1.5 seconds
-                self._save_timer = threading.Timer(
-                    1.5, self._perform_save, [shapes, pan_x, pan_y, zoom, grid_type]
-                )
-                self._save_timer.start()
-
-    def _perform_save(
-        self,
-        shapes: List[Shape],
-        pan_x: float,
-        pan_y: float,
-        zoom: float,
-        grid_type: str,
-    ):
-        shapes_data = [self._serialize_shape(shape) for shape in shapes]
-        full_data = {
-            "view": {
-                "pan_x": pan_x,
-                "pan_y": pan_y,
-                "zoom": zoom,
-                "grid_type": grid_type,
-            },
-            "shapes": shapes_data,
-        }
-
-        try:
-            with open(self.current_file, "w") as f:
-                json.dump(full_data, f, indent=2)
-        except IOError as e:
-            print(f"Error saving file: {e}")
+        """
+        Saves the board to the current file. Only a snapshot is taken here;
+        serializing and writing happen on the writer thread, after
+        SAVE_DELAY unless `immediate` (which also waits for the write).
+        """
+        view = {"pan_x": pan_x, "pan_y": pan_y, "zoom": zoom, "grid_type": grid_type}
+        self._writer.submit(
+            self.current_file,
+            self._snapshots.freeze(shapes),
+            view,
+            0.0 if immediate else SAVE_DELAY,
+        )
+        if immediate:
+            self._writer.flush()
+
+    def flush(self):
+        """Waits until any pending save has been written."""
+        self._writer.flush()
+
+    def save_history(self, journal: "HistoryJournal", stacks: Dict[str, List["Entry"]]):
+        """
+        Journals undo history on the writer thread, after any pending save
+        of the board (see SaveWriter.submit_history).
+        """
+        self._writer.submit_history(journal, stacks)
 
     def _serialize_shape(self, shape: Shape) -> Dict[str, Any]:
-        return dataclasses.asdict(shape)
+        return codec.encode_shape(shape)
 
     def _deserialize_shape(self, data: Dict[str, Any]) -> Shape:
-        shape_type = data.get("type")
-
-        if shape_type == "line":
-            return Line(**data)
-        elif shape_type == "rectangle":
-            return Rectangle(**data)
-        elif shape_type == "circle":
-            # Migration for old circle data that had 'radius'
-            if "radius" in data:
-                r = data.pop("radius")
-                if "radius_x" not in data:
-                    data["radius_x"] = r
-                if "radius_y" not in data:
-                    data["radius_y"] = r
-            return Circle(**data)
-        elif shape_type == "text":
-            return Text(**data)
-        elif shape_type == "path":
-            if "points" in data:
-                data["points"] = [tuple(p) for p in data["points"]]
-            return Path(**data)
-        elif shape_type == "polygon":
-            if "points" in data:
-                data["points"] = [tuple(p) for p in data["points"]]
-            return Polygon(**data)
-        elif shape_type == "group":
-            from ..models import Group
-
-            children_data = data.pop("children", [])
-            children = [self._deserialize_shape(c) for c in children_data]
-            return Group(children=children, **data)
-        else:
-            return Shape(**data)
+        return codec.decode_shape(data)
@@ -1,13 +1,36 @@
 import flet as ft
 from blackboard.state.app_state import AppState
+from blackboard.state.changes import ChangeSet
 import math
 import flet.canvas as cv
 
 
+# Grid parameters
+BASE_SPACING = 40.0  # World units
+# We want the screen spacing to stay within a comfortable range.
+# Increased minimum spacing to improve performance (especially for dots).
+MIN_SCREEN_SPACING = 50.0
+DOT_RADIUS = 2
+# Limit grid drawing just in case, but adaptive spacing should prevent this
+MAX_LINES = 1000
+
+
 class Background(ft.Stack):
+    """
+    Page background colour plus the optional dot/line grid.
+
+    The grid is drawn as a single points primitive on a canvas one grid cell
+    larger than the page. Panning only slides that canvas by the pan offset
+    modulo the spacing; the primitive itself is rebuilt only when the screen
+    spacing, page size (see AppState.set_view_size), theme or grid type
+    change.
+    """
+
     def __init__(self, app_state: AppState):
         self.app_state = app_state
-        self.grid_canvas = cv.Canvas(expand=True)
+        self.grid_canvas = cv.Canvas(shapes=[], left=0, top=0)
+        # (grid type, screen spacing, width, height, color) of the cached grid
+        self._grid_key: tuple | None = None
         # Background color container
         self.bg_container = ft.Container(
             expand=True,
@@ -19,15 +42,16 @@ class Background(ft.Stack):
         )
 
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        self.app_state.add_listener(self._on_state_change, topics={"view", "theme"})
         # Trigger initial draw if page is available (it should be)
         if self.page:
             self._draw_grid()
+            self.update()
 
     def will_unmount(self):
         self.app_state.remove_listener(self._on_state_change)
 
-    def _on_state_change(self):
+    def _on_state_change(self, changes: ChangeSet):
         self.bg_container.bgcolor = self._get_color()
         self._draw_grid()
         self.update()
@@ -39,119 +63,105 @@ class Background(ft.Stack):
             else ft.Colors.WHITE
         )
 
-    def _draw_grid(self):
-        self.grid_canvas.shapes.clear()
-
-        grid_type = self.app_state.grid_type
-        if grid_type == "none":
-            self.grid_canvas.update()
-            return
-
-        # Grid parameters
-        base_spacing = 40.0  # World units
-
-        # View parameters
+    def _grid_spacing(self) -> float:
+        """Screen-space grid spacing for the current zoom (adaptive grid)."""
         zoom = self.app_state.zoom
-        pan_x = self.app_state.pan_x
-        pan_y = self.app_state.pan_y
-
-        # Adaptive Grid Logic
-        # We want the screen spacing to stay within a comfortable range.
-        # Increased minimum spacing to improve performance (especially for dots).
-        min_screen_spacing = 50.0
-
-        current_screen_spacing = base_spacing * zoom
+        current_screen_spacing = BASE_SPACING * zoom
 
         step_multiplier = 1.0
-        if current_screen_spacing < min_screen_spacing:
-            while (base_spacing * step_multiplier * zoom) < min_screen_spacing:
+        if current_screen_spacing < MIN_SCREEN_SPACING:
+            while (BASE_SPACING * step_multiplier * zoom) < MIN_SCREEN_SPACING:
                 step_multiplier *= 2
-        elif current_screen_spacing > (min_screen_spacing * 2):
+        elif current_screen_spacing > (MIN_SCREEN_SPACING * 2):
             # We want to subdivide as soon as we have enough space for 2 intervals
             # i.e., if we have > 100px, we can split to 50px.
-            while (base_spacing * step_multiplier * zoom) > (min_screen_spacing * 2):
+            while (BASE_SPACING * step_multiplier * zoom) > (MIN_SCREEN_SPACING * 2):
                 step_multiplier /= 2
 
-        effective_spacing = base_spacing * step_multiplier
+        return BASE_SPACING * step_multiplier * zoom
 
-        # Color settings
-        is_dark = self.app_state.theme_mode == "dark"
-        color = ft.Colors.WHITE24 if is_dark else ft.Colors.BLACK12
+    def _draw_grid(self):
+        grid_type = self.app_state.grid_type
+        if grid_type == "none":
+            self._grid_key = None
+            self.grid_canvas.shapes = []
+            return
 
         # We need screen dimensions to know how many lines to draw.
         # If page is not ready, we can't draw effectively.
         if not self.page:
             return
 
-        width = self.page.width
-        height = self.page.height
-
-        # Calculate visible range in world coordinates
-        # Screen (0,0) -> World (-pan_x/zoom, -pan_y/zoom)
-
-        # We align to effective_spacing
-        start_col = math.floor((-pan_x) / (zoom * effective_spacing))
-        end_col = math.ceil((width - pan_x) / (zoom * effective_spacing)) # type: ignore
-
-        start_row = math.floor((-pan_y) / (zoom * effective_spacing))
-        end_row = math.ceil((height - pan_y) / (zoom * effective_spacing)) # type: ignore
-
-        # Limit grid drawing just in case, but adaptive spacing should prevent this
-        max_lines = 1000  # Increased safety limit since density is controlled
-        if (end_col - start_col) > max_lines or (end_row - start_row) > max_lines:
-            pass
-        else:
-            if grid_type == "line":
-                stroke_width = 1
-
-                # Draw vertical lines
-                for col in range(start_col, end_col + 1):
-                    x_world = col * effective_spacing
-                    x_screen = x_world * zoom + pan_x
-                    self.grid_canvas.shapes.append(
-                        cv.Line(
-                            x_screen,
-                            0,
-                            x_screen,
-                            height,
-                            paint=ft.Paint(stroke_width=stroke_width, color=color),
-                        )
-                    )
-
-                # Draw horizontal lines
-                for row in range(start_row, end_row + 1):
-                    y_world = row * effective_spacing
-                    y_screen = y_world * zoom + pan_y
-                    self.grid_canvas.shapes.append(
-                        cv.Line(
-                            0,
-                            y_screen,
-                            width,
-                            y_screen,
-                            paint=ft.Paint(stroke_width=stroke_width, color=color),
-                        )
-                    )
-
-            elif grid_type == "dot":
-                radius = 2
-
-                for col in range(start_col, end_col + 1):
-                    for row in range(start_row, end_row + 1):
-                        x_world = col * effective_spacing
-                        y_world = row * effective_spacing
-
-                        x_screen = x_world * zoom + pan_x
-                        y_screen = y_world * zoom + pan_y
-
-                        self.grid_canvas.shapes.append(
-                            cv.Circle(
-                                x_screen,
-                                y_screen,
-                                radius,
-                                paint=ft.Paint(
-                                    color=color, style=ft.PaintingStyle.FILL
-                                ),
-                            )
-                        )
-
-        self.grid_canvas.update()
+        # The canvas fills the page and reports its size as it changes
+        width, height = self.app_state.view_size or (
+            self.page.width,
+            self.page.height,
+        )
+        spacing = self._grid_spacing()
+
+        # Color settings
+        is_dark = self.app_state.theme_mode == "dark"
+        color = ft.Colors.WHITE24 if is_dark else ft.Colors.BLACK12
+
+        key = (grid_type, spacing, width, height, color)
+        if key != self._grid_key:
+            self._grid_key = key
+            self.grid_canvas.width = width + spacing
+            self.grid_canvas.height = height + spacing
+            self.grid_canvas.shapes = _build_grid_shapes(
+                grid_type, spacing, width + spacing, height + spacing, color
+            )
+
+        # The pattern repeats every `spacing` pixels, so panning only slides
+        # the cached layer within one cell.
+        self.grid_canvas.left = (self.app_state.pan_x % spacing) - spacing
+        self.grid_canvas.top = (self.app_state.pan_y % spacing) - spacing
+
+
+def _build_grid_shapes(
+    grid_type: str, spacing: float, width: float, height: float, color: str
+) -> list:
+    """
+    Grid primitives for a `width` x `height` area with lines (or dots) at
+    multiples of `spacing`, as one cv.Points shape.
+    """
+    cols = math.ceil(width / spacing)
+    rows = math.ceil(height / spacing)
+    if cols > MAX_LINES or rows > MAX_LINES:
+        return []
+
+    xs = [col * spacing for col in range(cols + 1)]
+    ys = [row * spacing for row in range(rows + 1)]
+
+    if grid_type == "line":
+        # Consecutive point pairs form the segments
+        points = []
+        for x in xs:
+            points.append(ft.Offset(x, 0))
+            points.append(ft.Offset(x, height))
+        for y in ys:
+            points.append(ft.Offset(0, y))
+            points.append(ft.Offset(width, y))
+        return [
+            cv.Points(
+                points=points,
+                point_mode=cv.PointMode.LINES,
+                paint=ft.Paint(stroke_width=1, color=color),
+            )
+        ]
+
+    if grid_type == "dot":
+        # Round caps turn each point into a filled dot
+        return [
+            cv.Points(
+                points=[ft.Offset(x, y) for x in xs for y in ys],
+                point_mode=cv.PointMode.POINTS,
+                paint=ft.Paint(
+                    color=color,
+                    stroke_width=DOT_RADIUS * 2,
+                    stroke_cap=ft.StrokeCap.ROUND,
+                ),
+            )
+        ]
+
+    return []
@@ -1,8 +1,11 @@
 import flet as ft
 import flet.canvas as cv
 import flet.core.painting as painting
+import functools
+import itertools
 import math
 from ..state.app_state import AppState
+from ..state.changes import ChangeSet
 from ..models import (
     ToolType,
     Shape,
@@ -23,11 +26,53 @@ from .tools.pen_tool import PenTool
 from .tools.eraser_tool import EraserTool
 from .tools.selection_tool import SelectionTool
 from .tools.box_selection_tool import BoxSelectionTool
+from .geometry import (
+    bucket_max_zoom,
+    simplify_points,
+    spline_segments,
+    transform_points,
+    zoom_bucket,
+)
+from .render_scheduler import RenderScheduler
+
+# Extra screen-space padding around the viewport when culling, so strokes,
+# arrow heads and text that poke outside a shape's geometric bounds still draw.
+CULL_MARGIN = 64
+
+# Pen strokes are simplified until they deviate from the captured points by
+# at most this many screen pixels.
+LOD_TOLERANCE = 0.5
+
+# Change topics that affect the drawn shapes; anything else (tool switches,
+# hover feedback) only needs the overlay redrawn.
+SCENE_TOPICS = frozenset(("shapes", "order", "view", "selection", "theme", "modifiers"))
+CANVAS_TOPICS = SCENE_TOPICS | {"tool", "overlay"}
+
+# Render modes: "screen" projects every point through to_screen in Python;
+# "world" emits primitives in world coordinates once and maps them to the
+# screen with a single offset/scale transform on an inner canvas.
+RENDER_MODE_SCREEN = "screen"
+RENDER_MODE_WORLD = "world"
+
+
+def _batch_renders(handler):
+    """
+    Runs a gesture handler as one state transaction and renders once after
+    it, however often it notified.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, e):
+        with self.render_scheduler.batch(), self.app_state.transaction():
+            return handler(self, e)
+
+    return wrapper
 
 
 class BlackboardCanvas(cv.Canvas):
-    def __init__(self, app_state: AppState):
+    def __init__(self, app_state: AppState, render_mode: str = RENDER_MODE_SCREEN):
         self.app_state = app_state
+        self.render_mode = render_mode
         self.tools = {
             ToolType.LINE: LineTool(self),
             ToolType.RECTANGLE: RectangleTool(self),
@@ -44,6 +89,27 @@ class BlackboardCanvas(cv.Canvas):
             expand=True, bgcolor=ft.Colors.TRANSPARENT
         )
 
+        # Tool feedback (handles, anchors, rubber bands) lives on its own
+        # canvas stacked above the scene, so it can be redrawn by itself.
+        self.overlay_canvas = cv.Canvas(shapes=[], expand=True)
+        layers = [self.overlay_canvas]
+
+        # World mode draws shapes in world coordinates on an inner canvas
+        # under the view transform; overlays stay in screen space.
+        self.world_canvas: cv.Canvas | None = None
+        # World rect the current world_canvas scene was culled against
+        self._scene_rect: tuple[float, float, float, float] | None = None
+        self._scene_zoom_bucket: int | None = None
+        if render_mode == RENDER_MODE_WORLD:
+            self.world_canvas = cv.Canvas(
+                shapes=[],
+                left=0,
+                top=0,
+                scale=ft.Scale(1.0, alignment=ft.alignment.top_left),
+            )
+            layers.insert(0, self.world_canvas)
+        self.gesture_container.content = ft.Stack(controls=layers, expand=True)
+
         super().__init__(
             shapes=[],
             content=ft.GestureDetector(
@@ -57,6 +123,8 @@ class BlackboardCanvas(cv.Canvas):
                 mouse_cursor=ft.MouseCursor.BASIC,
             ),
             expand=True,
+            resize_interval=100,
+            on_resize=self._on_resize,
         )
 
         self.current_drawing_shape: Shape | None = None
@@ -69,12 +137,47 @@ class BlackboardCanvas(cv.Canvas):
 
         self._is_updating_interaction = False
 
+        # shape id -> (cache key, primitives) from the last render
+        self._render_cache: dict[str, tuple] = {}
+        # Primitives for all visible shapes from the last render, reused when
+        # only the overlay changed
+        self._scene_shapes: list | None = None
+        # Path id -> (shape version, {zoom bucket: simplified points})
+        self._lod_cache: dict[str, tuple[int, dict[int, list]]] = {}
+
+        # Last known canvas size in screen pixels (None until first resize)
+        self.view_width: float | None = None
+        self.view_height: float | None = None
+
+        # State notifications are coalesced into at most one render per frame
+        self.render_scheduler = RenderScheduler(self._on_state_change)
+
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        self.app_state.add_listener(self._on_app_state_change, topics=CANVAS_TOPICS)
         self._on_state_change()  # Initial render from loaded state
 
     def will_unmount(self):
-        self.app_state.remove_listener(self._on_state_change)
+        self.app_state.remove_listener(self._on_app_state_change)
+        self.render_scheduler.cancel()
+
+    def _on_app_state_change(self, changes: ChangeSet):
+        # Modifiers reshape the shape being drawn right away; only the
+        # render itself is deferred to the next frame.
+        if self.current_drawing_shape and changes.modifiers:
+            self._reapply_modifiers()
+        self.render_scheduler.request(changes)
+
+    def _reapply_modifiers(self):
+        if self._is_updating_interaction:
+            return
+        self._is_updating_interaction = True
+        try:
+            tool = self.tools.get(self.app_state.current_tool)
+            if tool:
+                # Re-apply the move logic with the last known coordinates to respect new modifier state
+                tool.on_move(self.last_wx, self.last_wy, None)
+        finally:
+            self._is_updating_interaction = False
 
     def to_world(self, sx, sy):
         wx = (sx - self.app_state.pan_x) / self.app_state.zoom
@@ -89,132 +192,283 @@ class BlackboardCanvas(cv.Canvas):
     def get_anchors(self, shape: Shape):
         return shape.get_anchors()
 
-    def _on_state_change(self):
+    def _on_resize(self, e: cv.CanvasResizeEvent):
+        self.view_width = e.width
+        self.view_height = e.height
+        # Newly exposed areas may contain shapes that were culled, and the
+        # background grid has to cover them; both follow the view topic
+        self.app_state.set_view_size(e.width, e.height)
+
+    def get_visible_world_rect(
+        self, margin: float = CULL_MARGIN
+    ) -> tuple[float, float, float, float] | None:
+        """
+        Returns the (min_x, min_y, max_x, max_y) world rectangle currently on
+        screen, padded by `margin` screen pixels, or None if the canvas size
+        is not known yet.
+        """
+        width, height = self.view_width, self.view_height
+        if width is None or height is None:
+            page = self.page
+            width = getattr(page, "width", None)
+            height = getattr(page, "height", None)
+
+        if not isinstance(width, (int, float)) or not isinstance(height, (int, float)):
+            return None
+
+        min_x, min_y = self.to_world(-margin, -margin)
+        max_x, max_y = self.to_world(width + margin, height + margin)
+        return min_x, min_y, max_x, max_y
+
+    def _on_state_change(self, changes: ChangeSet | None = None):
         if self._is_updating_interaction:
             return
 
-        # If we have an active drawing tool and shape, update its geometry based on current modifiers
-        if self.current_drawing_shape:
-            self._is_updating_interaction = True
-            try:
-                tool = self.tools.get(self.app_state.current_tool)
-                if tool:
-                    # Re-apply the move logic with the last known coordinates to respect new modifier state
-                    tool.on_move(self.last_wx, self.last_wy, None)
-            finally:
-                self._is_updating_interaction = False
+        # Direct full renders also pick up the current modifier state; the
+        # listener already handled it for scheduled ones.
+        if self.current_drawing_shape and changes is None:
+            self._reapply_modifiers()
+
+        if (
+            changes is not None
+            and self._scene_shapes is not None
+            and not changes.touches(SCENE_TOPICS)
+        ):
+            # Hover, snap and rubber-band feedback: the scene is untouched,
+            # so only the overlay primitives are rebuilt and sent.
+            self._render_overlay()
+            return
 
         # Update canvas background based on theme
         # (Transparent to allow background component to show)
         self.gesture_container.bgcolor = ft.Colors.TRANSPARENT
 
-        canvas_shapes = []
+        if changes is None or changes.document:
+            self._lod_cache.clear()
+        else:
+            for shape_id in changes.removed:
+                self._lod_cache.pop(shape_id, None)
+
+        # 1. Draw all shapes that intersect the viewport
+        if self._can_reuse_scene(changes):
+            canvas_shapes = self._scene_shapes
+        else:
+            canvas_shapes = self._build_scene()
+
+        if self.world_canvas is not None:
+            # Pan/zoom only touch the transform; unchanged primitives are
+            # not re-sent to the client.
+            self.world_canvas.left = self.app_state.pan_x
+            self.world_canvas.top = self.app_state.pan_y
+            self.world_canvas.scale = ft.Scale(
+                self.app_state.zoom, alignment=ft.alignment.top_left
+            )
+            self.world_canvas.shapes = canvas_shapes
+        else:
+            self.shapes = canvas_shapes
+
+        # 2. Delegate overlay drawing to current tool
+        self.overlay_canvas.shapes = self._build_overlay()
+        self.update()
+
+    def _build_overlay(self) -> list:
         overlay_shapes = []
+        current_tool = self.tools.get(self.app_state.current_tool)
+        if current_tool:
+            current_tool.draw_overlays(overlay_shapes)
+        return overlay_shapes
 
-        default_stroke_color = (
-            ft.Colors.WHITE if self.app_state.theme_mode == "dark" else ft.Colors.BLACK
+    def _render_overlay(self):
+        self.overlay_canvas.shapes = self._build_overlay()
+        if self.overlay_canvas.page is not None:
+            self.overlay_canvas.update()
+        else:
+            # Layer not attached to a page yet
+            self.update()
+
+    def redraw_overlay(self):
+        """
+        Schedules a redraw of the tool overlay layer only. Tools call this for
+        transient feedback that doesn't change the document.
+        """
+        if self.page is None:
+            return
+        self.render_scheduler.request(ChangeSet(overlay=True))
+
+    def _can_reuse_scene(self, changes: ChangeSet | None) -> bool:
+        if changes is None or self._scene_shapes is None:
+            return False
+
+        if self.render_mode != RENDER_MODE_WORLD:
+            return not changes.touches(SCENE_TOPICS)
+
+        # World-space primitives survive pan/zoom as long as the viewport
+        # stays inside the area the scene was culled against.
+        if changes.touches(SCENE_TOPICS - {"view"}):
+            return False
+        if not changes.view or self._scene_rect is None:
+            return True
+        if zoom_bucket(self.app_state.zoom) != self._scene_zoom_bucket:
+            # Pen strokes need a different level of detail
+            return False
+        visible = self.get_visible_world_rect()
+        if visible is None:
+            return False
+        sx0, sy0, sx1, sy1 = self._scene_rect
+        return (
+            visible[0] >= sx0
+            and visible[1] >= sy0
+            and visible[2] <= sx1
+            and visible[3] <= sy1
+        )
+
+    def _project(self, wx: float, wy: float) -> tuple[float, float]:
+        """Maps world coordinates to the coordinate space primitives use."""
+        if self.render_mode == RENDER_MODE_WORLD:
+            return wx, wy
+        return self.to_screen(wx, wy)
+
+    def _project_points(self, points):
+        """Projects a whole point list at once (see geometry.transform_points)."""
+        if self.render_mode == RENDER_MODE_WORLD:
+            return transform_points(points)
+        return transform_points(
+            points, self.app_state.zoom, self.app_state.pan_x, self.app_state.pan_y
         )
 
-        # 1. Draw all shapes
-        for shape in self.app_state.shapes:
-            # Theme adaptation for colors
-            stroke_color = (
-                shape.stroke_color if shape.stroke_color else default_stroke_color
+    @property
+    def _render_scale(self) -> float:
+        return 1.0 if self.render_mode == RENDER_MODE_WORLD else self.app_state.zoom
+
+    def _build_scene(self) -> list:
+        canvas_shapes = []
+        visible_rect = self.get_visible_world_rect()
+        if visible_rect is not None and self.render_mode == RENDER_MODE_WORLD:
+            # Cull against one extra viewport on every side so short pans
+            # don't need a rebuild.
+            min_x, min_y, max_x, max_y = visible_rect
+            slack_x, slack_y = max_x - min_x, max_y - min_y
+            visible_rect = (
+                min_x - slack_x,
+                min_y - slack_y,
+                max_x + slack_x,
+                max_y + slack_y,
             )
-            final_color = stroke_color
-            if self.app_state.theme_mode == "dark" and stroke_color == ft.Colors.BLACK:
-                final_color = ft.Colors.WHITE
-            elif (
-                self.app_state.theme_mode == "light" and stroke_color == ft.Colors.WHITE
-            ):
-                final_color = ft.Colors.BLACK
-
-            if not final_color:
-                final_color = default_stroke_color
-
-            # Explicitly type cast or use values if enum matching is weird in Pylance/Runtime
-            # But based on checks, they are correct.
-            # Let's try to ensure we are using the one from the Paint signature if possible,
-            # or just rely on the fact that flet exports them correctly.
-
-            paint = self._create_paint(shape, final_color)
-
-            # Highlight selected
-            if (
-                self.app_state.selected_shape_id == shape.id
-                or shape.id in self.app_state.selected_shape_ids
-            ):
-                paint.color = ft.Colors.BLUE
-                if self.app_state.is_shift_down:
-                    paint.color = ft.Colors.CYAN
-                # Handle resizing logic feedback:
-                # If we are resizing this shape, allow feedback override.
-                # However, the test expects the shape itself to change color.
-                # The issue is that the test assumes `canvas.shapes[0]` is the Rectangle cv.Path/cv.Rect.
-                # But when selected, the loop might render the shape AND handles.
-                # In current implementation, shapes are rendered via `_draw_shape`, which appends to `canvas_shapes`.
-
-                # Check if this shape is being resized or has active feedback?
-                # The logic in the test:
-                # 4. Press Shift -> canvas._on_state_change()
-                # 5. Verify color changed to CYAN
-
-                # The existing code above does exactly that:
-                # if self.app_state.is_shift_down: paint.color = ft.Colors.CYAN
-
-                # Why did the test fail?
-                # "AssertionError: assert False ... isinstance(Path(), <class 'flet.core.canvas.rect.Rect'>)"
-                # Ah! The failure is NOT the color, but the TYPE check in the test.
-                # test_ui_canvas_resizing_feedback.py:51: assert isinstance(cv_rect, ft.canvas.Rect)
-
-                # The Canvas renderer `_draw_shape` converts Rectangle -> `cv.Path` (lines 247-275)
-                # to support consistent corner joins.
-                # It does NOT use `cv.Rect` anymore.
-
-                paint.stroke_width = shape.stroke_width + 2
-                # Selection highlight ignores dash array for visibility
-                paint.stroke_dash_pattern = None
+        self._scene_rect = visible_rect
+        self._scene_zoom_bucket = zoom_bucket(self.app_state.zoom)
 
+        if visible_rect is None:
+            visible_shapes = self.app_state.shapes
+        else:
+            visible_shapes = self.app_state.shapes_in_rect(*visible_rect)
+
+        # Screen-space primitives are invalidated by any pan/zoom (or theme)
+        # change; world-space ones only by theme. Otherwise only shapes whose
+        # version or selection state changed are rebuilt.
+        if self.render_mode == RENDER_MODE_WORLD:
+            view_key = (
+                self.render_mode,
+                self.app_state.theme_mode,
+                self._scene_zoom_bucket,
+            )
+        else:
+            view_key = (
+                self.app_state.zoom,
+                self.app_state.pan_x,
+                self.app_state.pan_y,
+                self.app_state.theme_mode,
+            )
+        selected_ids = self.app_state.selected_shape_ids
+        previous_cache = self._render_cache
+        self._render_cache = {}
+
+        for shape in visible_shapes:
+            is_selected = shape.id in selected_ids
+            highlight = (
+                (self.app_state.is_shift_down and "shift") if is_selected else None
+            )
+            key = (shape._version, view_key, is_selected, highlight)
             if isinstance(shape, Group):
-                # Draw children
-                for child in shape.children:
-                    # Determine paint for child
-                    child_stroke_color = (
-                        child.stroke_color
-                        if child.stroke_color
-                        else default_stroke_color
-                    )
-                    child_final_color = child_stroke_color
-                    if (
-                        self.app_state.theme_mode == "dark"
-                        and child_stroke_color == ft.Colors.BLACK
-                    ):
-                        child_final_color = ft.Colors.WHITE
-                    elif (
-                        self.app_state.theme_mode == "light"
-                        and child_stroke_color == ft.Colors.WHITE
-                    ):
-                        child_final_color = ft.Colors.BLACK
-
-                    if not child_final_color:
-                        child_final_color = default_stroke_color
-
-                    child_paint = self._create_paint(child, child_final_color)
-
-                    # Draw the child
-                    self._draw_shape(
-                        canvas_shapes, child, child_paint, child_final_color
-                    )
-            else:
-                self._draw_shape(canvas_shapes, shape, paint, final_color)
+                # Children are drawn unhighlighted, keyed on their own versions
+                key = (key, tuple(c._version for c in shape.children))
 
-        # 2. Delegate overlay drawing to current tool
-        current_tool = self.tools.get(self.app_state.current_tool)
-        if current_tool:
-            current_tool.draw_overlays(overlay_shapes)
+            cached = previous_cache.get(shape.id)
+            if cached is not None and cached[0] == key:
+                primitives = cached[1]
+            else:
+                primitives = self._build_shape_primitives(shape, is_selected)
+
+            self._render_cache[shape.id] = (key, primitives)
+            canvas_shapes.extend(primitives)
+
+        self._scene_shapes = canvas_shapes
+        return canvas_shapes
+
+    def _get_lod_points(self, shape: Path) -> list:
+        """
+        Returns the stroke's points simplified for the current zoom, cached
+        per shape version and zoom bucket.
+        """
+        bucket = zoom_bucket(self.app_state.zoom)
+        entry = self._lod_cache.get(shape.id)
+        if entry is None or entry[0] != shape._version:
+            entry = (shape._version, {})
+            self._lod_cache[shape.id] = entry
+
+        points = entry[1].get(bucket)
+        if points is None:
+            # Tolerance for the most zoomed-in end of the bucket, so the
+            # error never exceeds LOD_TOLERANCE pixels anywhere inside it
+            tolerance = LOD_TOLERANCE / bucket_max_zoom(bucket)
+            points = simplify_points(shape.points, tolerance)
+            entry[1][bucket] = points
+        return points
+
+    def _resolve_stroke_color(self, shape: Shape) -> str:
+        default_stroke_color = (
+            ft.Colors.WHITE if self.app_state.theme_mode == "dark" else ft.Colors.BLACK
+        )
 
-        self.shapes = canvas_shapes + overlay_shapes
-        self.update()
+        # Theme adaptation for colors
+        stroke_color = (
+            shape.stroke_color if shape.stroke_color else default_stroke_color
+        )
+        final_color = stroke_color
+        if self.app_state.theme_mode == "dark" and stroke_color == ft.Colors.BLACK:
+            final_color = ft.Colors.WHITE
+        elif self.app_state.theme_mode == "light" and stroke_color == ft.Colors.WHITE:
+            final_color = ft.Colors.BLACK
+
+        if not final_color:
+            final_color = default_stroke_color
+        return final_color
+
+    def _build_shape_primitives(self, shape: Shape, is_selected: bool) -> list:
+        """Builds the flet canvas primitives for one top-level shape."""
+        primitives: list = []
+
+        if isinstance(shape, Group):
+            # Draw children
+            for child in shape.children:
+                child_final_color = self._resolve_stroke_color(child)
+                child_paint = self._create_paint(child, child_final_color)
+                self._draw_shape(primitives, child, child_paint, child_final_color)
+            return primitives
+
+        final_color = self._resolve_stroke_color(shape)
+        paint = self._create_paint(shape, final_color)
+
+        # Highlight selected
+        if is_selected:
+            paint.color = ft.Colors.BLUE
+            if self.app_state.is_shift_down:
+                paint.color = ft.Colors.CYAN
+            paint.stroke_width = shape.stroke_width + 2
+            # Selection highlight ignores dash array for visibility
+            paint.stroke_dash_pattern = None
+
+        self._draw_shape(primitives, shape, paint, final_color)
+        return primitives
 
     def _create_paint(self, shape, color):
         stroke_join = getattr(shape, "stroke_join", "miter")
@@ -246,36 +500,18 @@ class BlackboardCanvas(cv.Canvas):
             return []
 
         elements = []
-        elements.append(cv.Path.MoveTo(points[0][0], points[0][1]))
+        elements.append(cv.Path.MoveTo(float(points[0][0]), float(points[0][1])))
 
         if len(points) == 2:
-            elements.append(cv.Path.LineTo(points[1][0], points[1][1]))
+            elements.append(cv.Path.LineTo(float(points[1][0]), float(points[1][1])))
             if closed:
                 elements.append(cv.Path.Close())
             return elements
 
-        def get_pt(idx):
-            if idx < 0:
-                return points[idx % len(points)] if closed else points[0]
-            if idx >= len(points):
-                return points[idx % len(points)] if closed else points[-1]
-            return points[idx]
-
-        count = len(points) if closed else len(points) - 1
-
-        for i in range(count):
-            p0 = get_pt(i - 1)
-            p1 = get_pt(i)
-            p2 = get_pt(i + 1)
-            p3 = get_pt(i + 2)
-
-            cp1x = p1[0] + (p2[0] - p0[0]) * tension
-            cp1y = p1[1] + (p2[1] - p0[1]) * tension
-
-            cp2x = p2[0] - (p3[0] - p1[0]) * tension
-            cp2y = p2[1] - (p3[1] - p1[1]) * tension
-
-            elements.append(cv.Path.CubicTo(cp1x, cp1y, cp2x, cp2y, p2[0], p2[1]))
+        # Control points are computed in bulk; only the path elements are
+        # created one by one.
+        for segment in spline_segments(points, tension, closed):
+            elements.append(cv.Path.CubicTo(*segment))
 
         if closed:
             elements.append(cv.Path.Close())
@@ -293,8 +529,8 @@ class BlackboardCanvas(cv.Canvas):
             fill_paint = ft.Paint(color=fill_color, style=ft.PaintingStyle.FILL)
 
         if isinstance(shape, Line):
-            sx1, sy1 = self.to_screen(shape.x, shape.y)
-            sx2, sy2 = self.to_screen(shape.end_x, shape.end_y)
+            sx1, sy1 = self._project(shape.x, shape.y)
+            sx2, sy2 = self._project(shape.end_x, shape.end_y)
 
             line_type = getattr(shape, "line_type", "simple")
 
@@ -310,9 +546,9 @@ class BlackboardCanvas(cv.Canvas):
                     self._draw_arrow_head(canvas_shapes, sx1, sy1, sx2, sy2, paint)
 
         elif isinstance(shape, Rectangle):
-            sx, sy = self.to_screen(shape.x, shape.y)
-            w = shape.width * self.app_state.zoom
-            h = shape.height * self.app_state.zoom
+            sx, sy = self._project(shape.x, shape.y)
+            w = shape.width * self._render_scale
+            h = shape.height * self._render_scale
 
             tension = getattr(shape, "tension", 0.0)
 
@@ -354,15 +590,15 @@ class BlackboardCanvas(cv.Canvas):
             )
 
         elif isinstance(shape, Circle):
-            sx, sy = self.to_screen(shape.x, shape.y)
-            w = shape.radius_x * 2 * self.app_state.zoom
-            h = shape.radius_y * 2 * self.app_state.zoom
+            sx, sy = self._project(shape.x, shape.y)
+            w = shape.radius_x * 2 * self._render_scale
+            h = shape.radius_y * 2 * self._render_scale
             if fill_paint:
                 canvas_shapes.append(cv.Oval(sx, sy, w, h, paint=fill_paint))
             canvas_shapes.append(cv.Oval(sx, sy, w, h, paint=paint))
 
         elif isinstance(shape, Text):
-            sx, sy = self.to_screen(shape.x, shape.y)
+            sx, sy = self._project(shape.x, shape.y)
             text_color = final_color
             if hasattr(shape, "opacity") and shape.opacity < 1.0:
                 text_color = ft.Colors.with_opacity(shape.opacity, text_color)
@@ -381,7 +617,7 @@ class BlackboardCanvas(cv.Canvas):
                     sy,
                     shape.content,
                     style=ft.TextStyle(
-                        size=shape.font_size * self.app_state.zoom,
+                        size=shape.font_size * self._render_scale,
                         color=text_color,
                         weight=weight,
                         italic=shape.italic,
@@ -394,7 +630,7 @@ class BlackboardCanvas(cv.Canvas):
         elif isinstance(shape, Path):
             if not shape.points:
                 return
-            screen_points = [self.to_screen(px, py) for px, py in shape.points]
+            screen_points = self._project_points(self._get_lod_points(shape))
 
             # Use spline interpolation for smoother paths
             path_elements = self._get_spline_elements(
@@ -412,9 +648,7 @@ class BlackboardCanvas(cv.Canvas):
             if not shape.points:
                 return
 
-            screen_points = [self.to_screen(px, py) for px, py in shape.points]
-            if not screen_points:
-                return
+            screen_points = self._project_points(shape.points)
 
             # Use spline interpolation for polygons too
             path_elements = self._get_spline_elements(
@@ -507,11 +741,7 @@ class BlackboardCanvas(cv.Canvas):
             for px, py in shape.points:
                 if math.hypot(wx - px, wy - py) < threshold:
                     return True
-            for i in range(len(shape.points) - 1):
-                p1 = shape.points[i]
-                p2 = shape.points[i + 1]
-                x1, y1 = p1
-                x2, y2 = p2
+            for (x1, y1), (x2, y2) in itertools.pairwise(shape.points):
                 l2 = (x1 - x2) ** 2 + (y1 - y2) ** 2
                 if l2 == 0:
                     continue
@@ -552,7 +782,11 @@ class BlackboardCanvas(cv.Canvas):
         else:
             exclude_ids = set(exclude_ids)
 
-        for shape in reversed(self.app_state.shapes):
+        # Only shapes whose bounds are near the point can be hit. The widest
+        # tolerance used by _is_point_in_shape is 10 screen pixels (paths),
+        # or 5 world units for zero-length lines.
+        tolerance = max(10 / self.app_state.zoom, 5)
+        for shape in self.app_state.shapes_at(wx, wy, tolerance):
             if shape.id in exclude_ids:
                 continue
 
@@ -561,6 +795,7 @@ class BlackboardCanvas(cv.Canvas):
 
         return None
 
+    @_batch_renders
     def on_pan_start(self, e: ft.DragStartEvent):
         wx, wy = self.to_world(e.local_x, e.local_y)
         self.last_wx = wx
@@ -570,6 +805,7 @@ class BlackboardCanvas(cv.Canvas):
         if tool:
             tool.on_down(wx, wy, e)
 
+    @_batch_renders
     def on_pan_update(self, e: ft.DragUpdateEvent):
         wx, wy = self.to_world(e.local_x, e.local_y)
         self.last_wx = wx
@@ -579,6 +815,7 @@ class BlackboardCanvas(cv.Canvas):
         if tool:
             tool.on_move(wx, wy, e)
 
+    @_batch_renders
     def on_pan_end(self, e: ft.DragEndEvent):
         # DragEndEvent doesn't have coordinates, use last known
         wx, wy = self.last_wx, self.last_wy
@@ -589,13 +826,15 @@ class BlackboardCanvas(cv.Canvas):
 
         self.app_state.set_shift_key(False)
 
+    @_batch_renders
     def on_hover(self, e: ft.HoverEvent):
         self.hover_wx, self.hover_wy = self.to_world(e.local_x, e.local_y)
 
         # Some tools need hover updates (like LineTool for anchors)
         if self.app_state.current_tool == ToolType.LINE:
-            self.app_state.notify()
+            self.redraw_overlay()
 
+    @_batch_renders
     def on_scroll(self, e: ft.ScrollEvent):
         if e.scroll_delta_y is None:
             return
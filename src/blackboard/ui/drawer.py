@@ -1,5 +1,6 @@
 import flet as ft
 from ..state.app_state import AppState
+from ..state.changes import ChangeSet
 from .drawers.base_drawer import BaseDrawer
 from .drawers.files_drawer import FilesDrawer
 from .drawers.layers_drawer import LayersDrawer
@@ -52,13 +53,22 @@ class Drawer(ft.Container):
         self._render_content()
 
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        topics = {"drawer"}
+        for drawer_module in self.drawers.values():
+            topics |= drawer_module.topics
+        self.app_state.add_listener(self._on_state_change, topics=topics)
         self._update_visibility()
 
     def will_unmount(self):
         self.app_state.remove_listener(self._on_state_change)
 
-    def _on_state_change(self):
+    def _on_state_change(self, changes: ChangeSet):
+        if not changes.drawer:
+            # Only the open drawer's own topics matter
+            drawer_module = self.drawers.get(self.app_state.active_drawer_tab or "")
+            if drawer_module is None or not changes.touches(drawer_module.topics):
+                return
+
         self._update_visibility()
         # Only rebuild content if visible to save resources
         if self.visible:
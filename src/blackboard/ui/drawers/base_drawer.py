@@ -4,6 +4,9 @@ from ...state.app_state import AppState
 
 
 class BaseDrawer(ABC):
+    # Change topics that require this drawer's content to be rebuilt
+    topics: frozenset = frozenset({"theme"})
+
     def __init__(self, app_state: AppState):
         self.app_state = app_state
 
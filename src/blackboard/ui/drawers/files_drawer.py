@@ -1,9 +1,12 @@
+import os
 import flet as ft
 from .base_drawer import BaseDrawer
 from ...state.app_state import AppState
 
 
 class FilesDrawer(BaseDrawer):
+    topics = frozenset({"files", "theme"})
+
     def __init__(self, app_state: AppState, on_update_callback=None):
         super().__init__(app_state)
         self.on_update = on_update_callback
@@ -81,10 +84,7 @@ class FilesDrawer(BaseDrawer):
             return
 
         # Replace extension
-        if current_file.endswith(".json"):
-            export_name = current_file[:-5] + ".png"
-        else:
-            export_name = current_file + ".png"
+        export_name = os.path.splitext(current_file)[0] + ".png"
 
         try:
             self.app_state.export_image(export_name)
@@ -2,10 +2,13 @@ import flet as ft
 from typing import List
 from .base_drawer import BaseDrawer
 from ...state.app_state import AppState
+from ...state.changes import ChangeSet
 from ...models import Shape, Group
 
 
 class LayersDrawer(BaseDrawer):
+    topics = frozenset({"shapes", "order", "selection", "drawer", "theme"})
+
     def __init__(self, app_state: AppState):
         super().__init__(app_state)
 
@@ -162,20 +165,8 @@ class LayersDrawer(BaseDrawer):
         is_expanded_group = target_id in self.app_state.expanded_group_ids
 
         # We need to know if target_id refers to a Group.
-        # Since we don't have the object easily here without searching,
-        # let's assume we can rely on AppState or search quickly.
-        # Or, we can let AppState handle the decision?
-        # No, AppState doesn't know about UI expansion state implicitly for logic (it stores it but logically reorder doesn't care).
-        # We should make the decision here.
-
-        # Let's verify if it's a group.
-        # Since finding it recursively is cheap for small lists:
-        target_list, target_idx = self.app_state._find_shape_location(target_id)
-        if (
-            target_list
-            and isinstance(target_list[target_idx], Group)
-            and is_expanded_group
-        ):
+        target_shape = self.app_state.get_shape(target_id)
+        if isinstance(target_shape, Group) and is_expanded_group:
             self.app_state.move_shape_into_group(moved_shape_id, target_id)
         else:
             self.app_state.reorder_shape(moved_shape_id, target_id)
@@ -183,4 +174,4 @@ class LayersDrawer(BaseDrawer):
     def _toggle_visibility(self, shape: Shape):
         # Toggle opacity for now
         shape.opacity = 0.0 if shape.opacity > 0 else 1.0
-        self.app_state.notify(save=True)
+        self.app_state.notify(save=True, changes=ChangeSet(modified={shape.id}))
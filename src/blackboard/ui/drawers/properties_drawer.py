@@ -4,6 +4,8 @@ from ...state.app_state import AppState
 
 
 class PropertiesDrawer(BaseDrawer):
+    topics = frozenset({"shapes", "selection", "theme"})
+
     def __init__(self, app_state: AppState):
         super().__init__(app_state)
 
@@ -16,45 +18,12 @@ class PropertiesDrawer(BaseDrawer):
                 ft.Text("No selection", italic=True),
             ]
 
-        # Get first selected shape as representative for initial values
-        first_shape = None
-        for s in self.app_state.shapes:
-            if s.id in list(selected_ids)[0]:
-                first_shape = s
-                break
-
-        # If we selected a group, finding it might be tricky if shapes list only has top-level?
-        # AppState.shapes should have all shapes if flat, or top level if tree.
-        # Assuming flat for simple search, or we need recursive search if groups exist.
-        # However, app_state.shapes usually stores everything or we rely on ID lookup.
-        # Let's verify how we find the shape.
-        # Original code:
-        # for s in self.app_state.shapes:
-        #    if s.id in list(selected_ids)[0]: ...
-        # Wait, selected_ids is a set of IDs. list(selected_ids)[0] gives one ID.
-        # But `s.id in ...` check seems weird if `s.id` is string and list[0] is string.
-        # It should be `if s.id == ...`?
-        # Let's stick to the original logic pattern but fix if it looks like a bug or just copy.
-        # Original: if s.id in list(selected_ids)[0]:
-        # If selected_ids is {'abc'}, list is ['abc'], [0] is 'abc'.
-        # 'abc' in 'abc' is True. 'a' in 'abc' is True.
-        # This seems dangerously loose if IDs are subsets of each other, but let's replicate logic for now or improve.
-        # Actually, let's improve to strict equality if we are sure.
-        # The original code was:
-        # for s in self.app_state.shapes:
-        #     if s.id in list(selected_ids)[0]:
-        #         first_shape = s
-        #         break
-        # This looks like it meant `s.id == list(selected_ids)[0]`.
-
-        target_id = list(selected_ids)[0]
-        first_shape = next(
-            (s for s in self.app_state.shapes if s.id == target_id), None
-        )
+        # Get first selected shape as representative for initial values.
+        # The id index also finds shapes nested inside groups.
+        target_id = next(iter(selected_ids))
+        first_shape = self.app_state.get_shape(target_id)
 
         if not first_shape:
-            # Fallback for nested shapes if not found in top level (if supported)
-            # For now return error content
             return [
                 ft.Text("Properties", size=20, weight=ft.FontWeight.BOLD),
                 ft.Divider(),
@@ -63,11 +32,9 @@ class PropertiesDrawer(BaseDrawer):
 
         # Check for grouping capabilities
         can_group = len(selected_ids) > 1
-        can_ungroup = False
-        for s in self.app_state.shapes:
-            if s.id in selected_ids and s.type == "group":
-                can_ungroup = True
-                break
+        can_ungroup = any(
+            s.type == "group" for s in self.app_state.selected_top_level_shapes()
+        )
 
         def on_group_click(_):
             self.app_state.group_selection()
@@ -0,0 +1,146 @@
+import math
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Optional: pure-Python fallbacks are used instead
+
+Point = Tuple[float, float]
+# (cp1x, cp1y, cp2x, cp2y, x, y) of one cubic Bezier segment
+Segment = Sequence[float]
+
+# Half-octave zoom buckets: strokes are re-simplified only when the zoom
+# crosses a bucket boundary, not on every zoom step.
+ZOOM_BUCKETS_PER_OCTAVE = 2
+
+
+def zoom_bucket(zoom: float) -> int:
+    return math.floor(math.log2(max(zoom, 1e-6)) * ZOOM_BUCKETS_PER_OCTAVE)
+
+
+def bucket_max_zoom(bucket: int) -> float:
+    """Largest zoom that falls into `bucket`."""
+    return 2 ** ((bucket + 1) / ZOOM_BUCKETS_PER_OCTAVE)
+
+
+def simplify_points(points: Sequence[Point], tolerance: float) -> List[Point]:
+    """
+    Ramer-Douglas-Peucker simplification.
+
+    Drops points that lie within `tolerance` of the segment joining the
+    points kept around them. The first and last points are always kept.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return list(points)
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+
+    # Iterative to stay clear of the recursion limit on long strokes
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        x1, y1 = points[first]
+        x2, y2 = points[last]
+        dx = x2 - x1
+        dy = y2 - y1
+        length_sq = dx * dx + dy * dy
+
+        max_dist_sq = -1.0
+        index = first
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length_sq == 0:
+                ex, ey = px - x1, py - y1
+            else:
+                # Distance to the segment, not the infinite line, so strokes
+                # that double back past an endpoint are preserved.
+                t = ((px - x1) * dx + (py - y1) * dy) / length_sq
+                t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+                ex, ey = px - (x1 + t * dx), py - (y1 + t * dy)
+            dist_sq = ex * ex + ey * ey
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                index = i
+
+        if max_dist_sq > tolerance_sq:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [p for p, k in zip(points, keep) if k]
+
+
+def transform_points(
+    points: Sequence[Point],
+    scale: float = 1.0,
+    offset_x: float = 0.0,
+    offset_y: float = 0.0,
+):
+    """
+    Maps every point through `p * scale + offset` in one pass.
+
+    With NumPy available the result is an (n, 2) float array, otherwise a
+    list of tuples; both index as result[i][0], result[i][1].
+    """
+    if np is not None:
+        arr = np.asarray(points, dtype=float).reshape(-1, 2)
+        if scale != 1.0:
+            arr = arr * scale
+        if offset_x or offset_y:
+            arr = arr + (offset_x, offset_y)
+        return arr
+    return [(x * scale + offset_x, y * scale + offset_y) for x, y in points]
+
+
+def spline_segments(points, tension: float, closed: bool = False) -> List[Segment]:
+    """
+    Cubic Bezier segments of a Catmull-Rom style spline through `points`.
+
+    Open splines clamp the neighbours of the end points to the end points
+    themselves; closed splines wrap around. Needs at least two points.
+    """
+    n = len(points)
+    count = n if closed else n - 1
+    if count <= 0:
+        return []
+
+    if np is not None:
+        arr = np.asarray(points, dtype=float).reshape(-1, 2)
+        idx = np.arange(count)
+        if closed:
+            p0, p1 = arr[(idx - 1) % n], arr[idx]
+            p2, p3 = arr[(idx + 1) % n], arr[(idx + 2) % n]
+        else:
+            p0, p1 = arr[np.maximum(idx - 1, 0)], arr[idx]
+            p2, p3 = arr[idx + 1], arr[np.minimum(idx + 2, n - 1)]
+        cp1 = p1 + (p2 - p0) * tension
+        cp2 = p2 - (p3 - p1) * tension
+        # One bulk conversion back to Python floats for the path elements
+        return np.hstack((cp1, cp2, p2)).tolist()
+
+    if closed:
+        order = [points[i % n] for i in range(-1, n + 2)]
+    else:
+        order = [points[0], *points, points[-1]]
+
+    segments = []
+    for i in range(count):
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = order[i : i + 4]
+        segments.append(
+            (
+                x1 + (x2 - x0) * tension,
+                y1 + (y2 - y0) * tension,
+                x2 - (x3 - x1) * tension,
+                y2 - (y3 - y1) * tension,
+                x2,
+                y2,
+            )
+        )
+    return segments
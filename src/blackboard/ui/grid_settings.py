@@ -1,5 +1,6 @@
 import flet as ft
 from blackboard.state.app_state import AppState
+from blackboard.state.changes import ChangeSet
 
 
 class GridSettings(ft.Container):
@@ -38,12 +39,12 @@ class GridSettings(ft.Container):
         self.bgcolor = ft.Colors.with_opacity(0.1, ft.Colors.WHITE)
 
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        self.app_state.add_listener(self._on_state_change, topics={"view"})
 
     def will_unmount(self):
         self.app_state.remove_listener(self._on_state_change)
 
-    def _on_state_change(self):
+    def _on_state_change(self, changes: ChangeSet):
         self.grid_options.value = self.app_state.grid_type
         self.update()
 
@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from ..state.changes import ChangeSet
+
+# Target frame budget (60 Hz)
+FRAME_INTERVAL = 1 / 60
+
+
+class RenderScheduler:
+    """
+    Coalesces render requests into at most one render per frame.
+
+    Requests merge their change sets into a pending one. If a frame's worth
+    of time has passed since the last render it is flushed right away,
+    otherwise a timer flushes it at the start of the next frame. Requests
+    made inside `batch()` (e.g. while a gesture handler runs) are held back
+    until the outermost batch exits, so one pointer event renders once no
+    matter how many times the state notified.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[ChangeSet], None],
+        frame_interval: float = FRAME_INTERVAL,
+    ):
+        self._render = render
+        self.frame_interval = frame_interval
+        # Re-entrant so a render may request another one. Batches only hold
+        # it to count themselves, so other threads can request meanwhile.
+        self._lock = threading.RLock()
+        self._pending: Optional[ChangeSet] = None
+        self._timer: Optional[threading.Timer] = None
+        self._batch_depth = 0
+        self._last_render = float("-inf")
+
+    @property
+    def has_pending(self) -> bool:
+        return self._pending is not None
+
+    def request(self, changes: Optional[ChangeSet] = None):
+        with self._lock:
+            if changes is None:
+                changes = ChangeSet.everything()
+            if self._pending is None:
+                self._pending = ChangeSet()
+            self._pending.merge(changes)
+
+            if self._batch_depth == 0:
+                self._schedule()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._schedule()
+
+    def flush(self):
+        """Renders any pending changes synchronously."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            pending, self._pending = self._pending, None
+            if pending is None:
+                return
+            self._last_render = time.monotonic()
+            self._render(pending)
+
+    def cancel(self):
+        """Drops pending changes and any armed timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = None
+
+    def _schedule(self):
+        if self._pending is None or self._timer is not None:
+            return
+
+        delay = self._last_render + self.frame_interval - time.monotonic()
+        if delay <= 0:
+            self.flush()
+            return
+
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            # A batch in progress renders when it exits
+            if self._batch_depth == 0:
+                self.flush()
@@ -1,5 +1,6 @@
 import flet as ft
 from ..state.app_state import AppState
+from ..state.changes import ChangeSet
 
 
 class SideRail(ft.Container):
@@ -80,13 +81,13 @@ class SideRail(ft.Container):
         )
 
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        self.app_state.add_listener(self._on_state_change, topics={"drawer"})
         self._update_selection()
 
     def will_unmount(self):
         self.app_state.remove_listener(self._on_state_change)
 
-    def _on_state_change(self):
+    def _on_state_change(self, changes: ChangeSet):
         self._update_selection()
         self.update()
 
@@ -1,5 +1,6 @@
 import flet as ft
 from ..state.app_state import AppState
+from ..state.changes import ChangeSet
 
 
 class ThemeSwitcher(ft.Container):
@@ -18,14 +19,14 @@ class ThemeSwitcher(ft.Container):
         self._render_content()
 
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        self.app_state.add_listener(self._on_state_change, topics={"theme"})
         # Initialize colors
         self._update_colors()
 
     def will_unmount(self):
         self.app_state.remove_listener(self._on_state_change)
 
-    def _on_state_change(self):
+    def _on_state_change(self, changes: ChangeSet):
         self._update_colors()
         self._sync_page_theme()
         self._render_content()
@@ -1,5 +1,6 @@
 import flet as ft
 from ..state.app_state import AppState
+from ..state.changes import ChangeSet
 from ..models import ToolType
 
 
@@ -19,12 +20,15 @@ class Toolbar(ft.Container):
         self._render_content()
 
     def did_mount(self):
-        self.app_state.add_listener(self._on_state_change)
+        # Zoom label follows the view, undo/redo buttons follow the history
+        self.app_state.add_listener(
+            self._on_state_change, topics={"tool", "theme", "view", "history"}
+        )
 
     def will_unmount(self):
         self.app_state.remove_listener(self._on_state_change)
 
-    def _on_state_change(self):
+    def _on_state_change(self, changes: ChangeSet):
         self._update_colors()
         self._render_content()
         self.update()
@@ -1,5 +1,5 @@
 from .selection_tool import SelectionTool
-from ...models import Rectangle, Circle, Line, Text, Polygon, Path
+from ...models import Line, Polygon
 
 
 class BoxSelectionTool(SelectionTool):
@@ -39,7 +39,7 @@ class BoxSelectionTool(SelectionTool):
                     if isinstance(s, Line):
                         state.update({"end_x": s.end_x, "end_y": s.end_y})
                     elif isinstance(s, Polygon):
-                        state.update({"points": list(s.points)})
+                        state.update({"points": s.points.copy()})
                     self.moving_shapes_initial_state[s.id] = state
 
             self.box_select_start_wx = None
@@ -71,8 +71,8 @@ class BoxSelectionTool(SelectionTool):
                 w,
                 h,
             )
-            # Notify to trigger redraw
-            self.app_state.notify()
+            # Redraw the rubber band
+            self.canvas.redraw_overlay()
 
     def on_up(self, x: float, y: float, e):
         if self.is_moving_mode:
@@ -109,7 +109,7 @@ class BoxSelectionTool(SelectionTool):
 
         self.box_select_rect = None
         self.box_select_start_wx = None
-        self.app_state.notify()
+        self.canvas.redraw_overlay()
 
     def draw_overlays(self, overlay_shapes: list):
         if self.box_select_rect:
@@ -151,40 +151,11 @@ class BoxSelectionTool(SelectionTool):
             )
 
     def _is_shape_in_rect(self, shape, rx, ry, rw, rh):
-        # Helper to check if shape is strictly inside rect (or intersects?)
-        # Copied from legacy canvas._is_shape_in_rect
-
-        if isinstance(shape, Rectangle):
-            sx, sy, sw, sh = shape.x, shape.y, shape.width, shape.height
-        elif isinstance(shape, Circle):
-            sx, sy, sw, sh = shape.x, shape.y, shape.radius_x * 2, shape.radius_y * 2
-        elif isinstance(shape, Line):
-            sx = min(shape.x, shape.end_x)
-            sy = min(shape.y, shape.end_y)
-            sw = abs(shape.x - shape.end_x)
-            sh = abs(shape.y - shape.end_y)
-        elif isinstance(shape, Text):
-            sx, sy = shape.x, shape.y
-            sw = len(shape.content) * shape.font_size * 0.6  # approx
-            sh = shape.font_size
-        elif isinstance(shape, Polygon):
-            xs = [p[0] for p in shape.points]
-            ys = [p[1] for p in shape.points]
-            if not xs:
-                return False
-            sx, sy = min(xs), min(ys)
-            sw = max(xs) - min(xs)
-            sh = max(ys) - min(ys)
-        elif isinstance(shape, Path):
-            if not shape.points:
-                return False
-            xs = [p[0] for p in shape.points]
-            ys = [p[1] for p in shape.points]
-            sx, sy = min(xs), min(ys)
-            sw = max(xs) - min(xs)
-            sh = max(ys) - min(ys)
-        else:
+        # Intersection test against the shape's cached bounds
+        bounds = shape.bounds
+        if bounds is None:
             return False
 
         # Check intersection (AABB)
-        return sx < rx + rw and sx + sw > rx and sy < ry + rh and sy + sh > ry
+        min_x, min_y, max_x, max_y = bounds
+        return min_x < rx + rw and max_x > rx and min_y < ry + rh and max_y > ry
@@ -1,5 +1,6 @@
 import flet as ft
 from ...models import Circle
+from ...state.changes import ChangeSet
 from .base_tool import BaseTool
 
 
@@ -38,9 +39,13 @@ class CircleTool(BaseTool):
 
         shape.radius_x = rx
         shape.radius_y = ry
-        self.app_state.notify()
+        self.app_state.reindex_shape(shape)
+        self.app_state.notify(changes=ChangeSet(modified={shape.id}))
 
     def on_up(self, wx: float, wy: float, e):
+        shape = self.canvas.current_drawing_shape
+        if shape is not None:
+            self.app_state.notify(save=True, changes=ChangeSet(modified={shape.id}))
         self.canvas.current_drawing_shape = None
         self.app_state.set_shift_key(False)
-        self.app_state.notify()
+        self.canvas.redraw_overlay()
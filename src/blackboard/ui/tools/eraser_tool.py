@@ -55,6 +55,12 @@ class EraserTool(BaseTool):
         if not points_removed:
             return
 
+        # Splitting edits the path and adds fragments: record it as one step
+        with self.app_state.transaction():
+            self.app_state.snapshot()
+            self._apply_split(path, new_points_list)
+
+    def _apply_split(self, path: Path, new_points_list: list):
         # If we removed all points, delete the shape
         if not new_points_list:
             self.app_state.remove_shape(path)
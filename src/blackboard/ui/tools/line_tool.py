@@ -1,6 +1,7 @@
 import math
 import flet as ft
 from ...models import Line
+from ...state.changes import ChangeSet
 from .base_tool import BaseTool
 
 
@@ -61,7 +62,8 @@ class LineTool(BaseTool):
             shape.end_x = wx
             shape.end_y = wy
 
-        self.app_state.notify()
+        self.app_state.reindex_shape(shape)
+        self.app_state.notify(changes=ChangeSet(modified={shape.id}))
 
     def on_up(self, wx: float, wy: float, e):
         if not self.canvas.current_drawing_shape:
@@ -81,38 +83,23 @@ class LineTool(BaseTool):
 
         # Search for closest anchor across ALL shapes (robust snap logic)
         threshold = 10 / self.app_state.zoom
+        snap = self.app_state.nearest_anchor(wx, wy, threshold, exclude_ids={shape.id})
 
-        closest_anchor_id = None
-        closest_shape_id = None
-        min_dist = float("inf")
-        best_ax, best_ay = None, None
-
-        for s in self.app_state.shapes:
-            if s.id == shape.id:
-                continue
-
-            anchors = self.canvas.get_anchors(s)
-            for anchor_id, ax, ay in anchors:
-                dist = math.hypot(wx - ax, wy - ay)
-                if dist < threshold and dist < min_dist:
-                    min_dist = dist
-                    closest_anchor_id = anchor_id
-                    closest_shape_id = s.id
-                    best_ax, best_ay = ax, ay
-
-        if closest_shape_id and closest_anchor_id:
+        if snap:
             # Snap to anchor
-            shape.end_shape_id = closest_shape_id
-            shape.end_anchor_id = closest_anchor_id
-            shape.end_x = best_ax
-            shape.end_y = best_ay
+            snap_shape, anchor_id, ax, ay = snap
+            shape.end_shape_id = snap_shape.id
+            shape.end_anchor_id = anchor_id
+            shape.end_x = ax
+            shape.end_y = ay
         else:
             # Fallback to simple hit test
             end_shape = self.canvas.hit_test(wx, wy, exclude_ids={shape.id})
             if end_shape:
                 shape.end_shape_id = end_shape.id
 
-        self.app_state.notify()
+        self.app_state.reindex_shape(shape)
+        self.app_state.notify(save=True, changes=ChangeSet(modified={shape.id}))
         self.canvas.current_drawing_shape = None
 
     def draw_overlays(self, overlay_shapes: list):
@@ -128,27 +115,17 @@ class LineTool(BaseTool):
         if self.canvas.current_drawing_shape and isinstance(
             self.canvas.current_drawing_shape, Line
         ):
-            # Snap logic: Iterate all shapes to find the closest anchor
-            closest_anchor = None
-            closest_shape = None
-            min_dist = float("inf")
-
-            for shape in self.app_state.shapes:
-                if shape.id == self.canvas.current_drawing_shape.id:
-                    continue
-
-                anchors = self.canvas.get_anchors(shape)
-                for anchor_id, ax, ay in anchors:
-                    dist = math.hypot(
-                        self.canvas.last_wx - ax, self.canvas.last_wy - ay
-                    )
-                    if dist < threshold and dist < min_dist:
-                        min_dist = dist
-                        closest_anchor = (ax, ay)
-                        closest_shape = shape
+            # Snap logic: find the closest anchor near the drag end
+            snap = self.app_state.nearest_anchor(
+                self.canvas.last_wx,
+                self.canvas.last_wy,
+                threshold,
+                exclude_ids={self.canvas.current_drawing_shape.id},
+            )
 
-            if closest_anchor and closest_shape:
-                asx, asy = self.canvas.to_screen(closest_anchor[0], closest_anchor[1])
+            if snap:
+                closest_shape, _, ax, ay = snap
+                asx, asy = self.canvas.to_screen(ax, ay)
                 # Draw a highlight circle (Green for "Snap")
                 overlay_shapes.append(
                     ft.canvas.Circle(
@@ -1,6 +1,7 @@
 import flet as ft
 from .base_tool import BaseTool
 from ...models import Path
+from ...state.changes import ChangeSet
 
 
 class PenTool(BaseTool):
@@ -21,10 +22,17 @@ class PenTool(BaseTool):
 
         # Add point if different from last
         if not shape.points or shape.points[-1] != (x, y):
+            shape.will_change("points")
             shape.points.append((x, y))
+            shape.touch()
+            self.app_state.reindex_shape(shape)
             # Notify only, no save on every move
-            self.app_state.notify()
+            self.app_state.notify(changes=ChangeSet(modified={shape.id}))
 
     def on_up(self, x: float, y: float, e):
+        shape = self.canvas.current_drawing_shape
+        if shape is not None:
+            # Moves only redraw; the finished shape is saved once
+            self.app_state.notify(save=True, changes=ChangeSet(modified={shape.id}))
         self.canvas.current_drawing_shape = None
-        self.app_state.notify()
+        self.canvas.redraw_overlay()
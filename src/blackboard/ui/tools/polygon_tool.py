@@ -2,6 +2,7 @@ import math
 import flet as ft
 from .base_tool import BaseTool
 from ...models import Polygon
+from ...state.changes import ChangeSet
 
 
 class PolygonTool(BaseTool):
@@ -42,11 +43,15 @@ class PolygonTool(BaseTool):
 
         points = self._generate_polygon_points(cx, cy, rx, ry, shape.polygon_type)
         shape.points = points
-        self.app_state.notify()
+        self.app_state.reindex_shape(shape)
+        self.app_state.notify(changes=ChangeSet(modified={shape.id}))
 
     def on_up(self, x: float, y: float, e):
+        shape = self.canvas.current_drawing_shape
+        if shape is not None:
+            self.app_state.notify(save=True, changes=ChangeSet(modified={shape.id}))
         self.canvas.current_drawing_shape = None
-        self.app_state.notify()
+        self.canvas.redraw_overlay()
 
     def _generate_polygon_points(self, cx, cy, rx, ry, poly_type):
         points = []
@@ -2,6 +2,7 @@ import math
 import flet as ft
 from .base_tool import BaseTool
 from ...models import Line, Rectangle, Circle, Polygon, Group, Text
+from ...state.changes import ChangeSet
 
 
 class SelectionTool(BaseTool):
@@ -32,13 +33,8 @@ class SelectionTool(BaseTool):
 
         # 1. Check for resize handles on selected shape first
         if self.app_state.selected_shape_id:
-            selected_shape = next(
-                (
-                    s
-                    for s in self.app_state.shapes
-                    if s.id == self.app_state.selected_shape_id
-                ),
-                None,
+            selected_shape = self.app_state.get_top_level_shape(
+                self.app_state.selected_shape_id
             )
             if selected_shape:
                 handle = self._get_resize_handle(selected_shape, x, y)
@@ -87,14 +83,13 @@ class SelectionTool(BaseTool):
             self.drag_start_wy = y
 
             # Store initial positions for ALL selected shapes
-            for s in self.app_state.shapes:
-                if s.id in self.app_state.selected_shape_ids:
-                    state = {"x": s.x, "y": s.y}
-                    if isinstance(s, Line):
-                        state.update({"end_x": s.end_x, "end_y": s.end_y})
-                    elif isinstance(s, Polygon):
-                        state.update({"points": list(s.points)})
-                    self.moving_shapes_initial_state[s.id] = state
+            for s in self.app_state.selected_top_level_shapes():
+                state = {"x": s.x, "y": s.y}
+                if isinstance(s, Line):
+                    state.update({"end_x": s.end_x, "end_y": s.end_y})
+                elif isinstance(s, Polygon):
+                    state.update({"points": s.points.copy()})
+                self.moving_shapes_initial_state[s.id] = state
 
         else:
             self.app_state.select_shape(None)
@@ -144,17 +139,15 @@ class SelectionTool(BaseTool):
                 self.app_state.snapshot()
                 self._has_snapshotted_drag = True
 
-            # Move all selected shapes
-            # We use update_shape_position which handles recursion for connected lines
-            # But we must be careful about double-moving.
-            # See legacy code notes: "Simple fix... if a shape is ALSO in the selection set, DO NOT move it recursively"
-            # The AppState internal logic handles exclusion if selected.
-
-            for shape in self.app_state.shapes:
-                if shape.id in self.app_state.selected_shape_ids:
-                    self.app_state.update_shape_position(shape, dx, dy, save=False)
-
-            self.app_state.notify(save=False)
+            # Move all selected shapes in one pass: connected lines are
+            # propagated once and a single change notification is sent.
+            # Selected lines are excluded from propagation (they move on
+            # their own).
+            self.app_state.move_shapes(
+                [s.id for s in self.app_state.selected_top_level_shapes()],
+                dx,
+                dy,
+            )
 
     def on_up(self, x: float, y: float, e):
         self.resize_handle = None
@@ -163,16 +156,12 @@ class SelectionTool(BaseTool):
             self._is_panning = False
         self.moving_shapes_initial_state = {}
         # Final save after drag/resize
-        self.app_state.notify(save=True)
+        self.app_state.notify(save=True, changes=ChangeSet(overlay=True))
 
     def draw_overlays(self, overlay_shapes: list):
         # Draw selection handles
-        for shape in self.app_state.shapes:
-            if (
-                self.app_state.selected_shape_id == shape.id
-                or shape.id in self.app_state.selected_shape_ids
-            ):
-                self._draw_selection_handles(overlay_shapes, shape)
+        for shape in self.app_state.selected_top_level_shapes():
+            self._draw_selection_handles(overlay_shapes, shape)
 
     def _draw_selection_handles(self, overlay_shapes, shape):
         import flet.canvas as cv
@@ -436,15 +425,15 @@ class SelectionTool(BaseTool):
             new_cx = nx1 + new_w / 2
             new_cy = ny1 + new_h / 2
 
-            new_points = []
-            for px, py in shape.points:
-                dx = px - old_cx
-                dy = py - old_cy
-                dx *= scale_x
-                dy *= scale_y
-                new_points.append((new_cx + dx, new_cy + dy))
-
-            shape.points = new_points
+            # Scale about the old center, then move it to the new one
+            shape.will_change("points")
+            shape.points.transform(
+                scale_x,
+                scale_y,
+                new_cx - old_cx * scale_x,
+                new_cy - old_cy * scale_y,
+            )
+            shape.touch()
             shape.x = nx1
             shape.y = ny1
 
@@ -533,14 +522,14 @@ class SelectionTool(BaseTool):
                 child.radius_y *= scale_y
 
             elif isinstance(child, Polygon):
-                new_points = []
-                for px, py in child.points:
-                    dpx = px - origin_x
-                    dpy = py - origin_y
-                    new_points.append(
-                        (new_origin_x + dpx * scale_x, new_origin_y + dpy * scale_y)
-                    )
-                child.points = new_points
+                child.will_change("points")
+                child.points.transform(
+                    scale_x,
+                    scale_y,
+                    new_origin_x - origin_x * scale_x,
+                    new_origin_y - origin_y * scale_y,
+                )
+                child.touch()
 
             elif isinstance(child, Text):
                 # Scale font size by the average scale factor
@@ -562,7 +551,7 @@ class SelectionTool(BaseTool):
     def _edit_text(self, shape: Text):
         def close_dlg(e):
             e.page.close(dlg)
-            self.app_state.notify()
+            self.canvas.redraw_overlay()
 
         def update_text(e):
             shape.content = text_field.value
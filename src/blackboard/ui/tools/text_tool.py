@@ -1,5 +1,6 @@
 import flet as ft
 from ...models import Text, ToolType
+from ...state.changes import ChangeSet
 from .base_tool import BaseTool
 
 
@@ -17,7 +18,7 @@ class TextTool(BaseTool):
     def _add_text_input(self, wx, wy):
         def close_dlg(e):
             self.app_state.current_tool = ToolType.SELECTION
-            self.app_state.notify()
+            self.app_state.notify(changes=ChangeSet(tool=True))
             e.page.close(dlg)
 
         def add_text(e):
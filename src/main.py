@@ -15,7 +15,7 @@ def main(page: ft.Page):
     page.padding = 0
     page.spacing = 0
 
-    app_state = AppState()
+    app_state = AppState(stream_loads=True, dispatch=page.run_thread)
 
     def on_keyboard_event(e: ft.KeyboardEvent):
         if e.shift:
@@ -42,6 +42,8 @@ def main(page: ft.Page):
                     app_state.group_selection()
 
     page.on_keyboard_event = on_keyboard_event
+    # Undo steps still being recorded reach the history journal
+    page.on_disconnect = lambda e: app_state.close()
 
     toolbar = Toolbar(app_state)
     canvas = BlackboardCanvas(app_state)
@@ -0,0 +1,40 @@
+from blackboard.models import Rectangle
+from blackboard.state.anchor_index import AnchorIndex
+from blackboard.state.app_state import AppState
+from conftest import MockStorageService
+
+
+def test_anchor_index_nearest_within_radius():
+    index = AnchorIndex(cell_size=10)
+    index.set_anchors("a", [("left", 0, 0), ("right", 100, 0)])
+    index.set_anchors("b", [("top", 30, 4)])
+
+    assert index.nearest(3, 0, 5)[:2] == ("a", "left")
+    assert index.nearest(28, 2, 10)[:2] == ("b", "top")
+    assert index.nearest(50, 50, 5) is None
+    assert index.nearest(28, 2, 10, exclude={"b"}) is None
+
+    index.remove("b")
+    assert "b" not in index
+    assert len(index) == 2
+    assert index.nearest(28, 2, 10) is None
+
+
+def test_nearest_anchor_follows_moved_shapes():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=100, height=100)
+    other = Rectangle(x=500, y=500, width=10, height=10)
+    state.add_shape(rect)
+    state.add_shape(other)
+
+    shape, anchor_id, ax, ay = state.nearest_anchor(98, 52, 10)
+    assert shape is rect
+    assert (anchor_id, ax, ay) == ("right_center", 100, 50)
+
+    state.update_shape_position(rect, 200, 0)
+    assert state.nearest_anchor(98, 52, 10) is None
+    assert state.nearest_anchor(298, 52, 10)[1] == "right_center"
+    assert state.nearest_anchor(298, 52, 10, exclude_ids={rect.id}) is None
+
+    state.remove_shape(rect)
+    assert state.nearest_anchor(298, 52, 10) is None
@@ -0,0 +1,104 @@
+import pytest
+
+from blackboard.models import Circle, Group, Line, Path, PointArray, Polygon, Rectangle
+from blackboard.storage import binary_format, codec, storage_service
+from blackboard.storage.convert import convert_board, main
+from blackboard.storage.storage_service import StorageService
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "data")
+    monkeypatch.setattr(storage_service, "DATA_DIR", path)
+    return path
+
+
+def make_document():
+    shapes = [
+        Rectangle(x=1, y=2, width=3, height=4, stroke_color="#fff"),
+        Circle(x=5, y=5, radius_x=2, radius_y=3, stroke_color="#fff"),
+        Line(end_x=10, end_y=10, stroke_dash_array=[4, 2]),
+        Path(points=[(0.1, 0.2), (10.5, 10.25)]),
+        Polygon(points=[(0, 0), (5, 0), (0, 5)]),
+        Group(children=[Path(points=[(1, 1), (2, 2)]), Rectangle()]),
+    ]
+    return {
+        "view": {"pan_x": 1.0, "pan_y": 2.0, "zoom": 1.5},
+        "shapes": [codec.encode_shape(s) for s in shapes],
+    }
+
+
+def normalized(document):
+    shapes = [codec.decode_shape(s) for s in document["shapes"]]
+    return codec.loads(codec.dumps([codec.encode_shape(s) for s in shapes]))
+
+
+def test_round_trip():
+    document = make_document()
+    data = binary_format.dumps(document)
+    assert binary_format.is_binary(data)
+
+    decoded = binary_format.loads(data)
+    assert decoded["view"] == document["view"]
+    assert isinstance(decoded["shapes"][3]["points"], PointArray)
+    assert normalized(decoded) == normalized(document)
+
+
+def test_styles_are_stored_once():
+    shapes = [codec.encode_shape(Rectangle(x=i)) for i in range(100)]
+    table_len = binary_format._HEADER.unpack_from(
+        binary_format.dumps({"shapes": shapes})
+    )[3]
+    assert table_len < len(codec.dumps(shapes)) / 2
+
+
+def test_float32_points():
+    document = make_document()
+    data = binary_format.dumps(document, float32=True)
+    assert len(data) < len(binary_format.dumps(document))
+
+    points = binary_format.loads(data)["shapes"][3]["points"]
+    assert list(points.coords) == pytest.approx([0.1, 0.2, 10.5, 10.25])
+
+
+def test_bad_input_raises_value_error():
+    data = binary_format.dumps(make_document())
+    with pytest.raises(ValueError):
+        binary_format.loads(data[:-8])
+    with pytest.raises(ValueError):
+        binary_format.loads(b"BBR")
+
+
+def test_storage_reads_and_writes_binary_boards(data_dir):
+    storage = StorageService()
+    storage.create_file("sketch.bboard")
+    assert "sketch.bboard" in storage.list_files()
+    storage.switch_file("sketch.bboard")
+
+    path = Path(points=[(0, 0), (3, 4)])
+    storage.save_data([path], 5.0, 0.0, 1.0, immediate=True)
+    with open(storage.current_file, "rb") as f:
+        assert binary_format.is_binary(f.read())
+
+    shapes, view = storage.load_data()
+    assert shapes[0].points.tolist() == [(0, 0), (3, 4)]
+    assert view["pan_x"] == 5.0
+
+
+def test_convert_between_formats(tmp_path, capsys):
+    original = make_document()
+    src = str(tmp_path / "board.json")
+    with open(src, "wb") as f:
+        f.write(codec.dumps(original))
+
+    binary = str(tmp_path / "board.bboard")
+    main([src, binary])
+    assert "board.bboard" in capsys.readouterr().out
+    with open(binary, "rb") as f:
+        assert binary_format.is_binary(f.read())
+
+    back = str(tmp_path / "back.json")
+    convert_board(binary, back)
+    with open(back, "rb") as f:
+        document = codec.loads(f.read())
+    assert document == {"view": original["view"], "shapes": normalized(original)}
@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+from blackboard.models import Circle, Group, Line, Path, Polygon, Rectangle, Text
+from blackboard.state.app_state import AppState
+from blackboard.storage import codec, storage_service
+from blackboard.storage.board_stream import FIRST_CHUNK, BoardStream, _rough_bounds
+from blackboard.storage.storage_service import StorageService
+from blackboard.ui.render_scheduler import RenderScheduler
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "DATA_DIR", str(tmp_path / "data"))
+    return StorageService()
+
+
+def make_board(count=20):
+    # Every other shape is far off screen
+    return [
+        Rectangle(x=10 if i % 2 else 10_000, y=10, width=5, height=5)
+        for i in range(count)
+    ]
+
+
+def save_board(storage, shapes):
+    storage.save_data(shapes, 0.0, 0.0, 1.0, immediate=True)
+    return [s.id for s in shapes]
+
+
+def test_rough_bounds_match_shape_bounds():
+    shapes = [
+        Rectangle(x=5, y=5, width=-3, height=4),
+        Circle(x=1, y=2, radius_x=3, radius_y=4),
+        Line(x=10, y=0, end_x=0, end_y=10),
+        Text(x=0, y=0, content="hello"),
+        Path(points=[(0, 0), (7, 3)]),
+        Polygon(points=[(1, 1), (5, 0), (0, 5)]),
+        Group(children=[Rectangle(x=1, y=1, width=1, height=1), Path()]),
+    ]
+    for shape in shapes:
+        assert _rough_bounds(codec.encode_shape(shape)) == shape.bounds
+
+
+def test_chunks_put_visible_shapes_first_and_grow():
+    shapes = make_board()
+    stream = BoardStream(
+        [codec.encode_shape(s) for s in shapes], {}, codec.decode_shape
+    )
+    chunks = list(stream.chunks(viewport=(0, 0, 100, 100), first=2))
+
+    assert [len(c) for c in chunks] == [2, 4, 8, 6]
+    positions = [i for chunk in chunks for i, _ in chunk]
+    assert positions[:10] == list(range(1, 20, 2))
+    assert sorted(positions) == list(range(20))
+    decoded = {i: shape.id for chunk in chunks for i, shape in chunk}
+    assert [decoded[i] for i in range(20)] == [s.id for s in shapes]
+
+
+def test_streamed_load_restores_the_board(storage):
+    ids = save_board(storage, make_board(3000))
+    storage.save_data(storage.load_data()[0], 5.0, 6.0, 2.0, immediate=True)
+
+    state = AppState(storage, stream_loads=True)
+    state.wait_for_load()
+
+    assert not state.is_loading
+    assert [s.id for s in state.shapes] == ids
+    assert (state.pan_x, state.pan_y, state.zoom) == (5.0, 6.0, 2.0)
+    assert len(state.shapes_in_rect(0, 0, 100, 100)) == 1500
+
+
+class Gate:
+    """Blocks decoding after the first chunk until opened."""
+
+    def __init__(self, storage, monkeypatch):
+        self.open = threading.Event()
+        self.decoded = 0
+        decode = storage._deserialize_shape
+
+        def gated(data):
+            self.decoded += 1
+            if self.decoded > FIRST_CHUNK:
+                self.open.wait(5)
+            return decode(data)
+
+        monkeypatch.setattr(storage, "_deserialize_shape", gated)
+        self.saves = 0
+        save_data = storage.save_data
+
+        def counting(*args, **kwargs):
+            self.saves += 1
+            save_data(*args, **kwargs)
+
+        monkeypatch.setattr(storage, "save_data", counting)
+
+
+def start_gated_load(storage, monkeypatch):
+    ids = save_board(storage, make_board(2000))
+    gate = Gate(storage, monkeypatch)
+    state = AppState(storage, stream_loads=True)
+    deadline = time.monotonic() + 5
+    while len(state.shapes) < FIRST_CHUNK and time.monotonic() < deadline:
+        time.sleep(0.01)
+        state.apply_loaded()
+    assert len(state.shapes) == FIRST_CHUNK
+    assert state.is_loading
+    return state, gate, ids
+
+
+def test_saves_are_held_until_the_load_completes(storage, monkeypatch):
+    state, gate, ids = start_gated_load(storage, monkeypatch)
+
+    state.set_pan(40.0, 0.0)
+    assert gate.saves == 0
+
+    gate.open.set()
+    state.wait_for_load()
+    assert gate.saves == 1
+    storage.flush()
+    shapes, view = storage.load_data()
+    assert [s.id for s in shapes] == ids
+    assert view["pan_x"] == 40.0
+
+
+def test_edits_finish_the_load_first(storage, monkeypatch):
+    state, gate, ids = start_gated_load(storage, monkeypatch)
+
+    threading.Timer(0.05, gate.open.set).start()
+    new = Rectangle(x=1, y=1)
+    state.add_shape(new)
+    assert [s.id for s in state.shapes] == ids + [new.id]
+
+
+def test_switching_away_mid_load_does_not_save_the_partial_board(storage, monkeypatch):
+    state, gate, ids = start_gated_load(storage, monkeypatch)
+
+    state.create_file("other.json")
+    gate.open.set()
+    state.wait_for_load()
+
+    assert gate.saves == 0
+    assert state.shapes == []
+    storage.switch_file("default.json")
+    assert [s.id for s in storage.load_data()[0]] == ids
+
+
+def test_loader_only_hands_chunks_over(storage):
+    save_board(storage, make_board(50))
+    state = AppState(storage, stream_loads=True)
+    state._load.thread.join()
+
+    assert state.shapes == []
+    state.apply_loaded()
+    assert len(state.shapes) == 50
+    assert not state.is_loading
+
+
+def test_gesture_during_load_does_not_deadlock(storage, monkeypatch):
+    ids = save_board(storage, make_board(2000))
+    gate = Gate(storage, monkeypatch)
+
+    def dispatch(fn, *args):
+        threading.Thread(target=fn, args=args, daemon=True).start()
+
+    state = AppState(storage, stream_loads=True, dispatch=dispatch)
+    scheduler = RenderScheduler(lambda changes: None, frame_interval=0)
+    state.add_listener(scheduler.request, topics={"shapes", "view"})
+
+    def gesture():
+        # What a canvas handler does: its first edit snapshots, which waits
+        # for the load while hand-overs request renders
+        with scheduler.batch(), state.transaction():
+            state.snapshot()
+
+    handler = threading.Thread(target=gesture, daemon=True)
+    handler.start()
+    gate.open.set()
+    handler.join(5)
+
+    assert not handler.is_alive()
+    assert [s.id for s in state.shapes] == ids
@@ -0,0 +1,151 @@
+from blackboard.state.app_state import AppState
+from blackboard.state.changes import ChangeSet
+from blackboard.models import Rectangle, Line, ToolType
+from blackboard.ui.canvas import BlackboardCanvas
+from conftest import MockStorageService
+
+
+class RecordingListener:
+    def __init__(self):
+        self.changes = []
+
+    def __call__(self, changes):
+        self.changes.append(changes)
+
+
+def test_topic_listener_receives_change_set():
+    state = AppState(storage_service=MockStorageService())
+    listener = RecordingListener()
+    state.add_listener(listener, topics={"shapes"})
+
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    state.update_shape_position(rect, 5, 5)
+    state.remove_shape(rect)
+
+    assert [c.added for c in listener.changes] == [{rect.id}, set(), set()]
+    assert listener.changes[1].modified == {rect.id}
+    assert listener.changes[2].removed == {rect.id}
+
+
+def test_topic_listener_skips_unrelated_changes():
+    state = AppState(storage_service=MockStorageService())
+    view_listener = RecordingListener()
+    drawer_listener = RecordingListener()
+    state.add_listener(view_listener, topics={"view"})
+    state.add_listener(drawer_listener, topics={"drawer"})
+
+    state.set_shift_key(True)
+    state.set_theme_mode("light")
+    state.set_active_drawer_tab("layers")
+    assert view_listener.changes == []
+    assert len(drawer_listener.changes) == 1
+
+    state.set_zoom(2.0)
+    assert len(view_listener.changes) == 1
+    assert view_listener.changes[0].view is True
+
+
+def test_plain_notify_touches_everything():
+    state = AppState(storage_service=MockStorageService())
+    listener = RecordingListener()
+    state.add_listener(listener, topics={"theme"})
+
+    state.notify()
+
+    assert len(listener.changes) == 1
+    assert listener.changes[0].document is True
+
+
+def test_connected_lines_reported_as_modified():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=100, height=100)
+    line = Line(
+        x=100,
+        y=50,
+        end_x=300,
+        end_y=50,
+        start_shape_id=rect.id,
+        start_anchor_id="right_center",
+    )
+    state.add_shape(rect)
+    state.add_shape(line)
+
+    listener = RecordingListener()
+    state.add_listener(listener, topics={"shapes"})
+    state.update_shape_position(rect, 10, 0)
+
+    assert listener.changes[-1].modified == {rect.id, line.id}
+
+
+def test_snapshot_marks_history():
+    state = AppState(storage_service=MockStorageService())
+    listener = RecordingListener()
+    state.add_listener(listener, topics={"history"})
+
+    state.add_shape(Rectangle())
+    state.select_shape(None)
+    state.undo()
+
+    assert len(listener.changes) == 2
+    assert listener.changes[1].document is True
+
+
+def test_remove_listener_with_topics():
+    state = AppState(storage_service=MockStorageService())
+    listener = RecordingListener()
+    state.add_listener(listener, topics={"view"})
+    state.remove_listener(listener)
+
+    state.set_zoom(2.0)
+    assert listener.changes == []
+
+
+def test_change_set_merge_and_topics():
+    changes = ChangeSet(added={"a"}, view=True)
+    changes.merge(ChangeSet(modified={"b"}, selection=True))
+
+    assert changes.added == {"a"}
+    assert changes.modified == {"b"}
+    assert changes.topics() == {"shapes", "view", "selection"}
+    assert ChangeSet().is_empty()
+
+
+def test_canvas_reuses_scene_for_overlay_only_changes():
+    state = AppState(storage_service=MockStorageService())
+    canvas = BlackboardCanvas(state)
+    canvas.update = lambda: None
+
+    state.add_shape(Rectangle(x=0, y=0, width=10, height=10))
+    canvas._on_state_change()
+    scene = canvas._scene_shapes
+
+    canvas._on_state_change(ChangeSet(overlay=True))
+    assert canvas._scene_shapes is scene
+
+    canvas._on_state_change(ChangeSet(selection=True))
+    assert canvas._scene_shapes is not scene
+
+
+def test_overlay_changes_update_only_the_overlay_layer():
+    state = AppState(storage_service=MockStorageService())
+    canvas = BlackboardCanvas(state)
+    updates = []
+    canvas.update = lambda: updates.append("canvas")
+    canvas.overlay_canvas.update = lambda: updates.append("overlay")
+
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    state.set_tool(ToolType.SELECTION)
+    state.select_shape(rect.id)
+    canvas._on_state_change()
+    scene = list(canvas.shapes)
+    assert canvas.overlay_canvas.shapes  # selection handles
+
+    # Pretend the overlay layer is attached to a page
+    canvas.overlay_canvas._Control__page = object()
+    updates.clear()
+    canvas._on_state_change(ChangeSet(overlay=True))
+
+    assert updates == ["overlay"]
+    assert list(canvas.shapes) == scene
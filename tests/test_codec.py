@@ -0,0 +1,91 @@
+import copy
+import dataclasses
+
+from blackboard.models import (
+    Circle,
+    Group,
+    Line,
+    Path,
+    PointArray,
+    Polygon,
+    Rectangle,
+    Text,
+    connections_version,
+)
+from blackboard.storage import codec
+
+
+def make_shapes():
+    return [
+        Rectangle(x=1, y=2, width=3, height=4, stroke_dash_array=[4, 2]),
+        Circle(x=5, y=5, radius_x=2, radius_y=3),
+        Line(x=0, y=0, end_x=10, end_y=10, start_shape_id="a"),
+        Text(x=0, y=0, content="hi"),
+        Path(points=[(0, 0), (10, 10)]),
+        Polygon(points=[(0, 0), (5, 0), (0, 5)]),
+        Group(children=[Path(points=[(1, 1)]), Group(children=[Rectangle()])]),
+    ]
+
+
+def _asdict(shape):
+    def factory(items):
+        return {k: v.tolist() if isinstance(v, PointArray) else v for k, v in items}
+
+    return dataclasses.asdict(shape, dict_factory=factory)
+
+
+def test_encode_matches_the_previous_format():
+    for shape in make_shapes():
+        assert codec.encode_shape(shape) == _asdict(shape)
+
+
+def test_round_trip_through_json():
+    shapes = make_shapes()
+    data = codec.loads(codec.dumps([codec.encode_shape(s) for s in shapes]))
+    decoded = [codec.decode_shape(d) for d in data]
+
+    assert [type(s) for s in decoded] == [type(s) for s in shapes]
+    assert [codec.encode_shape(s) for s in decoded] == [
+        codec.encode_shape(s) for s in shapes
+    ]
+    assert isinstance(decoded[4].points, PointArray)
+
+
+def test_decode_leaves_input_alone_and_fills_defaults():
+    data = {"type": "circle", "id": "c", "radius": 7, "unknown": 1}
+    before = copy.deepcopy(data)
+    circle = codec.decode_shape(data)
+
+    assert data == before
+    assert (circle.radius_x, circle.radius_y) == (7, 7)
+    assert circle.stroke_width == Circle().stroke_width
+    # Mutable defaults are not shared between decoded shapes
+    a = codec.decode_shape({"type": "group"})
+    b = codec.decode_shape({"type": "group"})
+    assert a.children is not b.children
+    assert a.id != b.id
+
+
+def test_decoded_shapes_behave_like_constructed_ones():
+    version = connections_version()
+    group = codec.decode_shape(codec.encode_shape(make_shapes()[-1]))
+    line = codec.decode_shape(codec.encode_shape(Line(start_shape_id="a")))
+    assert connections_version() > version
+    assert line._version != group._version
+
+    # Children are adopted, so their edits reach the group's cached bounds
+    assert group.bounds == (0, 0, 1, 1)
+    group.children[0].points = [(1, 1), (20, 20)]
+    assert group.bounds == (0, 0, 20, 20)
+
+
+def test_compact_pretty_and_stdlib_fallback(monkeypatch):
+    doc = {"shapes": [codec.encode_shape(Path(points=[(0, 0)]))]}
+    compact = codec.dumps(doc)
+    pretty = codec.dumps(doc, pretty=True)
+    assert b"\n" not in compact
+    assert b"\n  " in pretty
+    assert codec.loads(compact) == codec.loads(pretty)
+
+    monkeypatch.setattr(codec, "orjson", None)
+    assert codec.loads(codec.dumps(doc)) == codec.loads(compact)
@@ -0,0 +1,77 @@
+from blackboard.models import Line, Rectangle
+from blackboard.state.app_state import AppState
+from conftest import MockStorageService
+
+
+def test_connection_index_tracks_new_connections():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=100, height=100)
+    line = Line(x=300, y=50, end_x=400, end_y=50)
+    state.add_shape(rect)
+    state.add_shape(line)
+    assert state._attached_lines(rect.id) == []
+
+    # Connected after creation, the way LineTool does on mouse up
+    line.end_shape_id = rect.id
+    line.end_anchor_id = "right_center"
+    assert state._attached_lines(rect.id) == [(line, "end")]
+    assert state._attached_lines(rect.id, {"top_center"}) == []
+
+    state.update_shape_position(rect, 10, 0)
+    assert (line.end_x, line.end_y) == (410, 50)
+
+
+def test_connection_index_follows_remove_and_undo():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=100, height=100)
+    line = Line(
+        x=100,
+        y=50,
+        end_x=300,
+        end_y=50,
+        start_shape_id=rect.id,
+        start_anchor_id="right_center",
+    )
+    state.add_shape(rect)
+    state.add_shape(line)
+
+    state.remove_shape(line)
+    assert state._attached_lines(rect.id) == []
+
+    state.undo()
+    restored_rect = next(s for s in state.shapes if s.id == rect.id)
+    restored_line = next(s for s in state.shapes if s.id == line.id)
+    state.update_shape_position(restored_rect, 0, 20)
+    assert (restored_line.x, restored_line.y) == (100, 70)
+
+
+def test_propagation_only_visits_attached_lines():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=100, height=100)
+    state.add_shape(rect)
+    # A chain of connectors hanging off the rectangle
+    previous, anchor = rect, "right_center"
+    chain = []
+    for i in range(5):
+        line = Line(
+            x=100 + i * 50,
+            y=50,
+            end_x=150 + i * 50,
+            end_y=50,
+            start_shape_id=previous.id,
+            start_anchor_id=anchor,
+        )
+        state.add_shape(line)
+        chain.append(line)
+        previous, anchor = line, "end"
+    # Unrelated lines must not be touched
+    others = [Line(x=0, y=500 + i, end_x=10, end_y=500 + i) for i in range(20)]
+    for other in others:
+        state.add_shape(other)
+    versions = [o._version for o in others]
+
+    state.update_shape_position(rect, 0, 10)
+
+    assert chain[0].y == 60
+    assert chain[0].end_y == 50
+    assert [o._version for o in others] == versions
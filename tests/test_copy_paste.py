@@ -92,3 +92,25 @@ def test_undo_paste(clean_state):
     state.undo()
     assert len(state.shapes) == 1
     assert state.shapes[0].id == rect.id
+
+
+def test_paste_group_gives_children_new_ids(clean_state):
+    state = clean_state
+    a = Rectangle(x=0, y=0, width=10, height=10)
+    b = Rectangle(x=20, y=0, width=10, height=10)
+    state.add_shape(a)
+    state.add_shape(b)
+    state.select_shapes([a.id, b.id])
+    state.group_selection()
+    group = state.get_shape(state.selected_shape_id)
+    state.copy()
+    state.paste()
+
+    pasted = state.shapes[-1]
+    assert {c.id for c in pasted.children}.isdisjoint({a.id, b.id})
+
+    # Edits to the original's children are still undone
+    state.snapshot()
+    state.update_shape_position(group, 50, 50)
+    state.undo()
+    assert (a.x, b.x) == (0, 20)
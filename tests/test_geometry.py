@@ -0,0 +1,94 @@
+import math
+
+import pytest
+
+from blackboard.ui import geometry
+from blackboard.ui.geometry import simplify_points, zoom_bucket, bucket_max_zoom
+
+
+def test_simplify_straight_line_keeps_endpoints():
+    points = [(float(i), 0.0) for i in range(100)]
+    assert simplify_points(points, 0.5) == [(0.0, 0.0), (99.0, 0.0)]
+
+
+def test_simplify_keeps_corners():
+    points = [(float(i), 0.0) for i in range(10)] + [
+        (9.0, float(i)) for i in range(1, 10)
+    ]
+    assert simplify_points(points, 0.5) == [(0.0, 0.0), (9.0, 0.0), (9.0, 9.0)]
+
+
+def test_simplify_stays_within_tolerance():
+    points = [(i * 0.1, math.sin(i * 0.1) * 10) for i in range(2000)]
+    simplified = simplify_points(points, 0.5)
+
+    assert len(simplified) < len(points) // 10
+    assert simplified[0] == points[0] and simplified[-1] == points[-1]
+
+
+def test_simplify_keeps_backtracking_strokes():
+    # Goes right, then back past the start point
+    points = [(0.0, 0.0), (10.0, 0.0), (-10.0, 0.0)]
+    assert simplify_points(points, 0.5) == points
+
+
+def test_zoom_buckets():
+    assert zoom_bucket(1.0) == 0
+    assert zoom_bucket(1.2) == 0
+    assert zoom_bucket(0.1) < zoom_bucket(0.5) < zoom_bucket(1.0)
+    for zoom in (0.1, 0.37, 1.0, 3.3, 10.0):
+        assert zoom <= bucket_max_zoom(zoom_bucket(zoom))
+
+
+def _reference_segments(points, tension, closed):
+    def get_pt(idx):
+        if idx < 0:
+            return points[idx % len(points)] if closed else points[0]
+        if idx >= len(points):
+            return points[idx % len(points)] if closed else points[-1]
+        return points[idx]
+
+    count = len(points) if closed else len(points) - 1
+    segments = []
+    for i in range(count):
+        p0, p1, p2, p3 = get_pt(i - 1), get_pt(i), get_pt(i + 1), get_pt(i + 2)
+        segments.append(
+            (
+                p1[0] + (p2[0] - p0[0]) * tension,
+                p1[1] + (p2[1] - p0[1]) * tension,
+                p2[0] - (p3[0] - p1[0]) * tension,
+                p2[1] - (p3[1] - p1[1]) * tension,
+                p2[0],
+                p2[1],
+            )
+        )
+    return segments
+
+
+def _assert_segments_close(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert all(math.isclose(x, y, abs_tol=1e-9) for x, y in zip(a, e))
+
+
+def _check_spline_backend():
+    points = [(0.0, 0.0), (10.0, 5.0), (20.0, -5.0), (30.0, 0.0), (25.0, 12.0)]
+    for closed in (False, True):
+        _assert_segments_close(
+            geometry.spline_segments(points, 0.2, closed),
+            _reference_segments(points, 0.2, closed),
+        )
+
+    transformed = geometry.transform_points(points, 2.0, 5.0, -5.0)
+    assert len(transformed) == len(points)
+    assert (transformed[1][0], transformed[1][1]) == (25.0, 5.0)
+
+
+def test_spline_segments_pure_python(monkeypatch):
+    monkeypatch.setattr(geometry, "np", None)
+    _check_spline_backend()
+
+
+def test_spline_segments_numpy():
+    pytest.importorskip("numpy")
+    _check_spline_backend()
@@ -0,0 +1,150 @@
+import os
+
+import pytest
+
+from blackboard.models import Group, Path, Rectangle
+from blackboard.state.app_state import AppState
+from blackboard.state.history import StoredPatch
+from blackboard.storage import storage_service
+from blackboard.storage.storage_service import StorageService
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "data")
+    monkeypatch.setattr(storage_service, "DATA_DIR", path)
+    return path
+
+
+def test_history_survives_restart(data_dir):
+    state = AppState(storage_service=StorageService())
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    state.snapshot()
+    state.update_shape_position(rect, 5, 5)
+    state.close()
+    assert os.path.exists(os.path.join(data_dir, "default.json.history"))
+
+    reopened = AppState(storage_service=StorageService())
+    assert len(reopened.undo_stack) == 2
+    # Nothing is read until undo reaches a step
+    assert all(isinstance(p, StoredPatch) for p in reopened.undo_stack)
+
+    reopened.undo()
+    assert (reopened.shapes[0].x, reopened.shapes[0].y) == (0, 0)
+    reopened.undo()
+    assert reopened.shapes == []
+
+    reopened.redo()
+    assert reopened.shapes[0].id == rect.id
+    reopened.redo()
+    assert (reopened.shapes[0].x, reopened.shapes[0].y) == (5, 5)
+
+
+def test_removed_shapes_come_back_after_restart(data_dir):
+    state = AppState(storage_service=StorageService())
+    path = Path(points=[(0, 0), (10, 10)])
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(path)
+    state.add_shape(rect)
+    state.select_shapes([path.id, rect.id])
+    state.group_selection()
+    group = state.get_shape(state.selected_shape_id)
+    state.remove_shape(group)
+    state.close()
+
+    reopened = AppState(storage_service=StorageService())
+    reopened.undo()
+    restored = reopened.shapes[0]
+    assert isinstance(restored, Group)
+    assert [c.id for c in restored.children] == [path.id, rect.id]
+    assert restored.children[0].points.tolist() == [(0, 0), (10, 10)]
+
+    reopened.undo()  # Ungroup
+    assert [s.id for s in reopened.shapes] == [path.id, rect.id]
+
+
+def test_redo_stack_is_journaled(data_dir):
+    state = AppState(storage_service=StorageService())
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    state.undo()
+    state.close()
+
+    reopened = AppState(storage_service=StorageService())
+    assert (len(reopened.undo_stack), len(reopened.redo_stack)) == (0, 1)
+    reopened.redo()
+    assert reopened.shapes[0].id == rect.id
+
+
+def test_journal_is_compacted(data_dir):
+    # Room for about 50 of these steps; older ones are dropped
+    state = AppState(storage_service=StorageService(), history_budget=6000)
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    for _ in range(200):
+        state.snapshot()
+        state.update_shape_position(rect, 1, 0)
+    state.close()
+
+    journal = os.path.join(data_dir, "default.json.history")
+    with open(journal, "rb") as f:
+        records = len(f.readlines())
+    assert records < 200
+
+    reopened = AppState(storage_service=StorageService())
+    assert len(reopened.undo_stack) == len(state.undo_stack)
+    reopened.undo()
+    assert reopened.shapes[0].x == 199
+
+
+def test_switching_files_keeps_each_history(data_dir):
+    state = AppState(storage_service=StorageService())
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    state.create_file("other")
+    assert state.undo_stack == []
+
+    state.switch_file("default.json")
+    assert len(state.undo_stack) == 1
+    state.undo()
+    assert state.shapes == []
+
+
+def test_delete_file_removes_journal(data_dir):
+    state = AppState(storage_service=StorageService())
+    state.add_shape(Rectangle(x=0, y=0, width=10, height=10))
+    state.create_file("other")
+    journal = os.path.join(data_dir, "default.json.history")
+    assert os.path.exists(journal)
+
+    state.delete_file("default.json")
+    assert not os.path.exists(journal)
+
+
+def test_only_finished_steps_are_journaled(data_dir, monkeypatch):
+    storage = StorageService()
+    state = AppState(storage_service=storage)
+    handed = []
+    save_history = storage.save_history
+
+    def counting(journal, stacks):
+        handed.append([step for step, _, _ in stacks["undo"]])
+        save_history(journal, stacks)
+
+    monkeypatch.setattr(storage, "save_history", counting)
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    state.snapshot()
+    for i in range(10):
+        state.update_shape_position(rect, i, i)
+    state.set_pan(40.0, 0.0)
+    state.set_zoom(2.0)
+    storage.flush()
+
+    # The add reaches the journal once the snapshot finishes it; the drag is
+    # still being recorded and the view changes never reach it
+    assert handed == [[], state.undo_stack[:1]]
+    journal = os.path.join(data_dir, "default.json.history")
+    with open(journal, "rb") as f:
+        assert len(f.read().splitlines()) == 1
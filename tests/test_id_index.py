@@ -0,0 +1,83 @@
+from blackboard.models import Group, Rectangle
+from blackboard.state.app_state import AppState
+from conftest import MockStorageService
+
+
+def brute_force_locations(shapes, parent=None):
+    found = {}
+    for i, shape in enumerate(shapes):
+        found[shape.id] = (shape, parent, i)
+        if isinstance(shape, Group):
+            found.update(brute_force_locations(shape.children, shape))
+    return found
+
+
+def assert_index_matches(state):
+    for shape_id, expected in brute_force_locations(state.shapes).items():
+        entry = state._get_id_index()[shape_id]
+        assert entry[0] is expected[0]
+        assert entry[1] is expected[1]
+        assert entry[2] == expected[2]
+
+
+def make_nested_state():
+    state = AppState(storage_service=MockStorageService())
+    inner = Group(children=[Rectangle(), Rectangle()])
+    outer = Group(children=[Rectangle(), inner])
+    for shape in [Rectangle(), outer, Rectangle()]:
+        state.add_shape(shape)
+    return state, outer, inner
+
+
+def test_lookup_nested_shapes():
+    state, outer, inner = make_nested_state()
+    leaf = inner.children[1]
+
+    assert state.get_shape(leaf.id) is leaf
+    assert state.get_parent(leaf.id) is inner
+    assert state.get_parent(outer.id) is None
+    assert state.get_top_level_shape(leaf.id) is None
+    assert state._is_descendant(leaf.id, outer.id)
+    assert not state._is_descendant(outer.id, leaf.id)
+    assert state._find_shape_location(leaf.id) == (inner.children, 1)
+
+
+def test_index_stays_consistent_across_reorders():
+    state, outer, inner = make_nested_state()
+    first, last = state.shapes[0], state.shapes[2]
+    leaf = inner.children[0]
+
+    state.move_shape_forward(first.id)
+    assert_index_matches(state)
+    state.move_shape_to_back(last.id)
+    assert_index_matches(state)
+    state.move_shape_into_group(first.id, inner.id)
+    assert_index_matches(state)
+    state.reorder_shape(leaf.id, last.id)
+    assert_index_matches(state)
+    state.move_shape_to_root_end(inner.children[0].id)
+    assert_index_matches(state)
+
+    # Dropping a group into its own child is rejected
+    state.move_shape_into_group(outer.id, inner.id)
+    assert state.get_parent(inner.id) is outer
+
+
+def test_selected_top_level_shapes_in_z_order():
+    state, outer, inner = make_nested_state()
+    bottom, top = state.shapes[0], state.shapes[2]
+    state.select_shapes([top.id, inner.children[0].id, bottom.id])
+
+    assert state.selected_top_level_shapes() == [bottom, top]
+
+
+def test_index_recovers_from_direct_edits():
+    state, outer, inner = make_nested_state()
+    state.get_shape(outer.id)
+
+    extra = Rectangle()
+    inner.children.insert(0, extra)
+
+    assert state.get_shape(extra.id) is extra
+    assert state.get_parent(extra.id) is inner
+    assert_index_matches(state)
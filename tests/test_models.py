@@ -54,3 +54,60 @@ def test_tool_types():
     assert ToolType.CIRCLE.value == "circle"
     assert ToolType.TEXT.value == "text"
     assert ToolType.PEN.value == "pen"
+
+
+def test_bounds_cached_and_invalidated_up_through_groups():
+    from blackboard.models import Group
+
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    inner = Group(children=[rect])
+    outer = Group(children=[inner, Rectangle(x=50, y=50, width=10, height=10)])
+
+    assert outer.bounds == (0, 0, 60, 60)
+    assert outer.bounds is outer.bounds  # cached
+
+    rect.x = -30
+    assert inner.bounds == (-30, 0, -20, 10)
+    assert outer.bounds == (-30, 0, 60, 60)
+
+    # Membership changes count too
+    inner.children.append(Rectangle(x=0, y=0, width=100, height=100))
+    assert outer.bounds == (-30, 0, 100, 100)
+    inner.children.pop()
+    assert outer.bounds == (-30, 0, 60, 60)
+
+    anchors = dict((a[0], (a[1], a[2])) for a in outer.get_anchors())
+    assert anchors["top_left"] == (-30, 0)
+    assert anchors["bottom_right"] == (60, 60)
+
+
+def test_points_stored_in_point_array():
+    from blackboard.models import PointArray, Polygon
+
+    path = Path(points=[(0, 0), [10, 5]])
+    assert isinstance(path.points, PointArray)
+    assert path.points == [(0, 0), (10, 5)]
+    assert path.points[-1] == (10.0, 5.0)
+
+    path.points.append((20, 0))
+    path.touch()
+    assert path.bounds == (0, 0, 20, 5)
+    assert list(path.points[1:]) == [(10, 5), (20, 0)]
+
+    poly = Polygon(points=[(0, 0), (10, 0), (10, 10)])
+    poly.points.translate(5, -5)
+    assert poly.points == [(5, -5), (15, -5), (15, 5)]
+    poly.points.scale(2, 2, 5, -5)
+    assert poly.points == [(5, -5), (25, -5), (25, 15)]
+
+
+def test_point_array_json_round_trip():
+    import json
+    from blackboard.storage.storage_service import StorageService
+
+    storage = StorageService.__new__(StorageService)  # no data dir needed
+    path = Path(points=[(1.5, 2), (3, 4)])
+    data = json.loads(json.dumps(storage._serialize_shape(path)))
+
+    assert data["points"] == [[1.5, 2], [3, 4]]
+    assert storage._deserialize_shape(data) == path
@@ -74,3 +74,45 @@ def test_multiselect_move_preserves_connection():
     # Verify connection
     assert line_b.x == line_a.end_x
     assert line_b.y == line_a.end_y
+
+
+def test_move_shapes_notifies_once_and_moves_line_ends_once():
+    from blackboard.models import Rectangle
+
+    app_state = AppState(storage_service=MockStorageService())
+    rect_a = Rectangle(id="rect_a", x=0, y=0, width=100, height=100)
+    rect_b = Rectangle(id="rect_b", x=300, y=0, width=100, height=100)
+    # Both ends attached to selected shapes: each end moves exactly once
+    bridge = Line(
+        id="bridge",
+        x=100,
+        y=50,
+        end_x=300,
+        end_y=50,
+        start_shape_id="rect_a",
+        start_anchor_id="right_center",
+        end_shape_id="rect_b",
+        end_anchor_id="left_center",
+    )
+    # Attached to the bridge's start, which is reached from rect_a only
+    branch = Line(
+        id="branch",
+        x=100,
+        y=50,
+        end_x=100,
+        end_y=200,
+        start_shape_id="bridge",
+        start_anchor_id="start",
+    )
+    for shape in (rect_a, rect_b, bridge, branch):
+        app_state.add_shape(shape)
+
+    calls = []
+    app_state.add_listener(calls.append, topics={"shapes"})
+    app_state.move_shapes(["rect_a", "rect_b"], 10, 5)
+
+    assert len(calls) == 1
+    assert calls[0].modified >= {"rect_a", "rect_b", "bridge", "branch"}
+    assert (bridge.x, bridge.y, bridge.end_x, bridge.end_y) == (110, 55, 310, 55)
+    assert (branch.x, branch.y) == (110, 55)
+    assert (branch.end_x, branch.end_y) == (100, 200)
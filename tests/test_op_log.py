@@ -0,0 +1,135 @@
+import json
+import os
+
+import pytest
+
+from blackboard.models import Group, Path, Rectangle
+from blackboard.storage import op_log, storage_service
+from blackboard.storage.snapshot import SnapshotCache, frozen_to_dict
+from blackboard.storage.storage_service import StorageService
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "data")
+    monkeypatch.setattr(storage_service, "DATA_DIR", path)
+    return path
+
+
+def save(storage, shapes, pan_x=0.0):
+    storage.save_data(shapes, pan_x, 0.0, 1.0, immediate=True)
+
+
+def read_board(storage):
+    with open(storage.current_file) as f:
+        return f.read()
+
+
+def test_diff_replays_to_the_new_board():
+    a, b, c = Rectangle(x=1), Rectangle(x=2), Path(points=[(0, 0), (1, 1)])
+    group = Group(children=[Rectangle(x=3)])
+    cache = SnapshotCache()
+    old = cache.freeze([a, b, c, group])
+
+    b.x = 20
+    c.will_change("points")
+    c.points.append((2, 2))
+    c.touch()
+    group.children[0].y = 7
+    d = Rectangle(x=4)
+    new = cache.freeze([c, a, d, group])
+    view = {"pan_x": 5.0}
+
+    ops = op_log.diff_ops(old, new, {}, view)
+    assert {op["op"] for op in ops} == {"remove", "add", "patch", "order", "view"}
+    # Only changed fields are logged
+    patch = next(op for op in ops if op["op"] == "patch" and op["id"] == c.id)
+    assert list(patch["fields"]) == ["points"]
+
+    shapes = json.loads(json.dumps([frozen_to_dict(f) for f in old]))
+    assert op_log.apply_ops(shapes, {}, json.loads(json.dumps(ops))) == view
+    assert shapes == json.loads(json.dumps([frozen_to_dict(f) for f in new]))
+
+
+def test_unchanged_board_logs_nothing():
+    shapes = [Rectangle(), Rectangle()]
+    cache = SnapshotCache()
+    frozen = cache.freeze(shapes)
+    assert op_log.diff_ops(frozen, cache.freeze(shapes), {}, {}) == []
+
+
+def test_saves_append_to_the_log(data_dir):
+    storage = StorageService(use_op_log=True)
+    save(storage, [Rectangle(x=1), Rectangle(x=2)])
+    base = read_board(storage)
+
+    shapes, _ = storage.load_data()
+    shapes[1].x = 5
+    save(storage, shapes, pan_x=3.0)
+    shapes.append(Rectangle(x=9))
+    save(storage, shapes, pan_x=3.0)
+
+    # The base snapshot is left alone; the edits went to the log
+    assert read_board(storage) == base
+    with open(op_log.log_path(storage.current_file)) as f:
+        assert len(f.readlines()) == 3  # Header and one line per save
+
+    shapes, view = StorageService().load_data()
+    assert [s.x for s in shapes] == [1, 5, 9]
+    assert view["pan_x"] == 3.0
+
+
+def test_log_is_compacted_into_a_new_base(data_dir, monkeypatch):
+    monkeypatch.setattr(op_log, "COMPACT_THRESHOLD", 200)
+    storage = StorageService(use_op_log=True)
+    rect = Rectangle()
+    save(storage, [rect])
+    shapes, _ = storage.load_data()
+    for i in range(10):
+        shapes[0].x = i
+        save(storage, shapes)
+
+    # Later edits were folded into the base
+    with open(storage.current_file) as f:
+        assert json.load(f)["shapes"][0]["x"] > 0
+    log = op_log.log_path(storage.current_file)
+    assert not os.path.exists(log) or os.path.getsize(log) < 400
+    shapes, _ = StorageService().load_data()
+    assert shapes[0].x == 9
+
+
+def test_log_from_another_base_is_ignored(data_dir):
+    storage = StorageService(use_op_log=True)
+    save(storage, [Rectangle(x=1)])
+    shapes, _ = storage.load_data()
+    shapes[0].x = 2
+    save(storage, shapes)
+
+    # A base written without the log (e.g. by a plain save) supersedes it
+    with open(storage.current_file) as f:
+        data = json.load(f)
+    data["revision"] = "other"
+    with open(storage.current_file, "w") as f:
+        json.dump(data, f)
+
+    shapes, _ = StorageService().load_data()
+    assert shapes[0].x == 1
+
+
+def test_torn_log_line_is_skipped(data_dir):
+    storage = StorageService(use_op_log=True)
+    save(storage, [Rectangle(x=1)])
+    shapes, _ = storage.load_data()
+    shapes[0].x = 2
+    save(storage, shapes)
+    with open(op_log.log_path(storage.current_file), "ab") as f:
+        f.write(b'[{"op":"patch"')
+
+    storage = StorageService(use_op_log=True)
+    shapes, _ = storage.load_data()
+    assert shapes[0].x == 2
+    # Nothing is appended after a torn line; the next save writes a new base
+    shapes[0].x = 3
+    save(storage, shapes)
+    assert not os.path.exists(op_log.log_path(storage.current_file))
+    assert StorageService().load_data()[0][0].x == 3
@@ -0,0 +1,97 @@
+import threading
+
+import flet as ft
+from unittest.mock import MagicMock
+
+from blackboard.state.app_state import AppState
+from blackboard.state.changes import ChangeSet
+from blackboard.models import Rectangle, ToolType
+from blackboard.ui.canvas import BlackboardCanvas
+from blackboard.ui.render_scheduler import RenderScheduler
+from conftest import MockStorageService
+
+
+def test_requests_within_a_frame_are_coalesced():
+    renders = []
+    scheduler = RenderScheduler(renders.append, frame_interval=60.0)
+
+    # First request renders right away
+    scheduler.request(ChangeSet(view=True))
+    assert len(renders) == 1
+
+    # The rest of the frame only accumulates
+    scheduler.request(ChangeSet(added={"a"}))
+    scheduler.request(ChangeSet(modified={"b"}))
+    assert len(renders) == 1
+    assert scheduler.has_pending
+
+    scheduler.flush()
+    assert len(renders) == 2
+    assert renders[1].added == {"a"} and renders[1].modified == {"b"}
+    assert not scheduler.has_pending
+
+
+def test_batch_defers_until_exit():
+    renders = []
+    scheduler = RenderScheduler(renders.append, frame_interval=0)
+
+    with scheduler.batch():
+        for _ in range(10):
+            scheduler.request(ChangeSet(overlay=True))
+        assert renders == []
+
+    assert len(renders) == 1
+
+
+def test_other_threads_can_request_during_a_batch():
+    renders = []
+    scheduler = RenderScheduler(renders.append, frame_interval=0)
+
+    with scheduler.batch():
+        requester = threading.Thread(target=scheduler.request)
+        requester.start()
+        requester.join(5)
+        assert not requester.is_alive()
+        assert renders == []
+
+    assert len(renders) == 1
+
+
+def test_cancel_drops_pending():
+    renders = []
+    scheduler = RenderScheduler(renders.append, frame_interval=60.0)
+    scheduler.request()
+    scheduler.request()
+    scheduler.cancel()
+    scheduler.flush()
+
+    assert len(renders) == 1
+
+
+def test_dragging_many_shapes_renders_once_per_event():
+    state = AppState(storage_service=MockStorageService())
+    shapes = [Rectangle(x=i * 20, y=0, width=10, height=10) for i in range(50)]
+    for shape in shapes:
+        state.add_shape(shape)
+    state.set_tool(ToolType.SELECTION)
+    state.select_shapes([s.id for s in shapes])
+
+    canvas = BlackboardCanvas(state)
+    updates = []
+    canvas.update = lambda: updates.append(1)
+    canvas.render_scheduler.frame_interval = 0
+    canvas.did_mount()
+
+    e_start = MagicMock(spec=ft.DragStartEvent)
+    e_start.local_x = 5
+    e_start.local_y = 5
+    canvas.on_pan_start(e_start)
+
+    updates.clear()
+    e_move = MagicMock(spec=ft.DragUpdateEvent)
+    e_move.local_x = 15
+    e_move.local_y = 5
+    canvas.on_pan_update(e_move)
+
+    assert shapes[-1].x == 990
+    assert len(updates) == 1
@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from blackboard.models import Circle, Group, Line, Path, Polygon, Rectangle, Text
+from blackboard.storage import save_writer, storage_service
+from blackboard.storage.snapshot import SnapshotCache, frozen_to_dict
+from blackboard.storage.storage_service import StorageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_service, "DATA_DIR", str(tmp_path / "data"))
+    return StorageService()
+
+
+def make_shapes():
+    path = Path(points=[(0, 0), (10, 10)], stroke_dash_array=[5, 5])
+    return [
+        Rectangle(x=1, y=2, width=3, height=4),
+        Circle(x=5, y=5, radius_x=2, radius_y=3),
+        Line(x=0, y=0, end_x=10, end_y=10),
+        Text(x=0, y=0, content="hi"),
+        Polygon(points=[(0, 0), (5, 0), (0, 5)]),
+        Group(children=[path, Group(children=[Rectangle(x=9, y=9)])]),
+    ]
+
+
+def test_frozen_shapes_serialize_like_live_ones():
+    shapes = make_shapes()
+    service = StorageService.__new__(StorageService)
+    frozen = SnapshotCache().freeze(shapes)
+    assert [frozen_to_dict(f) for f in frozen] == [
+        service._serialize_shape(s) for s in shapes
+    ]
+
+
+def test_snapshot_is_not_affected_by_later_edits():
+    path = Path(points=[(0, 0), (10, 10)])
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    group = Group(children=[rect])
+    frozen = SnapshotCache().freeze([path, group])
+
+    path.will_change("points")
+    path.points.translate(5, 5)
+    path.touch()
+    rect.x = 50
+    group.children.append(Rectangle())
+
+    assert frozen_to_dict(frozen[0])["points"] == [(0, 0), (10, 10)]
+    assert [c["x"] for c in frozen_to_dict(frozen[1])["children"]] == [0]
+
+
+def test_unchanged_shapes_reuse_their_frozen_copy():
+    rect = Rectangle()
+    child = Rectangle()
+    group = Group(children=[child])
+    cache = SnapshotCache()
+    first = cache.freeze([rect, group])
+
+    child.x = 5
+    second = cache.freeze([rect, group])
+    assert second[0] is first[0]
+    # A changed child refreezes its group
+    assert second[1] is not first[1]
+    assert second[1]["children"][0]["x"] == 5
+
+
+def test_save_is_written_off_thread(storage):
+    rect = Rectangle(x=1, y=2, width=3, height=4)
+    storage.save_data([rect], 0.0, 0.0, 1.0)
+    # Edits after save_data() returns do not leak into the pending save
+    rect.x = 99
+    storage.flush()
+
+    with open(storage.current_file) as f:
+        data = json.load(f)
+    assert data["shapes"][0]["x"] == 1
+    assert not os.path.exists(storage.current_file + ".tmp")
+
+
+def test_latest_save_wins(storage):
+    storage.save_data([Rectangle(x=1)], 0.0, 0.0, 1.0)
+    storage.save_data([Rectangle(x=2)], 3.0, 0.0, 1.0, immediate=True)
+
+    shapes, view = storage.load_data()
+    assert [s.x for s in shapes] == [2]
+    assert view["pan_x"] == 3.0
+
+
+def test_pending_save_does_not_resurrect_a_deleted_file(storage):
+    storage.create_file("other.json")
+    storage.switch_file("other.json")
+    storage.save_data([Rectangle()], 0.0, 0.0, 1.0)
+    storage.delete_file("other.json")
+    storage.flush()
+
+    assert "other.json" not in storage.list_files()
+
+
+def test_writer_survives_a_failed_write(storage, monkeypatch, capsys):
+    encode_board = save_writer.binary_format.encode_board
+
+    def broken(*args, **kwargs):
+        raise TypeError("not serializable")
+
+    monkeypatch.setattr(save_writer.binary_format, "encode_board", broken)
+    storage.save_data([Rectangle(x=1)], 0.0, 0.0, 1.0, immediate=True)
+    assert "not serializable" in capsys.readouterr().out
+    assert not os.path.exists(storage.current_file + ".tmp")
+
+    # The writer restarts for the next save instead of hanging flush()
+    monkeypatch.setattr(save_writer.binary_format, "encode_board", encode_board)
+    storage.save_data([Rectangle(x=2)], 0.0, 0.0, 1.0, immediate=True)
+    assert [s.x for s in storage.load_data()[0]] == [2]
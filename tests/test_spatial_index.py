@@ -0,0 +1,124 @@
+from blackboard.state.app_state import AppState
+from blackboard.state.spatial_index import SpatialIndex
+from blackboard.models import Rectangle, Circle, Line, Group
+from blackboard.ui.canvas import BlackboardCanvas
+from conftest import MockStorageService
+
+
+def test_spatial_index_query_point():
+    index = SpatialIndex(cell_size=100)
+    index.insert("a", (0, 0, 50, 50))
+    index.insert("b", (400, 400, 450, 450))
+
+    assert index.query_point(25, 25) == {"a"}
+    assert index.query_point(425, 425) == {"b"}
+    assert index.query_point(200, 200) == set()
+
+    # Tolerance expands the probe
+    assert index.query_point(55, 25, tolerance=10) == {"a"}
+
+
+def test_spatial_index_update_and_remove():
+    index = SpatialIndex(cell_size=100)
+    index.insert("a", (0, 0, 50, 50))
+
+    index.update("a", (1000, 1000, 1050, 1050))
+    assert index.query_point(25, 25) == set()
+    assert index.query_point(1025, 1025) == {"a"}
+
+    index.remove("a")
+    assert len(index) == 0
+    assert index.query_point(1025, 1025) == set()
+
+
+def test_spatial_index_oversized_shapes():
+    index = SpatialIndex(cell_size=10, max_cells=4)
+    index.insert("huge", (-10000, -10000, 10000, 10000))
+
+    assert index.query_point(0, 0) == {"huge"}
+    assert index.query_point(20000, 0) == set()
+
+
+def test_shapes_at_returns_topmost_first():
+    state = AppState(storage_service=MockStorageService())
+    bottom = Rectangle(x=0, y=0, width=100, height=100)
+    top = Circle(x=0, y=0, radius_x=50, radius_y=50)
+    far = Rectangle(x=5000, y=5000, width=10, height=10)
+    state.add_shape(bottom)
+    state.add_shape(top)
+    state.add_shape(far)
+
+    assert state.shapes_at(50, 50) == [top, bottom]
+
+
+def test_index_follows_moves_and_resizes():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    assert state.shapes_at(5, 5) == [rect]
+
+    state.update_shape_position(rect, 1000, 0)
+    assert state.shapes_at(5, 5) == []
+    assert state.shapes_at(1005, 5) == [rect]
+
+    rect.width = 500
+    state.update_shape(rect)
+    assert state.shapes_at(1400, 5) == [rect]
+
+
+def test_index_follows_connected_lines():
+    state = AppState(storage_service=MockStorageService())
+    rect = Rectangle(x=0, y=0, width=100, height=100)
+    line = Line(
+        x=100,
+        y=50,
+        end_x=300,
+        end_y=50,
+        start_shape_id=rect.id,
+        start_anchor_id="right_center",
+    )
+    state.add_shape(rect)
+    state.add_shape(line)
+
+    state.update_shape_position(rect, 0, 1000)
+
+    assert line.y == 1050
+    assert state.shapes_at(200, 1050) == [line]
+
+
+def test_index_covers_group_children():
+    state = AppState(storage_service=MockStorageService())
+    r1 = Rectangle(x=0, y=0, width=10, height=10)
+    r2 = Rectangle(x=500, y=500, width=10, height=10)
+    state.add_shape(r1)
+    state.add_shape(r2)
+    state.select_shapes([r1.id, r2.id])
+    state.group_selection()
+
+    group = state.shapes[0]
+    assert isinstance(group, Group)
+    assert state.shapes_at(505, 505) == [group]
+    assert state.shapes_at(250, 250) == []
+
+
+def test_hit_test_uses_index_and_z_order():
+    state = AppState(storage_service=MockStorageService())
+    canvas = BlackboardCanvas(state)
+    canvas.update = lambda: None
+
+    for i in range(200):
+        state.add_shape(Rectangle(x=i * 50, y=0, width=40, height=40))
+    top = Rectangle(x=0, y=0, width=40, height=40)
+    state.add_shape(top)
+
+    assert canvas.hit_test(20, 20) is top
+    assert canvas.hit_test(20, 20, exclude_ids={top.id}) is state.shapes[0]
+    assert canvas.hit_test(45, 20) is None
+
+    state.remove_shape(top)
+    assert canvas.hit_test(20, 20) is state.shapes[0]
+
+    # Shapes appended directly to the list are still found
+    extra = Rectangle(x=-500, y=-500, width=10, height=10)
+    state.shapes.append(extra)
+    assert canvas.hit_test(-495, -495) is extra
@@ -0,0 +1,63 @@
+from blackboard.models import Path, Rectangle, ToolType
+from blackboard.state.app_state import AppState
+from blackboard.ui.canvas import BlackboardCanvas
+from conftest import MockStorageService
+
+
+class CountingStorage(MockStorageService):
+    def __init__(self):
+        super().__init__()
+        self.save_count = 0
+
+    def save_data(self, *args, **kwargs):
+        self.save_count += 1
+        super().save_data(*args, **kwargs)
+
+
+def test_transaction_defers_notify_save_and_snapshot():
+    storage = CountingStorage()
+    state = AppState(storage_service=storage)
+    changes = []
+    state.add_listener(changes.append, topics={"shapes"})
+
+    a = Rectangle(x=0, y=0, width=10, height=10)
+    b = Rectangle(x=20, y=0, width=10, height=10)
+    with state.transaction():
+        state.add_shape(a)
+        with state.transaction():
+            state.add_shape(b)
+        state.update_shape_position(a, 5, 5, save=False)
+        assert changes == []
+        assert storage.save_count == 0
+
+    assert len(changes) == 1
+    assert changes[0].added == {a.id, b.id}
+    assert a.id in changes[0].modified
+    assert storage.save_count == 1
+    assert len(state.undo_stack) == 1
+
+    state.undo()
+    assert state.shapes == []
+
+
+def test_eraser_split_is_one_undo_step():
+    storage = CountingStorage()
+    state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(state)
+    canvas.update = lambda: None
+    path = Path(points=[(float(x), 0.0) for x in range(0, 101, 5)])
+    state.add_shape(path)
+    state.set_tool(ToolType.ERASER)
+    undo_depth = len(state.undo_stack)
+    saves = storage.save_count
+
+    # Erase the middle of the stroke, splitting it in two
+    canvas.tools[ToolType.ERASER]._erase_points_in_path(path, 50, 0)
+
+    assert len(state.shapes) == 2
+    assert len(state.undo_stack) == undo_depth + 1
+    assert storage.save_count == saves + 1
+
+    state.undo()
+    assert len(state.shapes) == 1
+    assert len(state.shapes[0].points) == 21
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import flet.canvas as cv
+
+from blackboard.state.app_state import AppState
+from blackboard.ui.background import Background
+from conftest import MockStorageService
+
+
+def make_background(monkeypatch, grid_type="dot"):
+    state = AppState(storage_service=MockStorageService())
+    state.grid_type = grid_type
+    page = SimpleNamespace(width=1000, height=800)
+    monkeypatch.setattr(Background, "page", property(lambda self: page))
+    background = Background(state)
+    background.update = lambda: None
+    return state, background
+
+
+def test_dot_grid_is_a_single_primitive(monkeypatch):
+    state, background = make_background(monkeypatch, "dot")
+    background._draw_grid()
+
+    shapes = background.grid_canvas.shapes
+    assert len(shapes) == 1
+    assert isinstance(shapes[0], cv.Points)
+    assert shapes[0].point_mode == cv.PointMode.POINTS
+    # One dot per intersection of the page plus one cell of slack
+    assert background._grid_spacing() == 80
+    assert len(shapes[0].points) == (14 + 1) * (11 + 1)
+
+
+def test_pan_slides_cached_grid(monkeypatch):
+    state, background = make_background(monkeypatch, "line")
+    background._draw_grid()
+    grid = background.grid_canvas.shapes[0]
+    assert grid.point_mode == cv.PointMode.LINES
+
+    state.set_pan(130, -20)
+    background._draw_grid()
+
+    assert background.grid_canvas.shapes[0] is grid
+    assert background.grid_canvas.left == 130 % 80 - 80
+    assert background.grid_canvas.top == -20 % 80 - 80
+
+    state.set_zoom(1.5)
+    background._draw_grid()
+    assert background.grid_canvas.shapes[0] is not grid
+
+
+def test_grid_none_draws_nothing(monkeypatch):
+    state, background = make_background(monkeypatch, "dot")
+    background._draw_grid()
+    state.set_grid_type("none")
+    background._draw_grid()
+
+    assert background.grid_canvas.shapes == []
+
+
+def test_resize_rebuilds_grid(monkeypatch):
+    state, background = make_background(monkeypatch, "dot")
+    background.did_mount()
+    grid = background.grid_canvas.shapes[0]
+
+    state.set_view_size(1600, 1200)
+
+    assert background.grid_canvas.shapes[0] is not grid
+    assert background.grid_canvas.width == 1600 + 80
+    assert background.grid_canvas.height == 1200 + 80
@@ -35,7 +35,7 @@ class MockAppState(AppState):
     def remove_listener(self, listener):
         pass
 
-    def notify(self, save=False):
+    def notify(self, save=False, changes=None):
         pass
 
 
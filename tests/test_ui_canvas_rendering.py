@@ -40,3 +40,180 @@ def test_canvas_shapes_are_visible():
     assert rendered_shape.x2 == 100
     assert rendered_shape.y2 == 100
     assert rendered_shape.paint.color == ft.Colors.WHITE
+
+
+def test_offscreen_shapes_are_culled():
+    storage = MockStorageService()
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    canvas.update = lambda: None
+    canvas.view_width = 800
+    canvas.view_height = 600
+
+    on_screen = Line(x=10, y=10, end_x=100, end_y=100)
+    app_state.add_shape(on_screen)
+    for i in range(50):
+        app_state.add_shape(Line(x=5000 + i, y=5000, end_x=5100 + i, end_y=5100))
+
+    canvas._on_state_change()
+    assert len(canvas.shapes) == 1
+    assert canvas.shapes[0].x2 == 100
+
+    # Pan so the far-away lines come into view
+    app_state.pan_x = -5000
+    app_state.pan_y = -5000
+    canvas._on_state_change()
+    assert len(canvas.shapes) == 50
+
+
+def test_culling_keeps_strokes_near_the_edge():
+    storage = MockStorageService()
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    canvas.update = lambda: None
+    canvas.view_width = 800
+    canvas.view_height = 600
+
+    # Geometry sits just outside the viewport, but its stroke pokes in
+    app_state.add_shape(Line(x=-3, y=0, end_x=-3, end_y=100, stroke_width=10))
+
+    canvas._on_state_change()
+    assert len(canvas.shapes) == 1
+
+
+def test_render_cache_rebuilds_only_changed_shapes():
+    storage = MockStorageService()
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    canvas.update = lambda: None
+
+    lines = [Line(x=i * 10, y=0, end_x=i * 10, end_y=50) for i in range(10)]
+    for line in lines:
+        app_state.add_shape(line)
+
+    canvas._on_state_change()
+    before = list(canvas.shapes)
+
+    app_state.update_shape_position(lines[3], 5, 5)
+    canvas._on_state_change()
+    after = list(canvas.shapes)
+
+    assert len(after) == len(before)
+    changed = [i for i in range(len(after)) if after[i] is not before[i]]
+    assert changed == [3]
+    assert after[3].x1 == 35
+
+    # Selection changes only rebuild the selected shape
+    app_state.select_shape(lines[5].id)
+    canvas._on_state_change()
+    # Selection handles go to the overlay layer, not the scene
+    selected = list(canvas.shapes)
+    assert len(selected) == len(after)
+    assert canvas.overlay_canvas.shapes
+    changed = [i for i in range(len(selected)) if selected[i] is not after[i]]
+    assert changed == [5]
+    assert selected[5].paint.color == ft.Colors.BLUE
+
+
+def test_render_cache_invalidated_by_view_and_theme():
+    storage = MockStorageService()
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    canvas.update = lambda: None
+
+    app_state.add_shape(Line(x=0, y=0, end_x=100, end_y=100, stroke_color="white"))
+    canvas._on_state_change()
+    first = canvas.shapes[0]
+
+    app_state.zoom = 2.0
+    canvas._on_state_change()
+    zoomed = canvas.shapes[0]
+    assert zoomed is not first
+    assert zoomed.x2 == 200
+
+    app_state.theme_mode = "light"
+    canvas._on_state_change()
+    assert canvas.shapes[0] is not zoomed
+    assert canvas.shapes[0].paint.color == ft.Colors.BLACK
+
+
+def test_render_cache_not_reused_for_restored_shapes():
+    storage = MockStorageService()
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    canvas.update = lambda: None
+
+    line = Line(x=0, y=0, end_x=100, end_y=100)
+    app_state.add_shape(line)
+    app_state.snapshot()
+    app_state.update_shape_position(line, 50, 0)
+    canvas._on_state_change()
+    assert canvas.shapes[0].x1 == 50
+
+    # Undo swaps in a freshly deserialized object with the same id
+    app_state.undo()
+    canvas._on_state_change()
+    assert canvas.shapes[0].x1 == 0
+
+
+def test_world_render_mode_emits_world_coordinates():
+    from blackboard.ui.canvas import RENDER_MODE_WORLD
+    from blackboard.state.changes import ChangeSet
+
+    app_state = AppState(storage_service=MockStorageService())
+    canvas = BlackboardCanvas(app_state, render_mode=RENDER_MODE_WORLD)
+    canvas.update = lambda: None
+    canvas.view_width = 800
+    canvas.view_height = 600
+
+    line = Line(x=10, y=20, end_x=100, end_y=200)
+    app_state.add_shape(line)
+    app_state.zoom = 2.0
+    app_state.pan_x = 50
+    canvas._on_state_change()
+
+    # Shapes live on the transformed inner canvas, untouched by pan/zoom
+    assert canvas.shapes == []
+    drawn = canvas.world_canvas.shapes[0]
+    assert (drawn.x1, drawn.y1, drawn.x2, drawn.y2) == (10, 20, 100, 200)
+    assert canvas.world_canvas.left == 50
+    assert canvas.world_canvas.scale.scale == 2.0
+
+    # A small pan only moves the transform
+    scene = canvas.world_canvas.shapes
+    app_state.set_pan(80, 30)
+    canvas._on_state_change(ChangeSet(view=True))
+    assert canvas.world_canvas.shapes is scene
+    assert (canvas.world_canvas.left, canvas.world_canvas.top) == (80, 30)
+
+    # Panning far away rebuilds the culled scene
+    app_state.set_pan(-100000, 0)
+    canvas._on_state_change(ChangeSet(view=True))
+    assert canvas.world_canvas.shapes == []
+
+
+def test_zoomed_out_pen_strokes_are_simplified():
+    import math
+    from blackboard.models import Path
+
+    app_state = AppState(storage_service=MockStorageService())
+    canvas = BlackboardCanvas(app_state)
+    canvas.update = lambda: None
+
+    points = [(i * 0.5, math.sin(i * 0.05) * 20) for i in range(2000)]
+    stroke = Path(points=points)
+    app_state.add_shape(stroke)
+
+    canvas._on_state_change()
+    full_elements = len(canvas.shapes[0].elements)
+
+    app_state.zoom = 0.1
+    canvas._on_state_change()
+    zoomed_out_elements = len(canvas.shapes[0].elements)
+
+    assert full_elements < len(points)
+    assert zoomed_out_elements < full_elements
+    assert zoomed_out_elements < len(points) // 20
+    # The simplified points are cached per zoom bucket
+    cached = canvas._get_lod_points(stroke)
+    assert canvas._get_lod_points(stroke) is cached
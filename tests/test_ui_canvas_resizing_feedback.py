@@ -45,7 +45,7 @@ def test_canvas_resize_feedback_with_shift():
 
     # 5. Verify color changed to CYAN (feedback)
     # canvas.shapes[0] is the rectangle.
-    # canvas.shapes[1..4] are handles (because it's selected)
+    # Handles are drawn on canvas.overlay_canvas (because it's selected)
     # Let's verify the first shape (the rect itself)
     cv_rect = canvas.shapes[0]
 
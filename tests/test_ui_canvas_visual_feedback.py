@@ -36,7 +36,7 @@ class MockAppState(AppState):
     def remove_listener(self, listener):
         pass
 
-    def notify(self, save=False):
+    def notify(self, save=False, changes=None):
         pass
 
     def add_shape(self, shape):
@@ -112,7 +112,7 @@ def test_visual_feedback_during_line_drag():
     # Let's count cv.Circle instances.
     import flet.canvas as cv
 
-    circles = [s for s in canvas.shapes if isinstance(s, cv.Circle)]
+    circles = [s for s in canvas.overlay_canvas.shapes if isinstance(s, cv.Circle)]
 
     # We expect anchors.
     assert len(circles) >= 8
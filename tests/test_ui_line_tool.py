@@ -149,10 +149,6 @@ def test_line_tool_snap_to_anchor_end():
     canvas.hit_test = MagicMock(return_value=None)
     tool.on_down(0, 0, e)
 
-    # Setup for on_up snap logic
-    # on_up iterates app_state.shapes
-    canvas.get_anchors = MagicMock(return_value=[("left", 200, 50)])
-
     # End drawing close to the rectangle's left anchor
     tool.on_up(195, 52, e)
 
@@ -162,7 +158,7 @@ def test_line_tool_snap_to_anchor_end():
     assert isinstance(line, Line)
 
     assert line.end_shape_id == "rect1"
-    assert line.end_anchor_id == "left"
+    assert line.end_anchor_id == "left_center"
     assert line.end_x == 200
     assert line.end_y == 50
 
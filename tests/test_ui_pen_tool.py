@@ -77,3 +77,42 @@ def test_pen_tool_safety_checks():
 
     canvas.current_drawing_shape = Rectangle()
     tool.on_move(100, 100, e)  # Should not raise
+
+
+def real_storage(tmp_path, monkeypatch):
+    from blackboard.storage import storage_service
+
+    monkeypatch.setattr(storage_service, "DATA_DIR", str(tmp_path / "data"))
+    return storage_service.StorageService()
+
+
+def test_finished_stroke_is_saved(tmp_path, monkeypatch):
+    storage = real_storage(tmp_path, monkeypatch)
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    tool = PenTool(canvas)
+    e = MagicMock()
+
+    tool.on_down(0, 0, e)
+    for i in range(1, 30):
+        tool.on_move(i, i, e)
+    tool.on_up(29, 29, e)
+    storage.flush()
+
+    shapes, _ = storage.load_data()
+    assert len(shapes[0].points) == 30
+
+
+def test_close_saves_a_stroke_in_progress(tmp_path, monkeypatch):
+    storage = real_storage(tmp_path, monkeypatch)
+    app_state = AppState(storage_service=storage)
+    canvas = BlackboardCanvas(app_state)
+    tool = PenTool(canvas)
+    e = MagicMock()
+
+    tool.on_down(0, 0, e)
+    tool.on_move(5, 5, e)
+    app_state.close()
+
+    shapes, _ = storage.load_data()
+    assert shapes[0].points == [(0, 0), (5, 5)]
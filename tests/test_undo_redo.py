@@ -41,8 +41,8 @@ def test_undo_stack_grows_on_add(clean_state):
 
     assert len(state.shapes) == 1
     assert len(state.undo_stack) == 1
-    # Undo stack should contain empty list (state before add)
-    assert len(state.undo_stack[0]) == 0
+    # The undo entry records just the one insertion, not a copy of the board
+    assert len(state.undo_stack[0]) == 1
 
 
 def test_undo_add(clean_state):
@@ -110,9 +110,169 @@ def test_snapshot_limit(clean_state):
     # Simulate 60 actions
     for i in range(60):
         state.add_shape(Rectangle(x=i, y=i))
+    assert len(state.undo_stack) == 60
 
-    # Stack should be capped at 50
+    # The budget, not a step count, caps the stack
+    state.set_history_budget(sum(p.nbytes for p in state.undo_stack[-50:]))
     assert len(state.undo_stack) == 50
 
     state.undo()
     assert len(state.shapes) == 59
+
+
+def test_undo_keeps_identity_of_untouched_shapes(clean_state):
+    state = clean_state
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    circle = Circle(x=50, y=50)
+    state.add_shape(rect)
+    state.add_shape(circle)
+
+    state.snapshot()
+    state.update_shape_position(rect, 5, 7)
+    assert list(state.undo_stack[-1].fields) == [rect.id]
+
+    state.undo()
+    assert state.shapes[0] is rect and state.shapes[1] is circle
+    assert (rect.x, rect.y) == (0, 0)
+
+    state.redo()
+    assert state.shapes[0] is rect
+    assert (rect.x, rect.y) == (5, 7)
+
+
+def test_undo_redo_structural_edits(clean_state):
+    from blackboard.models import Path
+
+    state = clean_state
+    a = Rectangle(x=0, y=0)
+    b = Rectangle(x=20, y=0)
+    path = Path(points=[(0, 0), (10, 10)])
+    for shape in (a, b, path):
+        state.add_shape(shape)
+
+    state.select_shapes([a.id, b.id])
+    state.group_selection()
+    group = state.get_shape(state.selected_shape_id)
+    state.move_shape_to_back(path.id)
+    state.snapshot()
+    state.update_shape_position(path, 5, 5)
+    assert state.shapes == [path, group]
+
+    state.undo()
+    assert path.points == [(0, 0), (10, 10)]
+    state.undo()
+    assert state.shapes == [group, path]
+    state.undo()
+    assert state.shapes == [a, b, path]
+    assert state.get_shape(group.id) is None
+
+    state.redo()
+    state.redo()
+    state.redo()
+    assert state.shapes == [path, group]
+    assert state.get_parent(a.id) is group
+    assert path.points == [(5, 5), (15, 15)]
+
+
+def test_history_compresses_old_steps_and_respects_budget(clean_state):
+    from blackboard.models import Path
+
+    state = clean_state
+    path = Path(points=[(float(i % 100), 0.0) for i in range(10000)])
+    state.add_shape(path)
+    for _ in range(10):
+        state.snapshot()
+        state.update_shape_position(path, 1, 0)
+
+    memory = state.history_memory()
+    assert memory["undo_steps"] == 11
+    assert memory["compressed_steps"] == 6
+    # Each move keeps a copy of the 10k points (160 KB raw)
+    assert memory["bytes"] < 5 * 200_000
+
+    state.set_history_budget(500_000)
+    memory = state.history_memory()
+    assert memory["bytes"] <= 500_000
+    assert memory["undo_steps"] < 11
+
+    # The steps that are left still undo correctly, compressed or not
+    steps = memory["undo_steps"]
+    for _ in range(steps):
+        state.undo()
+    assert path.points[0] == (10 - steps, 0)
+    assert len(path.points) == 10000
+
+
+def test_each_state_records_its_own_edits():
+    # Separate sessions in one process each have their own state
+    a = AppState(storage_service=MockStorageService())
+    b = AppState(storage_service=MockStorageService())
+    ra = Rectangle(x=0, y=0, width=10, height=10)
+    rb = Rectangle(x=0, y=0, width=20, height=20)
+    a.add_shape(ra)
+    b.add_shape(rb)
+
+    a.snapshot()
+    b.snapshot()
+    ra.width = 99
+    a.update_shape(ra)
+    rb.width = 77
+    b.update_shape(rb)
+
+    a.undo()
+    assert ra.width == 10
+    assert rb.width == 77
+    b.undo()
+    assert rb.width == 20
+
+
+def test_changes_to_other_boards_shapes_skip_the_index(monkeypatch):
+    a = AppState(storage_service=MockStorageService())
+    ra = Rectangle(x=0, y=0, width=10, height=10)
+    a.add_shape(ra)
+    a.snapshot()
+    a.get_shape(ra.id)  # Index built
+
+    rebuilds = []
+    rebuild = a._rebuild_id_index
+    monkeypatch.setattr(a, "_rebuild_id_index", lambda: rebuilds.append(1) or rebuild())
+    stray = Rectangle(x=0, y=0, width=10, height=10)
+    for i in range(10):
+        stray.width = i
+
+    assert rebuilds == []
+    assert len(a.undo_stack[-1]) == 0
+
+
+def test_history_is_limited_by_budget_not_step_count(clean_state):
+    state = clean_state
+    rect = Rectangle(x=0, y=0, width=10, height=10)
+    state.add_shape(rect)
+    for i in range(200):
+        state.snapshot()
+        state.update_shape_position(rect, 1, 0)
+
+    assert state.history_memory()["undo_steps"] == 201
+    for _ in range(200):
+        state.undo()
+    assert rect.x == 0
+
+
+def test_redo_steps_are_trimmed_first(clean_state):
+    from blackboard.models import Path
+
+    state = clean_state
+    path = Path(points=[(float(i), 0.0) for i in range(10000)])
+    state.add_shape(path)
+    for _ in range(6):
+        state.snapshot()
+        state.update_shape_position(path, 1, 0)
+    for _ in range(3):
+        state.undo()
+
+    state.set_history_budget(state.history_memory()["bytes"] // 2)
+    memory = state.history_memory()
+    assert memory["bytes"] <= state.history_budget
+    # Undo history survives while redo steps are left to drop
+    assert memory["undo_steps"] == 4
+    assert memory["redo_steps"] < 3